@@ -4,6 +4,9 @@ from logging.config import fileConfig
 from sqlalchemy.ext.asyncio import create_async_engine
 from alembic import context
 from app.models.user_model import Base  # Replace with the actual location of your models
+import app.models.email_outbox_model  # noqa: F401 (registers the table on Base.metadata)
+import app.models.refresh_token_model  # noqa: F401
+import app.models.token_revocation_model  # noqa: F401
 
 # this is the Alembic Config object, which provides access to the values within the .ini file
 config = context.config
@@ -0,0 +1,40 @@
+"""Add email outbox
+
+Revision ID: 3c7d9e1f2a4b
+Revises: 8b1e2c4d5a6f
+Create Date: 2026-10-18 10:00:00.000000
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '3c7d9e1f2a4b'
+down_revision: Union[str, None] = '8b1e2c4d5a6f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    op.create_table('email_outbox',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=True),
+    sa.Column('email_type', sa.String(length=50), nullable=False),
+    sa.Column('recipient', sa.String(length=255), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'SENT', 'DEAD', name='OutboxStatus', create_constraint=True), server_default='PENDING', nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # The dispatcher's claim query only looks at due pending rows
+    op.create_index('ix_email_outbox_due', 'email_outbox', ['next_attempt_at'], unique=False, postgresql_where=sa.text("status = 'PENDING'"))
+
+def downgrade() -> None:
+    op.drop_index('ix_email_outbox_due', table_name='email_outbox', postgresql_where=sa.text("status = 'PENDING'"))
+    op.drop_table('email_outbox')
+    op.execute('DROP TYPE "OutboxStatus"')
@@ -0,0 +1,31 @@
+"""Add token epochs
+
+Revision ID: 7a4c1e9d2b6f
+Revises: 5e2a8f3b9c1d
+Create Date: 2026-10-18 14:00:00.000000
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '7a4c1e9d2b6f'
+down_revision: Union[str, None] = '5e2a8f3b9c1d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('token_epoch', sa.Integer(), server_default='0', nullable=False))
+    op.create_table('token_revocations',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('epoch', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_token_revocations_created_at'), 'token_revocations', ['created_at'], unique=False)
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_token_revocations_created_at'), table_name='token_revocations')
+    op.drop_table('token_revocations')
+    op.drop_column('users', 'token_epoch')
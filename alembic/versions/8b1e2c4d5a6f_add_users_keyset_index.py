@@ -0,0 +1,22 @@
+"""Add users keyset pagination index
+
+Revision ID: 8b1e2c4d5a6f
+Revises: 63f7a724f4f0
+Create Date: 2026-10-18 09:00:00.000000
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '8b1e2c4d5a6f'
+down_revision: Union[str, None] = '63f7a724f4f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    # Sort key for keyset pagination of GET /users
+    op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'], unique=False)
+
+def downgrade() -> None:
+    op.drop_index('ix_users_created_at_id', table_name='users')
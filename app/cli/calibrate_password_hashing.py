@@ -0,0 +1,62 @@
+"""
+Pick password hashing parameters for this hardware and store them in settings.
+
+    python -m app.cli.calibrate_password_hashing
+    python -m app.cli.calibrate_password_hashing --scheme argon2id --target-ms 300 --env-file .env
+
+Run it once on the hardware the API runs on, not in every worker: every worker then builds
+the same hasher from settings, so a login never finds a hash made with other parameters
+and rehashes it. Without --env-file the settings are printed for you to copy.
+"""
+from builtins import enumerate, int, open, print, set, sorted, str
+import argparse
+import os
+import sys
+from typing import Any, Dict
+from app.utils.password_hashers import HASHERS, calibrate_hasher
+from settings.config import settings
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Pick password hashing parameters for this hardware.")
+    parser.add_argument("--scheme", choices=sorted(HASHERS), default=settings.password_hash_scheme)
+    parser.add_argument("--target-ms", type=int, default=settings.password_hash_target_ms, help="Target hash latency.")
+    parser.add_argument("--env-file", help="Write the chosen settings into this env file, e.g. .env.")
+    return parser.parse_args(argv)
+
+
+def update_env_file(path: str, values: Dict[str, Any]):
+    """Set each of values in the env file at path, replacing existing assignments and appending the rest."""
+    lines = []
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    written = set()
+    for i, line in enumerate(lines):
+        key = line.split("=", 1)[0].strip().lower()
+        if "=" in line and not line.lstrip().startswith("#") and key in values:
+            lines[i] = f"{key}={values[key]}"
+            written.add(key)
+    lines.extend(f"{key}={value}" for key, value in values.items() if key not in written)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def run(args: argparse.Namespace) -> int:
+    hasher = calibrate_hasher(args.scheme, args.target_ms)
+    values = hasher.to_settings()
+    if args.env_file:
+        update_env_file(args.env_file, values)
+        print(f"Wrote {hasher!r} to {args.env_file}; restart the API to use it.", file=sys.stderr)
+    else:
+        for key, value in values.items():
+            print(f"{key}={value}")
+    return 0
+
+
+def main(argv=None):
+    sys.exit(run(parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
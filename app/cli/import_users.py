@@ -0,0 +1,69 @@
+"""
+Bulk-import users from a CSV or NDJSON file.
+
+    python -m app.cli.import_users partners.csv
+    python -m app.cli.import_users partners.ndjson --batch-size 2000 --report report.json
+
+Input is streamed, so files larger than memory are fine. Verification emails are queued in
+the email outbox and sent by the API's outbox dispatcher.
+"""
+from builtins import ValueError, int, open, print
+import argparse
+import asyncio
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from app.database import Database
+from app.services.user_import_service import IMPORT_BATCH_SIZE, MAX_IMPORT_BATCH_SIZE, UserImportService, read_rows
+from settings.config import settings
+
+
+def batch_size(value: str) -> int:
+    try:
+        size = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}")
+    if not 1 <= size <= MAX_IMPORT_BATCH_SIZE:
+        raise argparse.ArgumentTypeError(f"must be between 1 and {MAX_IMPORT_BATCH_SIZE}")
+    return size
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Bulk-import users from a CSV or NDJSON file.")
+    parser.add_argument("path", help="Input file; CSV needs a header row.")
+    parser.add_argument("--format", choices=("csv", "ndjson"), help="Defaults from the file extension.")
+    parser.add_argument("--batch-size", type=batch_size, default=IMPORT_BATCH_SIZE, help="Rows per transaction.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Password hashing processes.")
+    parser.add_argument("--report", help="Write the JSON error report here instead of stdout.")
+    return parser.parse_args(argv)
+
+
+async def run(args: argparse.Namespace) -> int:
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    Database.initialize(settings.database_url)
+    try:
+        with open(args.path, encoding="utf-8", newline="") as lines, \
+                ProcessPoolExecutor(max_workers=args.workers) as executor:
+            async with Database.get_session_factory()() as session:
+                report = await UserImportService.import_users(
+                    session, read_rows(lines, fmt), batch_size=args.batch_size, executor=executor
+                )
+    finally:
+        await Database.close()
+
+    output = report.model_dump_json(indent=2)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+    print(f"{report.created} of {report.total_rows} rows imported, {report.failed} rejected.", file=sys.stderr)
+    return 1 if report.failed else 0
+
+
+def main(argv=None):
+    sys.exit(asyncio.run(run(parse_args(argv))))
+
+
+if __name__ == "__main__":
+    main()
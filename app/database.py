@@ -1,18 +1,188 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import declarative_base, sessionmaker
+from builtins import Exception, OSError, bool, dict, float, int, isinstance, str
+import logging
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import Pool
+from app.utils.pool_monitor import MonitoredAsyncQueuePool, PoolMonitor, pool_status
+from app.utils.replica_set import ReplicaSet
+from settings.config import settings
 
 Base = declarative_base()
+logger = logging.getLogger(__name__)
+
+# Per-session statement counter. A session's connections carry a reference to its info
+# dict while checked out, so every statement sent on them is attributed to that session.
+QUERY_COUNT_KEY = "query_count"
+
+@event.listens_for(Session, "after_begin")
+def _track_session_connection(session, transaction, connection):
+    session.info.setdefault(QUERY_COUNT_KEY, 0)
+    connection.info["session_info"] = session.info
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    session_info = conn.info.get("session_info")
+    if session_info is not None:
+        session_info[QUERY_COUNT_KEY] = session_info.get(QUERY_COUNT_KEY, 0) + 1
+
+@event.listens_for(Pool, "checkin")
+def _untrack_connection(dbapi_connection, connection_record):
+    connection_record.info.pop("session_info", None)
+
+# Set in session.info once the session has written anything; its later reads skip the
+# replicas so a request always sees its own writes
+PRIMARY_PINNED_KEY = "primary_pinned"
+
+@event.listens_for(Session, "after_flush")
+def _pin_after_flush(session, flush_context):
+    session.info[PRIMARY_PINNED_KEY] = True
+
+@event.listens_for(Session, "do_orm_execute")
+def _pin_after_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[PRIMARY_PINNED_KEY] = True
+
+def read_your_writes(session: AsyncSession):
+    """Send the session's remaining reads to the primary, e.g. after a write made outside it."""
+    session.info[PRIMARY_PINNED_KEY] = True
+
+def _is_idle(session: AsyncSession) -> bool:
+    return not (session.in_transaction() or session.new or session.dirty or session.deleted)
+
+async def _execute_autocommit(session: AsyncSession, statement, params=None, bind: Optional[AsyncEngine] = None):
+    """Run one statement on an AUTOCOMMIT connection: no BEGIN/COMMIT round trips."""
+    bind_arguments = {"bind": bind.sync_engine} if bind is not None else {}
+    try:
+        # Session.connection() pops "bind" out of the dict it is given, so it gets a copy
+        await session.connection(bind_arguments=dict(bind_arguments), execution_options={"isolation_level": "AUTOCOMMIT"})
+        result = await session.execute(statement, params, bind_arguments=bind_arguments)
+    except BaseException:
+        # Committing on a connection that just failed would raise PendingRollbackError in
+        # place of the original error, hiding it from callers that handle it
+        await session.rollback()
+        raise
+    # Ends the no-op transaction and releases the connection; nothing is pending to flush
+    await session.commit()
+    return result
+
+def _is_connection_error(error: Exception) -> bool:
+    if isinstance(error, exc.DBAPIError):
+        return error.connection_invalidated or isinstance(error, (exc.OperationalError, exc.InterfaceError))
+    return isinstance(error, OSError)
+
+async def execute_read(session: AsyncSession, statement, params=None, replica: bool = False):
+    """
+    Execute a read-only statement and return its (fully buffered) result without committing.
+
+    If the session has no open transaction and nothing pending, the statement runs on an
+    AUTOCOMMIT connection, so no BEGIN/COMMIT is sent and the connection goes back to the
+    pool as soon as the rows are read. Otherwise the statement joins the current
+    transaction so it sees that transaction's uncommitted writes.
+
+    With replica=True an autocommit read goes to a read replica, if any are configured and
+    the session hasn't written yet (see read_your_writes). A replica that can't be reached
+    is ejected and the read is retried on the primary.
+    """
+    if not _is_idle(session):
+        return await session.execute(statement, params)
+    if replica and Database.replicas is not None and not session.info.get(PRIMARY_PINNED_KEY):
+        engine = Database.replicas.choose()
+        if engine is not None:
+            try:
+                return await _execute_autocommit(session, statement, params, bind=engine)
+            except (exc.DBAPIError, OSError) as e:
+                if not _is_connection_error(e):
+                    raise
+                Database.replicas.eject(engine, e)
+    return await _execute_autocommit(session, statement, params)
+
+async def execute_write(session: AsyncSession, statement, params=None):
+    """
+    Execute a single self-contained write (e.g. UPDATE ... RETURNING) and commit it.
+
+    A single statement is atomic on its own, so an idle session runs it in autocommit:
+    one round trip in total. Otherwise it joins the current transaction, which is committed.
+    """
+    if _is_idle(session):
+        return await _execute_autocommit(session, statement, params)
+    result = await session.execute(statement, params)
+    await session.commit()
+    return result
+
+def asyncpg_connect_args(statement_cache_size: int, pgbouncer: bool = False) -> Dict[str, Any]:
+    """
+    asyncpg connection arguments for the prepared statement cache.
+
+    Each connection prepares a statement the first time it runs it and reuses it for the
+    next statement_cache_size distinct statements, skipping the server's parse and plan.
+    Behind a transaction-pooling pgbouncer consecutive transactions may land on different
+    server connections, where a cached statement doesn't exist, so pgbouncer mode turns the
+    caches off and gives every statement a unique name.
+    """
+    if pgbouncer:
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return {"prepared_statement_cache_size": statement_cache_size}
+
+def query_count(session) -> int:
+    """Return the number of SQL statements the session has executed so far."""
+    return session.info.get(QUERY_COUNT_KEY, 0)
 
 class Database:
     """Handles database connections and sessions."""
     _engine = None
     _session_factory = None
+    _pool_monitor: Optional[PoolMonitor] = None
+    replicas: Optional[ReplicaSet] = None
 
     @classmethod
-    def initialize(cls, database_url: str, echo: bool = False):
-        """Initialize the async engine and sessionmaker."""
+    def initialize(
+        cls,
+        database_url: str,
+        echo: bool = False,
+        pool_size: Optional[int] = None,
+        max_overflow: Optional[int] = None,
+        pool_timeout: Optional[float] = None,
+        pool_recycle: Optional[int] = None,
+        pool_pre_ping: Optional[bool] = None,
+        replica_urls: Optional[List[str]] = None,
+        statement_cache_size: Optional[int] = None,
+        pgbouncer: Optional[bool] = None,
+    ):
+        """
+        Initialize the async engine and sessionmaker. Pool and statement cache options default
+        to the db_* settings and replica_urls to database_replica_urls; replicas get the same
+        options as the primary.
+        """
         if cls._engine is None:  # Ensure engine is created once
-            cls._engine = create_async_engine(database_url, echo=echo, future=True)
+            connect_args = asyncpg_connect_args(
+                statement_cache_size if statement_cache_size is not None else settings.db_statement_cache_size,
+                pgbouncer if pgbouncer is not None else settings.db_pgbouncer,
+            )
+            engine_options = dict(
+                echo=echo, future=True, connect_args=connect_args,
+                poolclass=MonitoredAsyncQueuePool,
+                pool_size=pool_size if pool_size is not None else settings.db_pool_size,
+                max_overflow=max_overflow if max_overflow is not None else settings.db_max_overflow,
+                pool_timeout=pool_timeout if pool_timeout is not None else settings.db_pool_timeout,
+                pool_recycle=pool_recycle if pool_recycle is not None else settings.db_pool_recycle,
+                pool_pre_ping=pool_pre_ping if pool_pre_ping is not None else settings.db_pool_pre_ping,
+            )
+            cls._engine = create_async_engine(database_url, **engine_options)
+            replica_urls = replica_urls if replica_urls is not None else settings.database_replica_urls
+            if replica_urls:
+                replica_engines = [create_async_engine(url, **engine_options) for url in replica_urls]
+                cls.replicas = ReplicaSet(replica_engines, retry_after=settings.database_replica_retry_seconds)
+            cls._pool_monitor = PoolMonitor()
+            cls._pool_monitor.attach(cls._engine.sync_engine)
+            cls._engine.sync_engine.pool.monitor = cls._pool_monitor
             cls._session_factory = sessionmaker(
                 bind=cls._engine, class_=AsyncSession, expire_on_commit=False, future=True
             )
@@ -24,8 +194,21 @@ class Database:
             raise ValueError("Database not initialized. Call `initialize()` first.")
         return cls._session_factory
 
+    @classmethod
+    def pool_stats(cls) -> Optional[Dict[str, Any]]:
+        """Occupancy and checkout statistics of the engine's connection pool, or None before initialize()."""
+        if cls._engine is None:
+            return None
+        stats = {**pool_status(cls._engine.sync_engine.pool), **cls._pool_monitor.stats()}
+        if cls.replicas is not None:
+            stats["replicas"] = cls.replicas.stats()
+        return stats
+
     @classmethod
     async def close(cls):
-        """Dispose of the database engine."""
+        """Dispose of the database engines."""
         if cls._engine:
             await cls._engine.dispose()
+        if cls.replicas is not None:
+            for engine in cls.replicas.engines:
+                await engine.dispose()
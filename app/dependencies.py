@@ -1,23 +1,54 @@
-from builtins import Exception, dict, str
-from fastapi import Depends, HTTPException
+from builtins import Exception, dict, getattr, str
+import logging
+from fastapi import Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import Database
+from app.database import Database, query_count
+from app.utils.link_generation import USER_LINK_ACTIONS, LinkBuilder
 from app.utils.template_manager import TemplateManager
+from app.services.email_outbox import EmailOutboxDispatcher
 from app.services.email_service import EmailService
-from app.services.jwt_service import decode_token
-from settings.config import Settings
+from app.services.jwt_service import decode_token_cached
+from app.services.token_epoch import token_epochs
+from settings.config import Settings, settings
+
+logger = logging.getLogger(__name__)
 
 # Settings Dependency
 def get_settings() -> Settings:
-    """Return application settings."""
-    return Settings()
+    """Return the shared application settings; see settings.config.reload_settings."""
+    return settings
+
+# Shared Service Dependencies
+# The lifespan handler in app.main creates these once per app and keeps them on app.state;
+# when it hasn't run (e.g. under a test client without lifespan) they are created on first use.
+def get_template_manager(request: Request) -> TemplateManager:
+    """Provide the shared TemplateManager."""
+    state = request.app.state
+    if getattr(state, "template_manager", None) is None:
+        state.template_manager = TemplateManager()
+    return state.template_manager
+
+def get_email_service(request: Request) -> EmailService:
+    """Provide the shared EmailService, whose SMTP client pools sessions across requests."""
+    state = request.app.state
+    if getattr(state, "email_service", None) is None:
+        state.email_service = EmailService(template_manager=get_template_manager(request))
+    return state.email_service
 
-# Email Service Dependency
-def get_email_service() -> EmailService:
-    """Provide the EmailService instance."""
-    template_manager = TemplateManager()
-    return EmailService(template_manager=template_manager)
+def get_email_dispatcher(request: Request) -> EmailOutboxDispatcher:
+    """Provide the app's email outbox dispatcher (only started by the lifespan handler)."""
+    state = request.app.state
+    if getattr(state, "email_dispatcher", None) is None:
+        state.email_dispatcher = EmailOutboxDispatcher(get_email_service(request))
+    return state.email_dispatcher
+
+def get_user_link_builder(request: Request) -> LinkBuilder:
+    """Provide the LinkBuilder for user links, compiled from the app's routes."""
+    state = request.app.state
+    if getattr(state, "user_link_builder", None) is None:
+        state.user_link_builder = LinkBuilder(request.app.routes, USER_LINK_ACTIONS)
+    return state.user_link_builder
 
 # Database Session Dependency
 async def get_db() -> AsyncSession:
@@ -34,6 +65,8 @@ async def get_db() -> AsyncSession:
                 status_code=500,
                 detail=f"Database connection error: {str(e)}"
             )
+        finally:
+            logger.debug(f"Request executed {query_count(session)} queries")
 
 # OAuth2 Token Scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
@@ -49,8 +82,9 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    payload = decode_token(token)  # Ensure this decodes the JWT correctly
-    if not payload:
+    payload = decode_token_cached(token)
+    # Refresh tokens are signed with the same key but only buy a new access token
+    if not payload or payload.get("type") == "refresh":
         raise credentials_exception
 
     user_id: str = payload.get("sub")  # 'sub' is typically used for user id
@@ -58,6 +92,9 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
 
     if not user_id or not user_role:
         raise credentials_exception
+    # Checked on every request, cached claims included: revocations apply before the token expires
+    if not token_epochs.is_current(user_id, payload.get("epoch")):
+        raise credentials_exception
 
     return {"user_id": user_id, "role": user_role}
 
@@ -1,12 +1,43 @@
 from builtins import Exception
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from starlette.responses import JSONResponse
 from starlette.middleware.cors import CORSMiddleware  # Import the CORSMiddleware
 from app.database import Database
 from app.dependencies import get_settings
-from app.routers import user_routes
+from app.routers import admin_routes, user_routes
+from app.services.email_outbox import EmailOutboxDispatcher
+from app.services.email_service import EmailService
+from app.services.token_epoch import token_epochs
 from app.utils.api_description import getDescription
+from app.utils.security import PasswordHashQueueFull, shutdown_hash_pool
+from app.utils.link_generation import USER_LINK_ACTIONS, LinkBuilder
+from app.utils.template_manager import TemplateManager
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the app's shared services on startup and release them on shutdown."""
+    settings = get_settings()
+    Database.initialize(settings.database_url, settings.debug)
+    app.state.template_manager = TemplateManager()
+    # Every router is included by the time the app starts
+    app.state.user_link_builder = LinkBuilder(app.routes, USER_LINK_ACTIONS)
+    app.state.email_service = EmailService(template_manager=app.state.template_manager)
+    app.state.email_dispatcher = EmailOutboxDispatcher(app.state.email_service)
+    if app.state.email_service.smtp_client:
+        app.state.email_dispatcher.start()
+    token_epochs.start()
+    try:
+        yield
+    finally:
+        await token_epochs.stop()
+        await app.state.email_dispatcher.stop()
+        await app.state.email_service.close()
+        await Database.close()
+        shutdown_hash_pool()
+
 app = FastAPI(
+    lifespan=lifespan,
     title="User Management",
     description=getDescription(),
     version="0.0.1",
@@ -28,17 +59,13 @@ app.add_middleware(
     allow_headers=["*"],  # Allowed HTTP headers
 )
 
-@app.on_event("startup")
-async def startup_event():
-    settings = get_settings()
-    Database.initialize(settings.database_url, settings.debug)
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    await Database.close()
+@app.exception_handler(PasswordHashQueueFull)
+async def password_hash_queue_full_handler(request, exc):
+    return JSONResponse(status_code=503, content={"message": "Server is busy, please retry."}, headers={"Retry-After": "1"})
 
 @app.exception_handler(Exception)
 async def exception_handler(request, exc):
     return JSONResponse(status_code=500, content={"message": "An unexpected error occurred."})
 
 app.include_router(user_routes.router)
+app.include_router(admin_routes.router)
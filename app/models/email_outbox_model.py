@@ -0,0 +1,65 @@
+from builtins import int, str
+from datetime import datetime
+from enum import Enum
+import uuid
+from sqlalchemy import (
+    BigInteger, Column, String, Integer, DateTime, ForeignKey, Index, Text, func, text, Enum as SQLAlchemyEnum
+)
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from app.database import Base
+
+
+class OutboxStatus(str, Enum):
+    """Delivery state of an outbox email."""
+    PENDING = "PENDING"
+    SENT = "SENT"
+    DEAD = "DEAD"
+
+
+class EmailOutbox(Base):
+    """
+    An email waiting to be sent, corresponding to the 'email_outbox' table.
+
+    Rows are written in the same transaction as the change that triggers the email, so an
+    email is queued if and only if that change commits. The dispatcher in
+    app.services.email_outbox delivers them.
+
+    Attributes:
+        id (int): Sequential identifier; also the delivery order.
+        user_id (UUID): The user the email is about; the email is dropped if the user is deleted.
+        email_type (str): Template name, see EmailService.
+        recipient (str): Destination address.
+        payload (dict): Template context.
+        status (OutboxStatus): PENDING until sent, or DEAD after too many failed attempts.
+        attempts (int): Delivery attempts so far.
+        next_attempt_at (datetime): Not claimed by the dispatcher before this time.
+        last_error (str): The error from the most recent failed attempt.
+        created_at (datetime): When the email was queued.
+        sent_at (datetime): When the email was delivered.
+    """
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        # The dispatcher's claim query only looks at due pending rows
+        Index("ix_email_outbox_due", "next_attempt_at", postgresql_where=text("status = 'PENDING'")),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    user_id: Mapped[uuid.UUID] = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
+    email_type: Mapped[str] = Column(String(50), nullable=False)
+    recipient: Mapped[str] = Column(String(255), nullable=False)
+    payload: Mapped[dict] = Column(JSONB, nullable=False)
+    status: Mapped[OutboxStatus] = Column(
+        SQLAlchemyEnum(OutboxStatus, name='OutboxStatus', create_constraint=True),
+        nullable=False, default=OutboxStatus.PENDING, server_default=OutboxStatus.PENDING.value,
+    )
+    attempts: Mapped[int] = Column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error: Mapped[str] = Column(Text, nullable=True)
+    created_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+    # Never loaded; declares the dependency so a user and its queued email flush in the right order
+    user = relationship("User", lazy="raise")
+
+    def __repr__(self) -> str:
+        return f"<EmailOutbox {self.id} {self.email_type} to {self.recipient}, Status: {self.status.name}>"
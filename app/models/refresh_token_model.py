@@ -0,0 +1,37 @@
+from builtins import str
+from datetime import datetime
+import uuid
+from sqlalchemy import Column, DateTime, ForeignKey, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class RefreshToken(Base):
+    """
+    An issued refresh token, corresponding to the 'refresh_tokens' table.
+
+    Each refresh exchanges a token for a new one in the same family and marks the old one
+    used. Presenting a used token again means it was copied, so the whole family is revoked.
+
+    Attributes:
+        jti (UUID): The token's jti claim.
+        family_id (UUID): Shared by every token rotated from the same login.
+        user_id (UUID): The user the token was issued to.
+        expires_at (datetime): Matches the token's exp claim.
+        used_at (datetime): When the token was exchanged for a new one.
+        revoked_at (datetime): When the token's family was revoked.
+        created_at (datetime): When the token was issued.
+    """
+    __tablename__ = "refresh_tokens"
+
+    jti: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    family_id: Mapped[uuid.UUID] = Column(UUID(as_uuid=True), nullable=False, index=True)
+    user_id: Mapped[uuid.UUID] = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    expires_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=False)
+    used_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+    revoked_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self) -> str:
+        return f"<RefreshToken {self.jti} for {self.user_id}>"
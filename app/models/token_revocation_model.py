@@ -0,0 +1,32 @@
+from builtins import int, str
+from datetime import datetime
+import uuid
+from sqlalchemy import BigInteger, Column, DateTime, Integer, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class TokenRevocation(Base):
+    """
+    A change of a user's token epoch, corresponding to the 'token_revocations' table.
+
+    Every process keeps the latest epoch per user in memory and polls this table for new
+    rows, so revoking a user's tokens needs no per-request lookup. There is no foreign key:
+    the row recording a deletion must outlive the user.
+
+    Attributes:
+        id (int): Increasing id the pollers page by.
+        user_id (UUID): The user whose tokens were revoked.
+        epoch (int): Access tokens with a lower epoch claim are rejected.
+        created_at (datetime): When the revocation was made.
+    """
+    __tablename__ = "token_revocations"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    user_id: Mapped[uuid.UUID] = Column(UUID(as_uuid=True), nullable=False)
+    epoch: Mapped[int] = Column(Integer, nullable=False)
+    created_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        return f"<TokenRevocation {self.user_id} epoch {self.epoch}>"
@@ -3,7 +3,7 @@ from datetime import datetime
 from enum import Enum
 import uuid
 from sqlalchemy import (
-    Column, String, Integer, DateTime, Boolean, func, Enum as SQLAlchemyEnum
+    Column, String, Integer, DateTime, Boolean, Index, func, Enum as SQLAlchemyEnum
 )
 from sqlalchemy.dialects.postgresql import UUID, ENUM
 from sqlalchemy.orm import Mapped, mapped_column
@@ -41,6 +41,7 @@ class User(Base):
         last_login_at (datetime): Timestamp of the last login.
         failed_login_attempts (int): Count of failed login attempts.
         is_locked (bool): Flag indicating if the account is locked.
+        token_epoch (int): Bumped to revoke every access token issued before; tokens carry it as a claim.
         created_at (datetime): Timestamp when the user was created, set by the server.
         updated_at (datetime): Timestamp of the last update, set by the server.
 
@@ -52,6 +53,10 @@ class User(Base):
         update_professional_status(status): Updates the professional status and logs the update time.
     """
     __tablename__ = "users"
+    __table_args__ = (
+        # Sort key for keyset pagination of the user list
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
     __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -69,6 +74,7 @@ class User(Base):
     last_login_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
     failed_login_attempts: Mapped[int] = Column(Integer, default=0)
     is_locked: Mapped[bool] = Column(Boolean, default=False)
+    token_epoch: Mapped[int] = Column(Integer, default=0, server_default="0", nullable=False)
     created_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     verification_token = Column(String, nullable=True)
@@ -0,0 +1,31 @@
+from builtins import dict, int
+from fastapi import APIRouter, Depends
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import Database, execute_read
+from app.dependencies import get_db, get_email_dispatcher, require_role
+from app.services.email_outbox import EmailOutboxDispatcher, outbox_depth
+from app.services.jwt_service import verified_token_cache
+from app.services.token_epoch import token_epochs
+from app.utils.security import get_hash_pool
+
+router = APIRouter()
+
+
+@router.get("/admin/metrics", name="get_metrics", tags=["Admin"])
+async def get_metrics(
+    db: AsyncSession = Depends(get_db),
+    dispatcher: EmailOutboxDispatcher = Depends(get_email_dispatcher),
+    current_user: dict = Depends(require_role(["ADMIN"]))
+):
+    """Return runtime metrics for the worker pools and caches used by the API."""
+    smtp_client = dispatcher.email_service.smtp_client
+    max_connections = (await execute_read(db, text("SHOW max_connections"))).scalar()
+    return {
+        "database_pool": {**(Database.pool_stats() or {}), "server_max_connections": int(max_connections)},
+        "password_hashing": get_hash_pool().stats(),
+        "email_outbox": {**dispatcher.stats(), "depth": await outbox_depth(db)},
+        "smtp": smtp_client.stats() if smtp_client else None,
+        "token_cache": verified_token_cache.stats(),
+        "token_epochs": token_epochs.stats(),
+    }
@@ -1,24 +1,35 @@
-from builtins import dict, int, len, str
+from builtins import ValueError, dict, getattr, int, len, list, str
+import io
 from datetime import timedelta
+from typing import List, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, Response, status, Request
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile, status, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.dependencies import get_current_user, get_db, get_email_service, require_role
+from app.dependencies import get_current_user, get_db, get_email_service, get_user_link_builder, require_role
 from app.schemas.pagination_schema import EnhancedPagination
-from app.schemas.token_schema import TokenResponse
+from app.schemas.token_schema import RefreshTokenRequest, TokenResponse
 from app.schemas.user_schemas import (
     LoginRequest,
     UserBase,
+    UserBatchGetRequest,
+    UserBatchResponse,
     UserCreate,
+    UserImportReport,
     UserListResponse,
     UserResponse,
     UserUpdate,
     UserProfileUpdate
 )
+from app.services.count_service import CountMode
+from app.services.refresh_token_service import RefreshTokenService
+from app.services.user_import_service import UserImportService, read_rows
 from app.services.user_service import UserService
 from app.services.jwt_service import create_access_token
-from app.utils.link_generation import create_user_links, generate_pagination_links
+from app.utils.link_generation import LinkBuilder, generate_pagination_links
+from app.utils.sparse_fields import parse_fields
 from app.dependencies import get_settings
 from app.services.email_service import EmailService
 
@@ -26,14 +37,34 @@ router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 settings = get_settings()
 
+FIELDS_DESCRIPTION = "Comma-separated fields to return, e.g. nickname,role; id is always included. Defaults to all."
+# Fields a sparse fieldset can name: the user's columns, not its links
+USER_FIELDS = [name for name in UserResponse.model_fields if name != "links"]
+
+
+def user_fields(fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)) -> Optional[List[str]]:
+    """The requested sparse fieldset of UserResponse, or None for every field."""
+    try:
+        return parse_fields(fields, USER_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 
 @router.get("/users/{user_id}", response_model=UserResponse, name="get_user", tags=["User Management"])
 async def get_user(
     user_id: UUID,
     request: Request,
+    fields: Optional[List[str]] = Depends(user_fields),
+    link_builder: LinkBuilder = Depends(get_user_link_builder),
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))
 ):
+    if fields is not None:
+        # Only the requested columns are read, and the response is just those fields
+        row = await UserService.get_fields_by_id(db, user_id, fields)
+        if row is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        return JSONResponse(jsonable_encoder(row._asdict()))
     user = await UserService.get_by_id(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -50,10 +81,79 @@ async def get_user(
         last_login_at=user.last_login_at,
         created_at=user.created_at,
         updated_at=user.updated_at,
-        links=create_user_links(user.id, request)
+        links=link_builder.links(request.base_url, user_id=user.id)
     )
 
 
+@router.get("/users/", response_model=UserListResponse, name="list_users", tags=["User Management"])
+async def list_users(
+    request: Request,
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's links."),
+    count: Optional[CountMode] = Query(None, description="Include the total at this accuracy; 'exact' scans the table."),
+    fields: Optional[List[str]] = Depends(user_fields),
+    link_builder: LinkBuilder = Depends(get_user_link_builder),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))
+):
+    try:
+        users, next_cursor, prev_cursor = await UserService.list_users_keyset(db, limit=limit, cursor=cursor, fields=fields)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    total = await UserService.count(db, count) if count else None
+    page = dict(
+        total=total,
+        size=len(users),
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor,
+        links=generate_pagination_links(request, 0, limit, None, next_cursor=next_cursor, prev_cursor=prev_cursor),
+    )
+    if fields is not None:
+        items = [{field: getattr(row, field) for field in fields} for row in users]
+        return JSONResponse(jsonable_encoder({"items": items, **page}))
+    items = [
+        UserResponse.model_validate(user).model_copy(update={"links": link_builder.links(request.base_url, user_id=user.id)})
+        for user in users
+    ]
+    return UserListResponse(items=items, **page)
+
+
+@router.post("/users/batch-get", response_model=UserBatchResponse, name="batch_get_users", tags=["User Management"])
+async def batch_get_users(
+    batch: UserBatchGetRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))
+):
+    """Fetch users by ID and/or email, at most 100 keys in total, with one query per key type."""
+    by_id = await UserService.get_many_by_ids(db, batch.ids)
+    by_email = await UserService.get_many_by_emails(db, batch.emails)
+    found_ids = {user.id for user in by_id}
+    found_emails = {user.email for user in by_email}
+    items = {user.id: user for user in by_id + by_email}
+    return UserBatchResponse(
+        items=[UserResponse.model_validate(user) for user in items.values()],
+        missing_ids=[user_id for user_id in batch.ids if user_id not in found_ids],
+        missing_emails=[email for email in batch.emails if email not in found_emails],
+    )
+
+
+@router.post("/users/import", response_model=UserImportReport, name="import_users", tags=["User Management"])
+async def import_users(
+    file: UploadFile = File(..., description="CSV with a header row, or newline-delimited JSON objects."),
+    input_format: Optional[str] = Query(None, alias="format", pattern="^(csv|ndjson)$", description="Defaults from the file extension."),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(require_role(["ADMIN"]))
+):
+    """Bulk-create users. Rows are reported individually; verification emails are queued in the outbox."""
+    fmt = input_format or ("ndjson" if (file.filename or "").endswith((".ndjson", ".jsonl")) else "csv")
+    # Read and parsed a batch at a time on a worker thread by import_users
+    lines = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        return await UserImportService.import_users(db, read_rows(lines, fmt))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Import file must be UTF-8 encoded")
+
+
 @router.patch("/users/{user_id}/profile", response_model=UserResponse, name="update_user_profile", tags=["User Management"])
 async def update_user_profile(
     user_id: UUID,
@@ -65,19 +165,14 @@ async def update_user_profile(
     if str(current_user["user_id"]) != str(user_id):
         raise HTTPException(status_code=403, detail="You can only update your own profile.")
     
-    
-    user = await UserService.get_by_id(db, user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    
     updated_data = user_update.dict(exclude_unset=True) 
     
-  
+    # A single UPDATE ... RETURNING; no row back means the user doesn't exist
     updated_user = await UserService.update(db, user_id, updated_data)
-    
+    if not updated_user:
+        raise HTTPException(status_code=404, detail="User not found")
 
-    return UserResponse.model_construct(**updated_user.dict())
+    return UserResponse.model_validate(updated_user)
 
 
 @router.patch("/users/{user_id}/upgrade-professional", response_model=UserResponse, tags=["User Management"])
@@ -86,12 +181,9 @@ async def upgrade_user_to_professional(
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))
 ):
-    user = await UserService.get_by_id(db, user_id)
+    user = await UserService.upgrade_to_professional(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    user.is_professional = True
-    await db.commit()
-    await db.refresh(user)
     return UserResponse.model_construct(**user.__dict__)
 
 
@@ -103,9 +195,28 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Async
         raise HTTPException(status_code=401, detail="Incorrect email or password")
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
-        data={"sub": user.id, "role": user.role}, expires_delta=access_token_expires
+        data={"sub": str(user.id), "role": user.role.name, "epoch": user.token_epoch}, expires_delta=access_token_expires
+    )
+    refresh_token = await RefreshTokenService.issue(session, user.id)
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+@router.post("/token/refresh", response_model=TokenResponse, tags=["Login"])
+async def refresh_access_token(body: RefreshTokenRequest, session: AsyncSession = Depends(get_db)):
+    """
+    Exchange a refresh token for a new access token and a new refresh token, without a
+    password. Each refresh token works once; reusing one revokes every token rotated from
+    the same login.
+    """
+    rotated = await RefreshTokenService.rotate(session, body.refresh_token)
+    if not rotated:
+        raise HTTPException(status_code=401, detail="Invalid or expired refresh token", headers={"WWW-Authenticate": "Bearer"})
+    user, refresh_token = rotated
+    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
+    access_token = create_access_token(
+        data={"sub": str(user.id), "role": user.role.name, "epoch": user.token_epoch}, expires_delta=access_token_expires
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
 
 
 @router.delete("/users/{user_id}", status_code=204, tags=["User Management"])
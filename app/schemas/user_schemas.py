@@ -1,4 +1,4 @@
-from builtins import ValueError, any, bool, str
+from builtins import ValueError, any, bool, len, str
 from pydantic import BaseModel, EmailStr, Field, validator, root_validator
 from typing import Optional, List
 from datetime import datetime
@@ -6,6 +6,8 @@ from enum import Enum
 import uuid
 import re
 from app.models.user_model import UserRole
+from app.schemas.link_schema import Link
+from app.schemas.pagination_schema import PaginationLink
 from app.utils.nickname_gen import generate_nickname
 
 
@@ -66,6 +68,7 @@ class UserResponse(UserBase):
     nickname: Optional[str] = Field(None, min_length=3, pattern=r'^[\w-]+$', example=generate_nickname())    
     is_professional: Optional[bool] = Field(default=False, example=True)
     role: UserRole
+    links: List[Link] = Field(default=[], description="Links to the actions on this user.")
 
 class LoginRequest(BaseModel):
     email: str = Field(..., example="john.doe@example.com")
@@ -84,6 +87,43 @@ class UserListResponse(BaseModel):
         "linkedin_profile_url": "https://linkedin.com/in/johndoe", 
         "github_profile_url": "https://github.com/johndoe"
     }])
-    total: int = Field(..., example=100)
-    page: int = Field(..., example=1)
-    size: int = Field(..., example=10)
\ No newline at end of file
+    total: Optional[int] = Field(None, example=100, description="Total number of users, when requested.")
+    page: Optional[int] = Field(None, example=1)
+    size: int = Field(..., example=10)
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, if there is one.")
+    prev_cursor: Optional[str] = Field(None, description="Cursor for the previous page, if there is one.")
+    links: List[PaginationLink] = []
+
+MAX_BATCH_GET_KEYS = 100
+
+class UserBatchGetRequest(BaseModel):
+    ids: List[uuid.UUID] = Field(default=[], max_length=MAX_BATCH_GET_KEYS, example=[uuid.uuid4()])
+    emails: List[EmailStr] = Field(default=[], max_length=MAX_BATCH_GET_KEYS, example=["john.doe@example.com"])
+
+    @root_validator(pre=True)
+    def check_at_least_one_key(cls, values):
+        if not values.get("ids") and not values.get("emails"):
+            raise ValueError("At least one id or email must be provided")
+        if len(values.get("ids") or []) + len(values.get("emails") or []) > MAX_BATCH_GET_KEYS:
+            raise ValueError(f"At most {MAX_BATCH_GET_KEYS} ids and emails in total may be requested")
+        return values
+
+class UserBatchResponse(BaseModel):
+    items: List[UserResponse]
+    missing_ids: List[uuid.UUID] = []
+    missing_emails: List[str] = []
+
+class UserImportError(BaseModel):
+    row: int = Field(..., description="1-based data row number in the input (header excluded).")
+    email: Optional[str] = None
+    error: str
+
+class UserImportReport(BaseModel):
+    total_rows: int = 0
+    created: int = 0
+    failed: int = 0
+    errors: List[UserImportError] = []
+
+    def add_error(self, row: int, email: Optional[str], error: str):
+        self.failed += 1
+        self.errors.append(UserImportError(row=row, email=email, error=error))
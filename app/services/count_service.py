@@ -0,0 +1,72 @@
+from builtins import bool, classmethod, dict, int, str
+import time
+from enum import Enum
+from typing import Dict, Tuple
+import logging
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import execute_read
+from app.dependencies import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class CountMode(str, Enum):
+    """How accurate a row count has to be."""
+    EXACT = "exact"              # SELECT count(*) on every call
+    CACHED = "cached"            # exact count, reused for count_cache_ttl_seconds
+    APPROXIMATE = "approximate"  # planner estimate from pg_class.reltuples
+
+
+class CountService:
+    """
+    Row counts for ORM models at a chosen accuracy.
+
+    Cached counts live in this process only; writers call invalidate() so a worker's own
+    creates and deletes show up immediately, and the TTL bounds staleness from other workers.
+    """
+    _cache: Dict[str, Tuple[float, int]] = {}
+
+    @classmethod
+    async def count(cls, session: AsyncSession, model, mode: CountMode = CountMode.EXACT, replica: bool = False) -> int:
+        """Count model's rows; replica=True lets the query run on a read replica."""
+        if mode == CountMode.APPROXIMATE:
+            estimate = await cls._estimate(session, model, replica)
+            if estimate is not None:
+                return estimate
+            # Table has never been analyzed; fall back to a (cached) exact count
+            mode = CountMode.CACHED
+        if mode == CountMode.CACHED:
+            cached = cls._cache.get(model.__tablename__)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+        count = await cls._exact(session, model, replica)
+        if mode == CountMode.CACHED:
+            cls._cache[model.__tablename__] = (time.monotonic() + settings.count_cache_ttl_seconds, count)
+        return count
+
+    @classmethod
+    def invalidate(cls, model):
+        """Drop the cached count for model after rows were inserted or deleted."""
+        cls._cache.pop(model.__tablename__, None)
+
+    @classmethod
+    async def _exact(cls, session: AsyncSession, model, replica: bool = False) -> int:
+        result = await execute_read(session, select(func.count()).select_from(model), replica=replica)
+        return result.scalar()
+
+    @classmethod
+    async def _estimate(cls, session: AsyncSession, model, replica: bool = False):
+        result = await execute_read(
+            session,
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+            {"table": model.__tablename__},
+            replica=replica,
+        )
+        estimate = result.scalar()
+        # reltuples is -1 until the table is first vacuumed or analyzed
+        if estimate is None or estimate < 0:
+            logger.debug(f"No planner statistics for {model.__tablename__}")
+            return None
+        return estimate
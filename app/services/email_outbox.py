@@ -0,0 +1,215 @@
+from builtins import Exception, bool, dict, float, int, len, max, min, round, sorted, str, zip
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Set
+from uuid import UUID
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import Database, execute_read, execute_write
+from app.models.email_outbox_model import EmailOutbox, OutboxStatus
+from app.models.user_model import User
+from app.services.email_service import EmailService
+from settings.config import settings
+
+logger = logging.getLogger(__name__)
+
+LAST_ERROR_MAX_LENGTH = 1000
+
+
+def outbox_values(email_type: str, user_data: Dict[str, Any], user_id: Optional[UUID] = None) -> Dict[str, Any]:
+    """Column values for an outbox row, for bulk inserts."""
+    return {"user_id": user_id, "email_type": email_type, "recipient": user_data["email"], "payload": user_data}
+
+
+def enqueue_email(session: AsyncSession, email_type: str, user_data: Dict[str, Any], user_id: Optional[UUID] = None) -> EmailOutbox:
+    """Queue an email in session's transaction; it is sent only if that transaction commits."""
+    entry = EmailOutbox(**outbox_values(email_type, user_data, user_id))
+    session.add(entry)
+    return entry
+
+
+def enqueue_verification_email(session: AsyncSession, user: User) -> EmailOutbox:
+    return enqueue_email(session, 'email_verification', EmailService.verification_email_data(user), user.id)
+
+
+async def outbox_depth(session: AsyncSession) -> Dict[str, int]:
+    """Number of pending and dead-lettered emails."""
+    query = (
+        select(EmailOutbox.status, func.count()).where(EmailOutbox.status != OutboxStatus.SENT)
+        .group_by(EmailOutbox.status)
+    )
+    result = await execute_read(session, query)
+    depth = {OutboxStatus.PENDING.value: 0, OutboxStatus.DEAD.value: 0}
+    depth.update({status.value: count for status, count in result.all()})
+    return depth
+
+
+class EmailOutboxDispatcher:
+    """
+    Drains the email outbox in the background.
+
+    Each poll claims a batch of due emails with FOR UPDATE SKIP LOCKED and pushes their next
+    attempt time out by a lease, so several dispatchers (one per worker process) never send
+    the same email at once, and emails claimed by a dispatcher that dies are retried once the
+    lease expires. Failed sends are retried with exponential backoff and dead-lettered after
+    max_attempts.
+    """
+
+    # Started dispatchers in this process, so code without access to the app can wake them
+    running_dispatchers: Set["EmailOutboxDispatcher"] = set()
+
+    def __init__(
+        self,
+        email_service: EmailService,
+        session_factory=None,
+        batch_size: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        lease_seconds: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+        backoff_max: Optional[float] = None,
+    ):
+        self.email_service = email_service
+        self.session_factory = session_factory
+        self.batch_size = batch_size or settings.email_outbox_batch_size
+        self.poll_interval = poll_interval or settings.email_outbox_poll_interval
+        self.lease_seconds = lease_seconds or settings.email_outbox_lease_seconds
+        self.max_attempts = max_attempts or settings.email_outbox_max_attempts
+        self.backoff_base = backoff_base or settings.email_outbox_backoff_base
+        self.backoff_max = backoff_max or settings.email_outbox_backoff_max
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._sent = 0
+        self._retried = 0
+        self._dead_lettered = 0
+        self._send_total_ms = 0.0
+        self._send_max_ms = 0.0
+
+    def backoff(self, attempts: int) -> float:
+        """Seconds to wait before retrying an email that has failed attempts times."""
+        return min(self.backoff_base * 2 ** (attempts - 1), self.backoff_max)
+
+    async def run_once(self) -> int:
+        """Claim and send one batch of due emails; returns how many were claimed."""
+        session_factory = self.session_factory or Database.get_session_factory()
+        async with session_factory() as session:
+            claimed = await self._claim(session)
+            # Sends run concurrently, bounded by the SMTP client's pool; status updates share the session
+            errors = await asyncio.gather(*(self._send(entry) for entry in claimed))
+            for entry, error in zip(claimed, errors):
+                if error is None:
+                    await self._mark_sent(session, entry)
+                else:
+                    await self._record_failure(session, entry, error)
+        return len(claimed)
+
+    async def _claim(self, session: AsyncSession) -> List[Any]:
+        due = (
+            select(EmailOutbox.id)
+            .where(EmailOutbox.status == OutboxStatus.PENDING, EmailOutbox.next_attempt_at <= func.now())
+            .order_by(EmailOutbox.id).limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        query = (
+            update(EmailOutbox).where(EmailOutbox.id.in_(due.scalar_subquery()))
+            .values(
+                attempts=EmailOutbox.attempts + 1,
+                next_attempt_at=func.now() + timedelta(seconds=self.lease_seconds),
+            )
+            .returning(EmailOutbox.id, EmailOutbox.email_type, EmailOutbox.payload, EmailOutbox.attempts)
+            .execution_options(synchronize_session=False)
+        )
+        result = await execute_write(session, query)
+        return sorted(result.all(), key=lambda entry: entry.id)
+
+    async def _send(self, entry) -> Optional[Exception]:
+        started = time.perf_counter()
+        try:
+            await self.email_service.send_user_email(entry.payload, entry.email_type)
+        except Exception as e:
+            return e
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._sent += 1
+        self._send_total_ms += elapsed_ms
+        self._send_max_ms = max(self._send_max_ms, elapsed_ms)
+        return None
+
+    async def _mark_sent(self, session: AsyncSession, entry):
+        await execute_write(
+            session,
+            update(EmailOutbox).where(EmailOutbox.id == entry.id)
+            .values(status=OutboxStatus.SENT, sent_at=func.now(), last_error=None)
+            .execution_options(synchronize_session=False),
+        )
+
+    async def _record_failure(self, session: AsyncSession, entry, error: Exception):
+        values = {"last_error": str(error)[:LAST_ERROR_MAX_LENGTH]}
+        if entry.attempts >= self.max_attempts:
+            logger.error(f"Dead-lettering outbox email {entry.id} after {entry.attempts} attempts: {error}")
+            values["status"] = OutboxStatus.DEAD
+            self._dead_lettered += 1
+        else:
+            logger.warning(f"Outbox email {entry.id} failed (attempt {entry.attempts}), retrying: {error}")
+            values["next_attempt_at"] = func.now() + timedelta(seconds=self.backoff(entry.attempts))
+            self._retried += 1
+        await execute_write(
+            session,
+            update(EmailOutbox).where(EmailOutbox.id == entry.id).values(**values)
+            .execution_options(synchronize_session=False),
+        )
+
+    async def run(self):
+        """Poll until cancelled, sleeping between polls unless notify() is called or the last batch was full."""
+        while True:
+            try:
+                claimed = await self.run_once()
+            except Exception as e:
+                logger.error(f"Email outbox poll failed: {e}")
+                claimed = 0
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    def notify(self):
+        """Wake the dispatcher, e.g. after committing a new outbox row."""
+        self._wakeup.set()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.create_task(self.run())
+            self.running_dispatchers.add(self)
+
+    async def stop(self):
+        self.running_dispatchers.discard(self)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "sent": self._sent,
+            "retried": self._retried,
+            "dead_lettered": self._dead_lettered,
+            "avg_send_ms": round(self._send_total_ms / self._sent, 2) if self._sent else 0.0,
+            "max_send_ms": round(self._send_max_ms, 2),
+        }
+
+
+def notify_email_dispatcher():
+    """Wake this process's running dispatchers; new outbox rows are otherwise picked up on the next poll."""
+    for dispatcher in EmailOutboxDispatcher.running_dispatchers:
+        dispatcher.notify()
@@ -1,17 +1,24 @@
 # email_service.py
-from builtins import ValueError, dict, str
+from builtins import ValueError, dict, isinstance, str
+import asyncio
 from settings.config import settings
-from app.utils.smtp_connection import SMTPClient
+from app.utils.smtp_connection import AsyncSMTPClient, create_smtp_client
 from app.utils.template_manager import TemplateManager
 from app.models.user_model import User
 
 class EmailService:
+    subject_map = {
+        'email_verification': "Verify Your Account",
+        'password_reset': "Password Reset Instructions",
+        'account_locked': "Account Locked Notification"
+    }
+
     def __init__(self, template_manager: TemplateManager):
         if not settings.smtp_server or not settings.smtp_port or not settings.smtp_username or not settings.smtp_password:
             print("SMTP settings not configured. Email service will not work.")
             self.smtp_client = None
         else:
-            self.smtp_client = SMTPClient(
+            self.smtp_client = create_smtp_client(
                 server=settings.smtp_server,
                 port=settings.smtp_port,
                 username=settings.smtp_username,
@@ -22,24 +29,33 @@ class EmailService:
     async def send_user_email(self, user_data: dict, email_type: str):
         if not self.smtp_client:
             return
-        subject_map = {
-            'email_verification': "Verify Your Account",
-            'password_reset': "Password Reset Instructions",
-            'account_locked': "Account Locked Notification"
-        }
-
-        if email_type not in subject_map:
+        if email_type not in self.subject_map:
             raise ValueError("Invalid email type")
 
         html_content = self.template_manager.render_template(email_type, **user_data)
-        self.smtp_client.send_email(subject_map[email_type], html_content, user_data['email'])
+        if isinstance(self.smtp_client, AsyncSMTPClient):
+            await self.smtp_client.send_email(self.subject_map[email_type], html_content, user_data['email'])
+        else:
+            # smtplib blocks; keep it off the event loop
+            await asyncio.to_thread(self.smtp_client.send_email, self.subject_map[email_type], html_content, user_data['email'])
+
+    async def close(self):
+        """Close pooled SMTP sessions."""
+        if isinstance(self.smtp_client, AsyncSMTPClient):
+            await self.smtp_client.close()
+        elif self.smtp_client:
+            self.smtp_client.close()
+
+    @staticmethod
+    def verification_email_data(user: User) -> dict:
+        """Template context for a user's verification email; also what the outbox stores."""
+        return {
+            "name": user.first_name,
+            "verification_url": f"{settings.server_base_url}verify-email/{user.id}/{user.verification_token}",
+            "email": user.email
+        }
 
     async def send_verification_email(self, user: User):
         if not self.smtp_client:
             return
-        verification_url = f"{settings.server_base_url}verify-email/{user.id}/{user.verification_token}"
-        await self.send_user_email({
-            "name": user.first_name,
-            "verification_url": verification_url,
-            "email": user.email
-        }, 'email_verification')
\ No newline at end of file
+        await self.send_user_email(self.verification_email_data(user), 'email_verification')
@@ -2,8 +2,12 @@
 from builtins import dict, str
 import jwt
 from datetime import datetime, timedelta
+from app.utils.token_cache import TokenCache
 from settings.config import settings
 
+# Claims of recently verified tokens, so repeat requests with the same token skip jwt.decode
+verified_token_cache = TokenCache(max_size=settings.token_cache_size)
+
 # Function to create access token
 def create_access_token(*, data: dict, expires_delta: timedelta = None):
     """
@@ -73,3 +77,15 @@ def decode_token(token: str):
     except jwt.InvalidTokenError:
         print("Token is invalid.")
         return None
+
+def decode_token_cached(token: str):
+    """
+    Like decode_token, but reuses the claims of a token verified earlier in this process
+    (see verified_token_cache); the cache drops tokens at their exp.
+    """
+    claims = verified_token_cache.get(token)
+    if claims is None:
+        claims = decode_token(token)
+        if claims is not None:
+            verified_token_cache.put(token, claims)
+    return claims
@@ -0,0 +1,117 @@
+from builtins import KeyError, TypeError, ValueError, classmethod, str
+from datetime import datetime, timedelta, timezone
+import logging
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID, uuid4
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import execute_write
+from app.models.refresh_token_model import RefreshToken
+from app.models.user_model import User
+from app.services.jwt_service import create_refresh_token, decode_token
+from settings.config import settings
+
+logger = logging.getLogger(__name__)
+
+REFRESH_TOKEN_TYPE = "refresh"
+
+
+class RefreshTokenService:
+    """
+    Issues and rotates refresh tokens.
+
+    A refresh token is a signed JWT naming its jti and family; the refresh_tokens table
+    records which jtis have been used. Refreshing needs one HMAC check and two statements in
+    one transaction, no password hashing. Reusing an already-rotated token revokes its
+    whole family, so a stolen token stops working for both the thief and the owner.
+    """
+
+    @classmethod
+    def _new_token(cls, user_id: UUID, family_id: UUID) -> Tuple[str, Dict[str, Any]]:
+        jti = uuid4()
+        lifetime = timedelta(minutes=settings.refresh_token_expire_minutes)
+        token = create_refresh_token(
+            data={"sub": str(user_id), "jti": str(jti), "fam": str(family_id), "type": REFRESH_TOKEN_TYPE},
+            expires_delta=lifetime,
+        )
+        values = {"jti": jti, "family_id": family_id, "user_id": user_id, "expires_at": datetime.now(timezone.utc) + lifetime}
+        return token, values
+
+    @classmethod
+    async def issue(cls, session: AsyncSession, user_id: UUID) -> str:
+        """Start a new token family for user_id, e.g. at login."""
+        token, values = cls._new_token(user_id, uuid4())
+        await execute_write(session, insert(RefreshToken).values(**values))
+        return token
+
+    @classmethod
+    async def rotate(cls, session: AsyncSession, token: str) -> Optional[Tuple[Any, str]]:
+        """
+        Exchange token for a new refresh token in the same family. Returns the user's
+        (id, role, token_epoch) row and the new token, or None if token is invalid, expired, revoked,
+        already used, or belongs to a locked user.
+        """
+        claims = decode_token(token)
+        if not claims or claims.get("type") != REFRESH_TOKEN_TYPE:
+            return None
+        try:
+            jti = UUID(claims["jti"])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+        # Claim the token and read the user in one statement; the WHERE clause does every check.
+        # Built on the tables: an ORM bulk UPDATE can't return columns of the joined users table.
+        tokens, users = RefreshToken.__table__, User.__table__
+        claim = (
+            update(tokens)
+            .where(
+                tokens.c.jti == jti,
+                tokens.c.used_at.is_(None),
+                tokens.c.revoked_at.is_(None),
+                tokens.c.expires_at > func.now(),
+                users.c.id == tokens.c.user_id,
+                users.c.is_locked.is_(False),
+            )
+            .values(used_at=func.now())
+            .returning(tokens.c.family_id, users.c.id, users.c.role, users.c.token_epoch)
+        )
+        try:
+            result = await session.execute(claim)
+            user = result.first()
+            if user is None:
+                await cls._revoke_if_reused(session, jti)
+                await session.commit()
+                return None
+            new_token, values = cls._new_token(user.id, user.family_id)
+            await session.execute(insert(RefreshToken).values(**values))
+            await session.commit()
+        except SQLAlchemyError as e:
+            logger.error(f"Database error: {e}")
+            await session.rollback()
+            return None
+        return user, new_token
+
+    @classmethod
+    async def _revoke_if_reused(cls, session: AsyncSession, jti: UUID):
+        used_family = select(RefreshToken.family_id).where(RefreshToken.jti == jti, RefreshToken.used_at.is_not(None))
+        query = (
+            update(RefreshToken)
+            .where(RefreshToken.family_id == used_family.scalar_subquery(), RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.execute(query)
+        if result.rowcount:
+            logger.warning(f"Refresh token {jti} was reused; revoked its token family")
+
+    @classmethod
+    async def revoke_user_tokens(cls, session: AsyncSession, user_id: UUID):
+        """Revoke every outstanding refresh token of user_id, e.g. on logout everywhere."""
+        query = (
+            update(RefreshToken)
+            .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        await execute_write(session, query)
@@ -0,0 +1,158 @@
+from builtins import Exception, bool, dict, float, int, isinstance, len, max, round, str
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import func, insert, or_, select, update
+from app.database import Database
+from app.models.token_revocation_model import TokenRevocation
+from app.models.user_model import User
+from settings.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Epoch recorded for a deleted user: no token can carry one this high
+DELETED_EPOCH = 2**31 - 1
+# Ids are allocated at INSERT but become visible at COMMIT, so a slow transaction can commit a
+# lower id after a poll has moved past it. Each poll also re-reads this many seconds of rows.
+REVOCATION_LOOKBACK_SECONDS = 10
+
+
+def bump_token_epoch(user_id: UUID):
+    """
+    Statement that increments the user's token epoch and records the revocation, returning
+    the new epoch. Execute it in the transaction that makes the change it is for.
+    """
+    users, revocations = User.__table__, TokenRevocation.__table__
+    bumped = (
+        update(users).where(users.c.id == user_id).values(token_epoch=users.c.token_epoch + 1)
+        .returning(users.c.id, users.c.token_epoch)
+        .cte("bumped")
+    )
+    return (
+        insert(revocations).from_select(["user_id", "epoch"], select(bumped.c.id, bumped.c.token_epoch))
+        .returning(revocations.c.epoch)
+    )
+
+
+def record_deletion(user_id: UUID):
+    """Statement that revokes every token of a user being deleted."""
+    return insert(TokenRevocation).values(user_id=user_id, epoch=DELETED_EPOCH)
+
+
+class TokenEpochIndex:
+    """
+    The lowest token epoch still accepted for each user whose tokens were ever revoked.
+
+    Checking a token is a dict lookup. Revocations made by this process are applied as soon
+    as they commit; those made by other processes are picked up by polling the
+    token_revocations table every poll_interval seconds. Only revocations younger than the
+    access token lifetime are kept, since every token they could reject has expired; each
+    poll drops the ones that have aged out.
+    """
+
+    def __init__(self, session_factory=None, poll_interval: Optional[float] = None):
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval or settings.token_epoch_poll_interval
+        # user id -> (lowest accepted epoch, when it was revoked as a Unix timestamp)
+        self._epochs: Dict[str, Tuple[int, float]] = {}
+        self._last_id = 0
+        self._loaded = False
+        self._task: Optional[asyncio.Task] = None
+        self._polls = 0
+        self._poll_errors = 0
+        self._last_poll: Optional[float] = None
+
+    def is_current(self, user_id: str, epoch: Any) -> bool:
+        """Whether a token for user_id carrying epoch is still valid; tokens without one carry 0."""
+        if epoch is None:
+            epoch = 0
+        if not isinstance(epoch, int):
+            return False
+        entry = self._epochs.get(user_id)
+        return entry is None or epoch >= entry[0]
+
+    def apply(self, user_id: Any, epoch: int, revoked_at: Optional[float] = None):
+        key = str(user_id)
+        entry = self._epochs.get(key)
+        if entry is None or epoch > entry[0]:
+            self._epochs[key] = (epoch, revoked_at if revoked_at is not None else time.time())
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Drop revocations older than the access token lifetime; returns how many were dropped."""
+        # The lookback also covers clock skew between this process and the database
+        cutoff = (now or time.time()) - settings.access_token_expire_minutes * 60 - REVOCATION_LOOKBACK_SECONDS
+        expired = [user_id for user_id, (_, revoked_at) in self._epochs.items() if revoked_at < cutoff]
+        for user_id in expired:
+            del self._epochs[user_id]
+        return len(expired)
+
+    def clear(self):
+        self._epochs.clear()
+        self._last_id = 0
+        self._loaded = False
+
+    async def refresh(self) -> int:
+        """Apply revocations committed since the last poll; returns how many rows were read."""
+        if self._loaded:
+            lookback = func.now() - timedelta(seconds=REVOCATION_LOOKBACK_SECONDS)
+            recent = or_(TokenRevocation.id > self._last_id, TokenRevocation.created_at > lookback)
+        else:
+            recent = TokenRevocation.created_at > func.now() - timedelta(minutes=settings.access_token_expire_minutes)
+        query = select(
+            TokenRevocation.id, TokenRevocation.user_id, TokenRevocation.epoch, TokenRevocation.created_at
+        ).where(recent)
+        session_factory = self.session_factory or Database.get_session_factory()
+        async with session_factory() as session:
+            rows = (await session.execute(query)).all()
+        for row in rows:
+            self.apply(row.user_id, row.epoch, row.created_at.timestamp())
+            self._last_id = max(self._last_id, row.id)
+        self.prune()
+        self._loaded = True
+        self._polls += 1
+        self._last_poll = time.time()
+        return len(rows)
+
+    async def run(self):
+        """Poll until cancelled."""
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                self._poll_errors += 1
+                logger.error(f"Token revocation poll failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "revoked_users": len(self._epochs),
+            "last_revocation_id": self._last_id,
+            "polls": self._polls,
+            "poll_errors": self._poll_errors,
+            "seconds_since_poll": round(time.time() - self._last_poll, 3) if self._last_poll else None,
+        }
+
+
+# Shared by every request in this process
+token_epochs = TokenEpochIndex()
@@ -0,0 +1,282 @@
+from builtins import ValueError, classmethod, dict, enumerate, isinstance, iter, len, list, range, set, str, zip
+import asyncio
+import csv
+import itertools
+import json
+import logging
+import uuid
+from concurrent.futures import Executor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import execute_read
+from app.models.email_outbox_model import EmailOutbox
+from app.models.user_model import User, UserRole
+from app.schemas.user_schemas import UserCreate, UserImportReport
+from app.services.count_service import CountService
+from app.services.email_outbox import notify_email_dispatcher, outbox_values
+from app.services.email_service import EmailService
+from app.utils.nickname_gen import generate_nicknames
+from app.utils.security import PasswordHashQueueFull, generate_verification_token, hash_passwords_async
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = 1000
+# Each batch looks up its emails with one IN (...) list, itself bound parameter by parameter
+MAX_IMPORT_BATCH_SIZE = 10000
+# asyncpg (the PostgreSQL wire protocol) allows at most 32767 bind parameters per statement.
+# A multi-row INSERT binds every column of every row, so it can carry this many rows.
+ROWS_PER_INSERT = 32767 // len(User.__table__.columns)
+# Retries of an INSERT whose generated nicknames another writer took after they were checked
+NICKNAME_INSERT_ATTEMPTS = 3
+# Imported accounts must never be able to grant themselves elevated privileges
+IMPORT_FORBIDDEN_ROLES = {UserRole.ADMIN, UserRole.MANAGER}
+IMPORT_COLUMNS = (
+    "nickname", "email", "first_name", "last_name", "bio", "profile_picture_url",
+    "linkedin_profile_url", "github_profile_url", "role",
+)
+
+# (row number, parsed row or None, parse error or None)
+ImportRow = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+def read_csv_rows(lines: Iterable[str]) -> Iterator[ImportRow]:
+    """Parse CSV with a header row, lazily, one record at a time."""
+    for row_number, record in enumerate(csv.DictReader(lines), start=1):
+        yield row_number, record, None
+
+
+def read_ndjson_rows(lines: Iterable[str]) -> Iterator[ImportRow]:
+    """Parse newline-delimited JSON objects, skipping blank lines."""
+    row_number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_number, None, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield row_number, None, "Expected a JSON object"
+            continue
+        yield row_number, record, None
+
+
+def read_rows(lines: Iterable[str], fmt: str) -> Iterator[ImportRow]:
+    if fmt == "csv":
+        return read_csv_rows(lines)
+    if fmt == "ndjson":
+        return read_ndjson_rows(lines)
+    raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in err['loc']) or 'row'}: {err['msg']}" for err in error.errors())
+
+
+class UserImportService:
+    """
+    Bulk-loads users from a stream of rows. Rows are read and validated a batch at a time,
+    passwords are hashed in parallel and each batch is written in one transaction with
+    multi-row INSERT ... ON CONFLICT DO NOTHING statements, so a bad or duplicate row only
+    fails itself and a batch the database rejects only fails its own rows.
+    """
+
+    @classmethod
+    async def import_users(
+        cls,
+        session: AsyncSession,
+        rows: Iterable[ImportRow],
+        batch_size: int = IMPORT_BATCH_SIZE,
+        executor: Optional[Executor] = None,
+    ) -> UserImportReport:
+        """
+        Import rows (see read_rows) and return a report with one entry per rejected row.
+
+        Rows are pulled from rows a batch at a time on a worker thread, so reading and parsing
+        a file never blocks the event loop. Passwords are hashed on executor when given (e.g. a
+        process pool dedicated to a command-line import), otherwise on the shared password
+        hashing pool. Verification emails are queued in the email outbox with each batch, not
+        sent here.
+
+        :raises ValueError: If batch_size is not between 1 and MAX_IMPORT_BATCH_SIZE.
+        """
+        if not 1 <= batch_size <= MAX_IMPORT_BATCH_SIZE:
+            raise ValueError(f"batch_size must be between 1 and {MAX_IMPORT_BATCH_SIZE}")
+        report = UserImportReport()
+        rows = iter(rows)
+        while True:
+            batch: List[ImportRow] = await asyncio.to_thread(list, itertools.islice(rows, batch_size))
+            if not batch:
+                break
+            await cls._import_batch(session, batch, report, executor)
+        return report
+
+    @classmethod
+    def _validate(cls, record: Dict[str, Any]) -> Dict[str, Any]:
+        # CSV has no nulls; treat empty cells as missing
+        data = {key: value for key, value in record.items() if value not in ("", None)}
+        data.setdefault("role", UserRole.ANONYMOUS.name)
+        validated = UserCreate(**data).model_dump()
+        if validated["role"] in IMPORT_FORBIDDEN_ROLES:
+            raise ValueError(f"role {validated['role'].name} cannot be assigned by import")
+        return validated
+
+    @classmethod
+    async def _import_batch(
+        cls,
+        session: AsyncSession,
+        batch: List[ImportRow],
+        report: UserImportReport,
+        executor: Optional[Executor],
+    ):
+        report.total_rows += len(batch)
+        pending: List[Tuple[int, Dict[str, Any]]] = []
+        seen_emails = set()
+        seen_nicknames = set()
+        for row_number, record, error in batch:
+            if error:
+                report.add_error(row_number, None, error)
+                continue
+            email = record.get("email")
+            try:
+                data = cls._validate(record)
+            except ValidationError as e:
+                report.add_error(row_number, email, _format_validation_error(e))
+                continue
+            except ValueError as e:
+                report.add_error(row_number, email, str(e))
+                continue
+            if data["email"] in seen_emails:
+                report.add_error(row_number, data["email"], "Duplicate email in import")
+                continue
+            if data["nickname"] and data["nickname"] in seen_nicknames:
+                report.add_error(row_number, data["email"], "Duplicate nickname in import")
+                continue
+            seen_emails.add(data["email"])
+            if data["nickname"]:
+                seen_nicknames.add(data["nickname"])
+            pending.append((row_number, data))
+        if not pending:
+            return
+
+        try:
+            existing, taken_nicknames, created = await cls._write_batch(session, pending, seen_emails, seen_nicknames, executor)
+        except (SQLAlchemyError, PasswordHashQueueFull) as e:
+            # Earlier batches stay committed; report this one's rows so they can be retried
+            await session.rollback()
+            logger.error(f"Import batch of {len(pending)} rows failed: {e}")
+            for row_number, data in pending:
+                report.add_error(row_number, data["email"], "Batch could not be written; retry these rows")
+            return
+
+        inserted = {row.email for row in created}
+        for row_number, data in pending:
+            if data["email"] in existing:
+                report.add_error(row_number, data["email"], "Email already exists")
+            elif data["nickname"] in taken_nicknames:
+                report.add_error(row_number, data["email"], "Nickname already exists")
+            elif data["email"] not in inserted:
+                # Another writer created a user with this email since the check
+                report.add_error(row_number, data["email"], "Conflicts with an existing user")
+        report.created += len(created)
+        if created:
+            CountService.invalidate(User)
+            notify_email_dispatcher()
+        logger.info(f"Imported {len(created)} of {len(batch)} rows")
+
+    @classmethod
+    async def _write_batch(
+        cls,
+        session: AsyncSession,
+        pending: List[Tuple[int, Dict[str, Any]]],
+        emails: Set[str],
+        nicknames: Set[str],
+        executor: Optional[Executor],
+    ) -> Tuple[Set[str], Set[str], List[Any]]:
+        """
+        Hash, insert and commit one batch of validated rows. Returns the emails and supplied
+        nicknames that were already taken, whose rows are skipped, and the created users.
+        """
+        result = await execute_read(session, select(User.email).where(User.email.in_(emails)))
+        existing = set(result.scalars().all())
+        taken_nicknames = set()
+        if nicknames:
+            result = await execute_read(session, select(User.nickname).where(User.nickname.in_(nicknames)))
+            taken_nicknames = set(result.scalars().all())
+        pending = [
+            (row_number, data) for row_number, data in pending
+            if data["email"] not in existing and data["nickname"] not in taken_nicknames
+        ]
+        if not pending:
+            return existing, taken_nicknames, []
+
+        hashed_passwords = await hash_passwords_async([data.pop("password") for _, data in pending], executor)
+        values = [
+            {
+                **{column: data[column] for column in IMPORT_COLUMNS},
+                "id": uuid.uuid4(),
+                "hashed_password": hashed_password,
+                "verification_token": generate_verification_token(),
+                "email_verified": False,
+                "is_locked": False,
+                "is_professional": False,
+                "failed_login_attempts": 0,
+            }
+            for (_, data), hashed_password in zip(pending, hashed_passwords)
+        ]
+        generated = [row for row in values if not row["nickname"]]
+        generated_ids = {row["id"] for row in generated}
+        reserved = set(nicknames)
+        await cls._assign_nicknames(session, generated, reserved)
+
+        created = []
+        for start in range(0, len(values), ROWS_PER_INSERT):
+            chunk = values[start:start + ROWS_PER_INSERT]
+            for attempt in range(NICKNAME_INSERT_ATTEMPTS):
+                # Only an email taken since the check is skipped; a nickname clash raises instead
+                query = (
+                    pg_insert(User).values(chunk).on_conflict_do_nothing(index_elements=[User.email])
+                    .returning(User.id, User.email, User.first_name, User.verification_token)
+                )
+                try:
+                    async with session.begin_nested():
+                        rows = (await session.execute(query)).all()
+                    break
+                except IntegrityError as e:
+                    retry = [row for row in chunk if row["id"] in generated_ids]
+                    if not retry or "ix_users_nickname" not in str(e.orig) or attempt == NICKNAME_INSERT_ATTEMPTS - 1:
+                        raise
+                    # Another writer took a generated nickname after it was checked; draw them again
+                    await cls._assign_nicknames(session, retry, reserved)
+            created.extend(rows)
+        if created:
+            outbox = [
+                outbox_values('email_verification', EmailService.verification_email_data(user), user.id)
+                for user in created
+            ]
+            await session.execute(insert(EmailOutbox), outbox)
+        await session.commit()
+        return existing, taken_nicknames, created
+
+    @classmethod
+    async def _assign_nicknames(cls, session: AsyncSession, rows: List[Dict[str, Any]], reserved: Set[str]):
+        """
+        Give each of rows a generated nickname that no user has and that isn't in reserved,
+        checking each round of candidates with one query. Assigned nicknames are added to reserved.
+        """
+        unassigned = rows
+        while unassigned:
+            candidates = [nickname for nickname in generate_nicknames(len(unassigned)) if nickname not in reserved]
+            result = await execute_read(session, select(User.nickname).where(User.nickname.in_(candidates)))
+            taken = set(result.scalars().all())
+            free = [nickname for nickname in candidates if nickname not in taken]
+            for row, nickname in zip(unassigned, free):
+                row["nickname"] = nickname
+                reserved.add(nickname)
+            unassigned = unassigned[len(free):]
@@ -1,17 +1,27 @@
-from builtins import Exception, bool, classmethod, int, str
+from builtins import Exception, bool, classmethod, dict, int, list, range, set, str
 from datetime import datetime, timezone
 import secrets
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Sequence, Tuple
 from pydantic import ValidationError
-from sqlalchemy import func, null, update, select
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import Row, and_, bindparam, case, event, func, insert, not_, null, or_, true, update, select, tuple_
+from sqlalchemy.exc import IntegrityError, InvalidRequestError, SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from app.database import execute_read, execute_write
 from app.dependencies import get_email_service, get_settings
+from app.services.count_service import CountMode, CountService
+from app.services.email_outbox import enqueue_verification_email, notify_email_dispatcher
+from app.services.token_epoch import DELETED_EPOCH, bump_token_epoch, record_deletion, token_epochs
+from app.models.token_revocation_model import TokenRevocation
 from app.models.user_model import User
 from app.schemas.user_schemas import UserCreate, UserUpdate
-from app.utils.nickname_gen import generate_nickname
-from app.utils.security import generate_verification_token, hash_password, verify_password
-from uuid import UUID
+from app.utils.cursor import NEXT, PREV, decode_cursor, encode_cursor
+from app.utils.dataloader import DataLoader
+from app.utils.identity_cache import IdentityCache
+from app.utils.nickname_gen import generate_nicknames
+from app.utils.security import generate_verification_token, hash_password_async, needs_rehash, verify_password_async
+from uuid import UUID, uuid4
 from app.services.email_service import EmailService
 from app.models.user_model import UserRole
 import logging
@@ -19,23 +29,101 @@ import logging
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+NICKNAME_BATCH_SIZE = 8
+NICKNAME_INSERT_ATTEMPTS = 3
+
+# The hot lookups, built once with bound parameters instead of on every call. SQLAlchemy then
+# finds their compiled SQL by a memoized cache key, and asyncpg reuses the prepared statement.
+USER_BY_KEY = {key: select(User).where(getattr(User, key) == bindparam("value")) for key in ("id", "email", "nickname")}
+# Only the columns needed to authenticate, not the whole profile
+LOGIN_CREDENTIALS = (
+    select(User.id, User.hashed_password, User.email_verified, User.is_locked)
+    .where(User.email == bindparam("email"))
+)
+LIST_USERS = select(User).offset(bindparam("skip")).limit(bindparam("limit"))
+
+USER_CACHE_KEY = "user_cache"
+
+@event.listens_for(Session, "after_soft_rollback")
+def _clear_user_cache(session, previous_transaction):
+    # A rollback expires every loaded instance; serving one from the cache would then
+    # lazy-load its attributes, which async sessions can't do
+    cache = session.info.get(USER_CACHE_KEY)
+    if cache is not None:
+        cache.clear()
+
 class UserService:
     @classmethod
     async def _execute_query(cls, session: AsyncSession, query):
+        """Run a single mutating statement and commit it; reads go through _execute_read."""
+        try:
+            return await execute_write(session, query)
+        except SQLAlchemyError as e:
+            logger.error(f"Database error: {e}")
+            await session.rollback()
+            return None
+
+    @classmethod
+    async def _execute_read(cls, session: AsyncSession, query, params=None, replica: bool = False):
+        """Run a SELECT without a COMMIT round trip, on a read replica if replica; see database.execute_read."""
         try:
-            result = await session.execute(query)
-            await session.commit()
-            return result
+            return await execute_read(session, query, params, replica=replica)
         except SQLAlchemyError as e:
             logger.error(f"Database error: {e}")
             await session.rollback()
             return None
 
     @classmethod
-    async def _fetch_user(cls, session: AsyncSession, **filters) -> Optional[User]:
-        query = select(User).filter_by(**filters)
+    async def _update_returning(cls, session: AsyncSession, user_id: UUID, *criteria, **values) -> Optional[User]:
+        """
+        Apply values to the user with user_id (and matching any extra criteria) with one
+        UPDATE ... RETURNING and return the updated row, or None if no row matched or the
+        update failed.
+        """
+        loaded = session.identity_map.get(session.identity_key(User, user_id))
+        if loaded is not None:
+            # Returned rows only repopulate expired attributes of an already-loaded instance
+            session.expire(loaded)
+        cls._user_cache(session).discard(user_id)
+        query = (
+            update(User).where(User.id == user_id, *criteria).values(**values).returning(User)
+            .execution_options(synchronize_session=False)
+        )
         result = await cls._execute_query(session, query)
-        return result.scalars().first() if result else None
+        user = result.scalars().first() if result else None
+        if user is None and loaded is not None:
+            # Nothing matched, so reload the instance expired above rather than leave it unusable
+            try:
+                await session.refresh(loaded)
+            except InvalidRequestError:
+                session.expunge(loaded)
+        return cls._user_cache(session).put(user) if user else None
+
+    @classmethod
+    def _user_cache(cls, session: AsyncSession) -> IdentityCache:
+        """Users already loaded by this session (i.e. this request), indexed by id, email and nickname."""
+        cache = session.info.get(USER_CACHE_KEY)
+        if cache is None:
+            cache = session.info[USER_CACHE_KEY] = IdentityCache(("id", "email", "nickname"))
+        return cache
+
+    @classmethod
+    async def _fetch_user(cls, session: AsyncSession, replica: bool = True, **filters) -> Optional[User]:
+        cache = cls._user_cache(session)
+        query, params = None, None
+        if len(filters) == 1:
+            (attr, value), = filters.items()
+            if attr in cache.key_attrs:
+                cached = cache.get(attr, value)
+                if cached is not None:
+                    return cached
+            if attr in USER_BY_KEY:
+                query, params = USER_BY_KEY[attr], {"value": value}
+        if query is None:
+            query = select(User).filter_by(**filters)
+        result = await cls._execute_read(session, query, params, replica=replica)
+        user = result.scalars().first() if result else None
+        return cache.put(user) if user else None
 
     @classmethod
     async def get_by_id(cls, session: AsyncSession, user_id: UUID) -> Optional[User]:
@@ -49,40 +137,128 @@ class UserService:
     async def get_by_email(cls, session: AsyncSession, email: str) -> Optional[User]:
         return await cls._fetch_user(session, email=email)
 
+    @classmethod
+    async def get_fields_by_id(cls, session: AsyncSession, user_id: UUID, fields: Sequence[str]) -> Optional[Row]:
+        """
+        Only the named columns of the user with user_id, as a row. Skips the ORM and the
+        session's user cache, so columns that weren't asked for are never read.
+        """
+        query = select(*cls._columns(fields)).where(User.id == user_id)
+        result = await cls._execute_read(session, query, replica=True)
+        return result.first() if result else None
+
+    @classmethod
+    def _columns(cls, fields: Sequence[str]) -> List:
+        return [User.__table__.c[field] for field in fields]
+
+    @classmethod
+    async def get_many_by_ids(cls, session: AsyncSession, user_ids: List[UUID]) -> List[User]:
+        """Fetch the users with the given IDs in one query, in input order, skipping unknown IDs."""
+        users = await cls._fetch_many(session, User.id, user_ids)
+        return [users[user_id] for user_id in user_ids if user_id in users]
+
+    @classmethod
+    async def get_many_by_emails(cls, session: AsyncSession, emails: List[str]) -> List[User]:
+        """Fetch the users with the given emails in one query, in input order, skipping unknown emails."""
+        users = await cls._fetch_many(session, User.email, emails)
+        return [users[email] for email in emails if email in users]
+
+    @classmethod
+    async def _fetch_many(cls, session: AsyncSession, column, values) -> Dict:
+        cache = cls._user_cache(session)
+        found = {}
+        for value in values:
+            cached = cache.get(column.key, value)
+            if cached is not None:
+                found[value] = cached
+        missing = set(values) - found.keys()
+        if missing:
+            query = select(User).where(column.in_(missing))
+            result = await cls._execute_read(session, query, replica=True)
+            for user in (result.scalars().all() if result else []):
+                found[getattr(user, column.key)] = cache.put(user)
+        return found
+
+    @classmethod
+    def get_loader(cls, session: AsyncSession, field: str = "id") -> DataLoader:
+        """
+        Return the session's batching loader for users keyed by field ("id" or "email").
+
+        The loader lives in session.info, so it is scoped to the request that owns the
+        session; concurrent loads in the same tick become one IN query.
+        """
+        loaders = session.info.setdefault("user_loaders", {})
+        if field not in loaders:
+            column = {"id": User.id, "email": User.email}[field]
+            loaders[field] = DataLoader(lambda keys: cls._fetch_many(session, column, keys))
+        return loaders[field]
+
+    @classmethod
+    async def load_by_id(cls, session: AsyncSession, user_id: UUID) -> Optional[User]:
+        """Like get_by_id, but batched with other loads issued in the same tick."""
+        return await cls.get_loader(session, "id").load(user_id)
+
+    @classmethod
+    async def load_by_email(cls, session: AsyncSession, email: str) -> Optional[User]:
+        """Like get_by_email, but batched with other loads issued in the same tick."""
+        return await cls.get_loader(session, "email").load(email)
+
     @classmethod
     async def create(cls, session: AsyncSession, user_data: Dict[str, str], email_service: EmailService) -> Optional[User]:
+        """
+        Create a user and queue their verification email in the email outbox. The email is
+        delivered by the outbox dispatcher, not by this call.
+        """
         try:
             validated_data = UserCreate(**user_data).model_dump()
 
             
-            if 'nickname' not in validated_data or not validated_data['nickname']:
-                new_nickname = generate_nickname()
-               
-                while await cls.get_by_nickname(session, new_nickname):
-                    new_nickname = generate_nickname()
-                validated_data['nickname'] = new_nickname
-
-            existing_user = await cls.get_by_email(session, validated_data['email'])
+            generated_nickname = 'nickname' not in validated_data or not validated_data['nickname']
+            if generated_nickname:
+                validated_data['nickname'] = await cls._allocate_nickname(session)
+
+            # On the primary: a replica may not have a signup that just committed yet
+            existing_user = await cls._fetch_user(session, replica=False, email=validated_data['email'])
             if existing_user:
                 logger.error("User with given email already exists.")
                 return None
 
-            validated_data['hashed_password'] = hash_password(validated_data.pop('password'))
-            new_user = User(**validated_data)
-            new_user.verification_token = generate_verification_token()
-
-            session.add(new_user)
-            await session.commit()
-            await email_service.send_verification_email(new_user)
+            validated_data['hashed_password'] = await hash_password_async(validated_data.pop('password'))
+            verification_token = generate_verification_token()
+            for attempt in range(NICKNAME_INSERT_ATTEMPTS):
+                new_user = User(id=uuid4(), **validated_data)
+                new_user.verification_token = verification_token
+                session.add(new_user)
+                # Queued in the same transaction, so the email exists if and only if the user does
+                enqueue_verification_email(session, new_user)
+                try:
+                    await session.commit()
+                    break
+                except IntegrityError as e:
+                    await session.rollback()
+                    # Another signup took the allocated nickname between our check and insert
+                    if not generated_nickname or "ix_users_nickname" not in str(e.orig) or attempt == NICKNAME_INSERT_ATTEMPTS - 1:
+                        raise
+                    validated_data['nickname'] = await cls._allocate_nickname(session)
+            CountService.invalidate(User)
+            cls._user_cache(session).put(new_user)
+            notify_email_dispatcher()
             return new_user
         except ValidationError as e:
             logger.error(f"Validation error during user creation: {e}")
             return None
-        # new_nickname = generate_nickname()
-            # while await cls.get_by_nickname(session, new_nickname):
-            #     new_nickname = generate_nickname()
-            # new_user.nickname = new_nickname
 
+    @classmethod
+    async def _allocate_nickname(cls, session: AsyncSession) -> str:
+        """Pick an unused generated nickname, checking a whole batch of candidates per query."""
+        while True:
+            candidates = generate_nicknames(NICKNAME_BATCH_SIZE)
+            query = select(User.nickname).where(User.nickname.in_(candidates))
+            result = await execute_read(session, query)
+            taken = set(result.scalars().all())
+            for candidate in candidates:
+                if candidate not in taken:
+                    return candidate
 
     @classmethod
     async def update(cls, session: AsyncSession, user_id: UUID, update_data: Dict[str, str]) -> Optional[User]:
@@ -91,37 +267,86 @@ class UserService:
             validated_data = UserUpdate(**update_data).dict(exclude_unset=True)
 
             if 'password' in validated_data:
-                validated_data['hashed_password'] = hash_password(validated_data.pop('password'))
-            query = update(User).where(User.id == user_id).values(**validated_data).execution_options(synchronize_session="fetch")
-            await cls._execute_query(session, query)
-            updated_user = await cls.get_by_id(session, user_id)
-            if updated_user:
-                session.refresh(updated_user) 
-                logger.info(f"User {user_id} updated successfully.")
-                return updated_user
-            else:
-                logger.error(f"User {user_id} not found after update attempt.")
-            return None
+                validated_data['hashed_password'] = await hash_password_async(validated_data.pop('password'))
+            revoke_tokens = 'role' in validated_data
+            if revoke_tokens:
+                # Tokens carry the role, so they are revoked in the same transaction as the change
+                await session.execute(bump_token_epoch(user_id))
+            updated_user = await cls._update_returning(session, user_id, **validated_data)
+            if not updated_user:
+                logger.error(f"User {user_id} not found for update.")
+                return None
+            if revoke_tokens:
+                token_epochs.apply(user_id, updated_user.token_epoch)
+            logger.info(f"User {user_id} updated successfully.")
+            return updated_user
         except Exception as e: 
             logger.error(f"Error during user update: {e}")
             return None
 
     @classmethod
     async def delete(cls, session: AsyncSession, user_id: UUID) -> bool:
-        user = await cls.get_by_id(session, user_id)
+        user = await cls._fetch_user(session, replica=False, id=user_id)
         if not user:
             logger.info(f"User with ID {user_id} not found.")
             return False
         await session.delete(user)
+        await session.execute(record_deletion(user_id))
         await session.commit()
+        token_epochs.apply(user_id, DELETED_EPOCH)
+        CountService.invalidate(User)
+        cls._user_cache(session).discard(user_id)
         return True
 
     @classmethod
     async def list_users(cls, session: AsyncSession, skip: int = 0, limit: int = 10) -> List[User]:
-        query = select(User).offset(skip).limit(limit)
-        result = await cls._execute_query(session, query)
+        result = await cls._execute_read(session, LIST_USERS, {"skip": skip, "limit": limit}, replica=True)
         return result.scalars().all() if result else []
 
+    @classmethod
+    async def list_users_keyset(
+        cls, session: AsyncSession, limit: int = 10, cursor: Optional[str] = None, fields: Optional[Sequence[str]] = None
+    ) -> Tuple[List[User], Optional[str], Optional[str]]:
+        """
+        List users ordered by (created_at, id) using keyset pagination, so every page
+        costs one index range scan regardless of how deep it is.
+
+        :param cursor: Opaque cursor from a previous page; None for the first page.
+        :param fields: Select only these columns (plus the sort key) and return rows instead of users.
+        :return: The page of users, the cursor for the next page and the cursor for the previous page.
+        :raises ValueError: If the cursor is malformed.
+        """
+        sort_key = tuple_(User.created_at, User.id)
+        query = select(User) if fields is None else select(*cls._columns(dict.fromkeys([*fields, "created_at", "id"])))
+        direction = NEXT
+        if cursor:
+            created_at, user_id, direction = decode_cursor(cursor)
+            if direction == PREV:
+                query = query.where(sort_key < tuple_(created_at, user_id))
+            else:
+                query = query.where(sort_key > tuple_(created_at, user_id))
+        if direction == PREV:
+            query = query.order_by(User.created_at.desc(), User.id.desc())
+        else:
+            query = query.order_by(User.created_at, User.id)
+        # Fetch one extra row to learn whether another page exists in this direction
+        result = await cls._execute_read(session, query.limit(limit + 1), replica=True)
+        if result is None:
+            users = []
+        else:
+            users = list(result.scalars().all()) if fields is None else list(result.all())
+        has_more = len(users) > limit
+        users = users[:limit]
+        if direction == PREV:
+            users.reverse()
+        if not users:
+            return users, None, None
+
+        first, last = users[0], users[-1]
+        next_cursor = encode_cursor(last.created_at, last.id, NEXT) if has_more or direction == PREV else None
+        prev_cursor = encode_cursor(first.created_at, first.id, PREV) if (cursor and direction == NEXT) or (direction == PREV and has_more) else None
+        return users, next_cursor, prev_cursor
+
     @classmethod
     async def register_user(cls, session: AsyncSession, user_data: Dict[str, str], get_email_service) -> Optional[User]:
         return await cls.create(session, user_data, get_email_service)
@@ -129,26 +354,71 @@ class UserService:
 
     @classmethod
     async def login_user(cls, session: AsyncSession, email: str, password: str) -> Optional[User]:
-        user = await cls.get_by_email(session, email)
-        if user:
-            if user.email_verified is False:
-                return None
-            if user.is_locked:
-                return None
-            if verify_password(password, user.hashed_password):
-                user.failed_login_attempts = 0
-                user.last_login_at = datetime.now(timezone.utc)
-                session.add(user)
-                await session.commit()
-                return user
-            else:
-                user.failed_login_attempts += 1
-                if user.failed_login_attempts >= settings.max_login_attempts:
-                    user.is_locked = True
-                session.add(user)
-                await session.commit()
+        result = await cls._execute_read(session, LOGIN_CREDENTIALS, {"email": email})
+        credentials = result.first() if result else None
+        if not credentials or not credentials.email_verified or credentials.is_locked:
+            return None
+        if await verify_password_async(password, credentials.hashed_password):
+            values = {"failed_login_attempts": 0, "last_login_at": func.now()}
+            if needs_rehash(credentials.hashed_password):
+                values["hashed_password"] = await hash_password_async(password)
+            # Fails if the account was locked between the lookup and now
+            return await cls._update_returning(session, credentials.id, User.is_locked.is_(False), **values)
+        await cls._record_failed_login(session, credentials.id)
         return None
 
+    @classmethod
+    async def _record_failed_login(cls, session: AsyncSession, user_id: UUID) -> bool:
+        """
+        Atomically count a failed login and lock the account once max_login_attempts is reached,
+        so concurrent bad logins can't lose increments. Returns whether the account is now locked.
+
+        Locking also revokes the account's tokens, in the same statement, so a locked account
+        never keeps working tokens. Failures against an already locked account only count.
+        """
+        users, revocations = User.__table__, TokenRevocation.__table__
+        # Lock the row first, so concurrent failures see each other's is_locked
+        current = select(users.c.id, users.c.is_locked).where(users.c.id == user_id).with_for_update().cte("current")
+        attempts = func.coalesce(users.c.failed_login_attempts, 0) + 1
+        locking = and_(not_(func.coalesce(current.c.is_locked, False)), attempts >= settings.max_login_attempts)
+        counted = (
+            update(users).where(users.c.id == current.c.id)
+            .values(
+                failed_login_attempts=attempts,
+                is_locked=or_(users.c.is_locked, attempts >= settings.max_login_attempts),
+                token_epoch=users.c.token_epoch + case((locking, 1), else_=0),
+            )
+            .returning(
+                users.c.id, users.c.failed_login_attempts, users.c.is_locked, users.c.token_epoch,
+                not_(func.coalesce(current.c.is_locked, False)).label("was_unlocked"),
+            )
+            .cte("counted")
+        )
+        revoked = (
+            insert(revocations).from_select(
+                ["user_id", "epoch"],
+                select(counted.c.id, counted.c.token_epoch).where(counted.c.was_unlocked, counted.c.is_locked),
+            )
+            .returning(revocations.c.epoch)
+            .cte("revoked")
+        )
+        query = select(
+            counted.c.failed_login_attempts, counted.c.is_locked, counted.c.token_epoch, revoked.c.epoch.label("revoked")
+        ).outerjoin(revoked, true())
+        result = await cls._execute_query(session, query)
+        row = result.first() if result else None
+        if row is None:
+            return False
+        if row.revoked is not None:
+            token_epochs.apply(user_id, row.revoked)
+        loaded = session.identity_map.get(session.identity_key(User, user_id))
+        if loaded is not None:
+            # Keep an instance loaded earlier in this session consistent with the row
+            set_committed_value(loaded, "failed_login_attempts", row.failed_login_attempts)
+            set_committed_value(loaded, "is_locked", row.is_locked)
+            set_committed_value(loaded, "token_epoch", row.token_epoch)
+        return row.is_locked
+
     @classmethod
     async def is_account_locked(cls, session: AsyncSession, email: str) -> bool:
         user = await cls.get_by_email(session, email)
@@ -157,49 +427,46 @@ class UserService:
 
     @classmethod
     async def reset_password(cls, session: AsyncSession, user_id: UUID, new_password: str) -> bool:
-        hashed_password = hash_password(new_password)
-        user = await cls.get_by_id(session, user_id)
-        if user:
-            user.hashed_password = hashed_password
-            user.failed_login_attempts = 0  # Resetting failed login attempts
-            user.is_locked = False  # Unlocking the user account, if locked
-            session.add(user)
-            await session.commit()
-            return True
-        return False
+        hashed_password = await hash_password_async(new_password)
+        user = await cls._update_returning(
+            session, user_id,
+            hashed_password=hashed_password,
+            failed_login_attempts=0,  # Resetting failed login attempts
+            is_locked=False,  # Unlocking the user account, if locked
+        )
+        return user is not None
 
     @classmethod
     async def verify_email_with_token(cls, session: AsyncSession, user_id: UUID, token: str) -> bool:
-        user = await cls.get_by_id(session, user_id)
-        if user and user.verification_token == token:
-            user.email_verified = True
-            user.verification_token = None  
-            user.role = UserRole.AUTHENTICATED
-            session.add(user)
-            await session.commit()
-            return True
-        return False
-
-    @classmethod
-    async def count(cls, session: AsyncSession) -> int:
+        user = await cls._update_returning(
+            session, user_id, User.verification_token == token,
+            email_verified=True, verification_token=None, role=UserRole.AUTHENTICATED,
+        )
+        return user is not None
+
+    @classmethod
+    async def upgrade_to_professional(cls, session: AsyncSession, user_id: UUID) -> Optional[User]:
+        return await cls._update_returning(
+            session, user_id,
+            is_professional=True, professional_status_updated_at=func.now(),
+        )
+
+    @classmethod
+    async def count(cls, session: AsyncSession, mode: CountMode = CountMode.EXACT) -> int:
         """
         Count the number of users in the database.
 
         :param session: The AsyncSession instance for database access.
+        :param mode: Exact, cached (TTL, invalidated on create/delete) or approximate (planner statistics).
         :return: The count of users.
         """
-        query = select(func.count()).select_from(User)
-        result = await session.execute(query)
-        count = result.scalar()
-        return count
+        return await CountService.count(session, User, mode, replica=True)
     
     @classmethod
     async def unlock_user_account(cls, session: AsyncSession, user_id: UUID) -> bool:
-        user = await cls.get_by_id(session, user_id)
-        if user and user.is_locked:
-            user.is_locked = False
-            user.failed_login_attempts = 0  # Optionally reset failed login attempts
-            session.add(user)
-            await session.commit()
-            return True
-        return False
\ No newline at end of file
+        user = await cls._update_returning(
+            session, user_id, User.is_locked.is_(True),
+            is_locked=False,
+            failed_login_attempts=0,  # Optionally reset failed login attempts
+        )
+        return user is not None
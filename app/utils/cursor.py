@@ -0,0 +1,34 @@
+from builtins import Exception, ValueError, len, str
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+from uuid import UUID
+
+# Cursors are opaque to clients: base64url-encoded JSON of the (created_at, id) sort key
+# of the row to page from, plus the direction to page in.
+NEXT = "next"
+PREV = "prev"
+
+
+def encode_cursor(created_at: datetime, user_id: UUID, direction: str = NEXT) -> str:
+    payload = json.dumps({"c": created_at.isoformat(), "i": str(user_id), "d": direction}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID, str]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        direction = payload["d"]
+        if direction not in (NEXT, PREV):
+            raise ValueError(f"Unknown cursor direction: {direction}")
+        return datetime.fromisoformat(payload["c"]), UUID(payload["i"]), direction
+    except Exception as e:
+        raise ValueError("Invalid pagination cursor") from e
@@ -0,0 +1,64 @@
+from builtins import Exception, dict, list, set
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, List, Optional, Set, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class DataLoader(Generic[K, V]):
+    """
+    Coalesces individual load(key) calls made in the same event loop tick into a single
+    call to batch_load_fn.
+
+    batch_load_fn receives the distinct keys of a batch and returns a dict of the keys it
+    found; keys missing from the dict resolve to None. Results are not cached between
+    batches, so a loader never serves data older than its last query.
+    """
+
+    def __init__(self, batch_load_fn: Callable[[List[K]], Awaitable[Dict[K, V]]]):
+        self._batch_load_fn = batch_load_fn
+        self._pending: Dict[K, asyncio.Future] = {}
+        self._dispatch_scheduled = False
+        # The event loop only keeps weak references to tasks; hold running batches here
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def load(self, key: K) -> Optional[V]:
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[key] = future
+            if not self._dispatch_scheduled:
+                # Runs after every task already scheduled for this tick has had its turn
+                self._dispatch_scheduled = True
+                loop.call_soon(self._dispatch)
+        return await future
+
+    async def load_many(self, keys: List[K]) -> List[Optional[V]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def _dispatch(self):
+        batch, self._pending = self._pending, {}
+        self._dispatch_scheduled = False
+        task = asyncio.ensure_future(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: Dict[K, asyncio.Future]):
+        # Every future is resolved however the batch ends, so no load() waits forever
+        try:
+            results = await self._batch_load_fn(list(batch))
+            values = {key: results.get(key) for key in batch}
+        except asyncio.CancelledError:
+            for future in batch.values():
+                future.cancel()
+            raise
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(values[key])
@@ -0,0 +1,41 @@
+from builtins import dict, len, str, tuple
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+class IdentityCache:
+    """
+    Maps unique attribute values (e.g. id, email, nickname) to already-loaded ORM objects.
+
+    Objects are indexed under every key attribute so a lookup by any of them is a dict hit.
+    Writers call put() after changing an object, which re-indexes it under its current
+    values, and discard() after deleting it.
+    """
+
+    def __init__(self, key_attrs: Iterable[str], id_attr: str = "id"):
+        self.key_attrs = tuple(key_attrs)
+        self.id_attr = id_attr
+        self._by_key: Dict[Tuple[str, Hashable], Any] = {}
+        self._keys: Dict[Hashable, List[Tuple[str, Hashable]]] = {}
+
+    def get(self, attr: str, value: Hashable) -> Optional[Any]:
+        return self._by_key.get((attr, value))
+
+    def put(self, obj: Any) -> Any:
+        identity = getattr(obj, self.id_attr)
+        self.discard(identity)
+        keys = [(attr, getattr(obj, attr)) for attr in self.key_attrs]
+        for key in keys:
+            self._by_key[key] = obj
+        self._keys[identity] = keys
+        return obj
+
+    def discard(self, identity: Hashable):
+        for key in self._keys.pop(identity, ()):
+            self._by_key.pop(key, None)
+
+    def clear(self):
+        self._by_key.clear()
+        self._keys.clear()
+
+    def __len__(self) -> int:
+        return len(self._keys)
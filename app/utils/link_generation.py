@@ -1,9 +1,10 @@
-from builtins import dict, int, max, str
-from typing import List, Callable
-from urllib.parse import urlencode
+from builtins import ValueError, dict, getattr, int, max, str
+from typing import Any, Iterable, List, Callable, Optional, Sequence, Tuple
+from urllib.parse import quote, urlencode
 from uuid import UUID
 
 from fastapi import Request
+from starlette.datastructures import URL
 from app.schemas.link_schema import Link
 from app.schemas.pagination_schema import PaginationLink
 
@@ -16,21 +17,64 @@ def create_pagination_link(rel: str, base_url: str, params: dict) -> PaginationL
     query_string = f"skip={params['skip']}&limit={params['limit']}"
     return PaginationLink(rel=rel, href=f"{base_url}?{query_string}")
 
+def create_cursor_link(rel: str, url: str, limit: int, cursor: Optional[str] = None) -> PaginationLink:
+    # Keep the request's other query parameters (e.g. count) on every link
+    url = URL(url).remove_query_params("cursor")
+    if cursor:
+        url = url.include_query_params(cursor=cursor)
+    return PaginationLink(rel=rel, href=str(url.include_query_params(limit=limit)))
+
+# (rel, route name, HTTP method, action) of the links on a user
+USER_LINK_ACTIONS = [
+    ("self", "get_user", "GET", "view"),
+    ("update", "update_user_profile", "PATCH", "update"),
+    ("delete", "delete_user", "DELETE", "delete"),
+]
+
 def create_user_links(user_id: UUID, request: Request) -> List[Link]:
     """
-    Generate navigation links for user actions.
+    Generate navigation links for user actions. Resolves every route by name on each call;
+    endpoints use the app's LinkBuilder instead.
     """
-    actions = [
-        ("self", "get_user", "GET", "view"),
-        ("update", "update_user", "PUT", "update"),
-        ("delete", "delete_user", "DELETE", "delete")
-    ]
     return [
         create_link(rel, str(request.url_for(action, user_id=str(user_id))), method, action_desc)
-        for rel, action, method, action_desc in actions
+        for rel, action, method, action_desc in USER_LINK_ACTIONS
     ]
 
-def generate_pagination_links(request: Request, skip: int, limit: int, total_items: int) -> List[PaginationLink]:
+class LinkBuilder:
+    """
+    Builds a resource's links from route path templates looked up once, when the builder is
+    created, instead of resolving every route by name for every link like request.url_for.
+    Building a link is then a string format of the path parameters.
+    """
+
+    def __init__(self, routes: Iterable[Any], actions: Sequence[Tuple[str, str, str, str]]):
+        paths = {route.name: route.path_format for route in routes if getattr(route, "path_format", None)}
+        missing = [name for _, name, _, _ in actions if name not in paths]
+        if missing:
+            raise ValueError(f"No route named {', '.join(missing)}")
+        self.templates = [(rel, paths[name], method, action) for rel, name, method, action in actions]
+
+    def links(self, base_url: Any, **path_params) -> List[Link]:
+        """The links for the resource identified by path_params, as absolute URLs under base_url (e.g. request.base_url)."""
+        base = str(base_url).rstrip("/")
+        params = {key: quote(str(value), safe="") for key, value in path_params.items()}
+        return [create_link(rel, base + path.format(**params), method, action) for rel, path, method, action in self.templates]
+
+def generate_pagination_links(
+    request: Request,
+    skip: int,
+    limit: int,
+    total_items: Optional[int],
+    next_cursor: Optional[str] = None,
+    prev_cursor: Optional[str] = None,
+) -> List[PaginationLink]:
+    """
+    Generate self/first/last/next/prev links for offset pagination, or self/first/next/prev
+    links carrying opaque cursors for keyset pagination when total_items is None or a cursor is given.
+    """
+    if total_items is None or next_cursor or prev_cursor:
+        return generate_cursor_pagination_links(request, limit, next_cursor, prev_cursor)
     base_url = str(request.url)
     total_pages = (total_items + limit - 1) // limit
     links = [
@@ -46,3 +90,15 @@ def generate_pagination_links(request: Request, skip: int, limit: int, total_ite
         links.append(create_pagination_link("prev", base_url, {'skip': max(skip - limit, 0), 'limit': limit}))
 
     return links
+
+def generate_cursor_pagination_links(request: Request, limit: int, next_cursor: Optional[str], prev_cursor: Optional[str]) -> List[PaginationLink]:
+    url = str(request.url)
+    links = [
+        PaginationLink(rel="self", href=url),
+        create_cursor_link("first", url, limit),
+    ]
+    if next_cursor:
+        links.append(create_cursor_link("next", url, limit, next_cursor))
+    if prev_cursor:
+        links.append(create_cursor_link("prev", url, limit, prev_cursor))
+    return links
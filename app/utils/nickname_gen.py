@@ -1,10 +1,40 @@
-from builtins import str
+from builtins import int, len, list, set, str
 import random
+from typing import List
+
+ADJECTIVES = [
+    "agile", "amber", "ancient", "autumn", "bold", "brave", "bright", "brisk",
+    "calm", "candid", "clever", "cosmic", "crimson", "curious", "daring", "dapper",
+    "eager", "early", "electric", "fearless", "fierce", "gentle", "gilded", "glad",
+    "golden", "grand", "happy", "hidden", "honest", "humble", "icy", "jolly",
+    "keen", "kind", "lively", "lucky", "lunar", "merry", "mighty", "misty",
+    "noble", "nimble", "patient", "plucky", "polar", "proud", "quick", "quiet",
+    "rapid", "restless", "rustic", "silent", "silver", "sly", "solar", "steady",
+    "stormy", "sunny", "swift", "tidy", "vivid", "wandering", "wild", "witty",
+]
+ANIMALS = [
+    "albatross", "alpaca", "badger", "beaver", "bison", "bobcat", "buffalo", "camel",
+    "caribou", "cheetah", "cobra", "condor", "coyote", "crane", "dingo", "dolphin",
+    "eagle", "falcon", "ferret", "flamingo", "fox", "gazelle", "gecko", "gibbon",
+    "heron", "hyena", "ibis", "iguana", "jackal", "jaguar", "kestrel", "koala",
+    "lemur", "leopard", "lion", "llama", "lynx", "macaw", "marmot", "meerkat",
+    "mongoose", "moose", "narwhal", "ocelot", "orca", "otter", "owl", "panda",
+    "panther", "pelican", "puffin", "puma", "quokka", "raccoon", "raven", "seal",
+    "sparrow", "stoat", "tapir", "tiger", "toucan", "walrus", "weasel", "wolf",
+]
+# 64 adjectives x 64 animals x 10,000 numbers: ~41 million nicknames
+NUMBER_RANGE = 10000
 
 
 def generate_nickname() -> str:
     """Generate a URL-safe nickname using adjectives and animal names."""
-    adjectives = ["clever", "jolly", "brave", "sly", "gentle"]
-    animals = ["panda", "fox", "raccoon", "koala", "lion"]
-    number = random.randint(0, 999)
-    return f"{random.choice(adjectives)}_{random.choice(animals)}_{number}"
+    number = random.randrange(NUMBER_RANGE)
+    return f"{random.choice(ADJECTIVES)}_{random.choice(ANIMALS)}_{number}"
+
+
+def generate_nicknames(count: int) -> List[str]:
+    """Generate count distinct nicknames, e.g. to check for collisions in one query."""
+    nicknames = set()
+    while len(nicknames) < count:
+        nicknames.add(generate_nickname())
+    return list(nicknames)
@@ -0,0 +1,221 @@
+# app/utils/password_hashers.py
+from builtins import ImportError, KeyError, ValueError, bool, classmethod, int, range, str, tuple
+import time
+from abc import ABC, abstractmethod
+from logging import getLogger
+from typing import Any, Dict, Iterator, Optional, Type
+import bcrypt
+from settings.config import settings
+
+try:
+    import argon2
+    from argon2.exceptions import InvalidHashError, VerificationError, VerifyMismatchError
+except ImportError:  # argon2-cffi is optional; only bcrypt is available without it
+    argon2 = None
+
+logger = getLogger(__name__)
+
+
+class PasswordHasher(ABC):
+    """
+    Base class for password hashing schemes.
+
+    Subclasses are plain, picklable parameter holders so they can be shipped to the
+    password hashing process pool.
+    """
+    scheme: str = ""
+    prefixes: tuple = ()
+
+    @abstractmethod
+    def hash(self, password: str) -> str:
+        ...
+
+    @abstractmethod
+    def verify(self, password: str, hashed_password: str) -> bool:
+        ...
+
+    @abstractmethod
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """Return True if hashed_password was not produced by this scheme with these parameters."""
+
+    @classmethod
+    def identifies(cls, hashed_password: str) -> bool:
+        return hashed_password.startswith(cls.prefixes)
+
+    @classmethod
+    @abstractmethod
+    def from_settings(cls) -> "PasswordHasher":
+        ...
+
+    @abstractmethod
+    def to_settings(self) -> Dict[str, Any]:
+        """The settings that make from_settings() build this hasher."""
+
+    @abstractmethod
+    def calibration_steps(self) -> Iterator["PasswordHasher"]:
+        """Yield hashers of increasing cost, starting at the minimum acceptable cost."""
+
+
+class BcryptHasher(PasswordHasher):
+    scheme = "bcrypt"
+    prefixes = ("$2a$", "$2b$", "$2y$")
+    min_rounds = 10
+    max_rounds = 16
+
+    def __init__(self, rounds: int = 12):
+        self.rounds = rounds
+
+    def hash(self, password: str) -> str:
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        if not self.identifies(hashed_password):
+            return True
+        # bcrypt hashes look like $2b$12$<salt+digest>
+        return hashed_password.split('$')[2] != f"{self.rounds:02d}"
+
+    @classmethod
+    def from_settings(cls) -> "BcryptHasher":
+        return cls(rounds=settings.bcrypt_rounds)
+
+    def to_settings(self) -> Dict[str, Any]:
+        return {"password_hash_scheme": self.scheme, "bcrypt_rounds": self.rounds}
+
+    def calibration_steps(self) -> Iterator["BcryptHasher"]:
+        for rounds in range(self.min_rounds, self.max_rounds + 1):
+            yield BcryptHasher(rounds)
+
+    def __repr__(self) -> str:
+        return f"BcryptHasher(rounds={self.rounds})"
+
+
+class Argon2idHasher(PasswordHasher):
+    scheme = "argon2id"
+    prefixes = ("$argon2id$",)
+    min_time_cost = 2
+    max_time_cost = 20
+
+    def __init__(self, time_cost: int = 3, memory_cost: int = 65536, parallelism: int = 4):
+        if argon2 is None:
+            raise ValueError("argon2id hashing requires the argon2-cffi package")
+        self.time_cost = time_cost
+        self.memory_cost = memory_cost
+        self.parallelism = parallelism
+
+    def _hasher(self):
+        return argon2.PasswordHasher(
+            time_cost=self.time_cost, memory_cost=self.memory_cost,
+            parallelism=self.parallelism, type=argon2.Type.ID,
+        )
+
+    def hash(self, password: str) -> str:
+        return self._hasher().hash(password)
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        try:
+            return self._hasher().verify(hashed_password, password)
+        except VerifyMismatchError:
+            return False
+        except (InvalidHashError, VerificationError) as e:
+            raise ValueError("Invalid argon2 hash") from e
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        if not self.identifies(hashed_password):
+            return True
+        return self._hasher().check_needs_rehash(hashed_password)
+
+    @classmethod
+    def from_settings(cls) -> "Argon2idHasher":
+        return cls(
+            time_cost=settings.argon2_time_cost,
+            memory_cost=settings.argon2_memory_cost,
+            parallelism=settings.argon2_parallelism,
+        )
+
+    def to_settings(self) -> Dict[str, Any]:
+        return {
+            "password_hash_scheme": self.scheme,
+            "argon2_time_cost": self.time_cost,
+            "argon2_memory_cost": self.memory_cost,
+            "argon2_parallelism": self.parallelism,
+        }
+
+    def calibration_steps(self) -> Iterator["Argon2idHasher"]:
+        for time_cost in range(self.min_time_cost, self.max_time_cost + 1):
+            yield Argon2idHasher(time_cost, self.memory_cost, self.parallelism)
+
+    def __repr__(self) -> str:
+        return f"Argon2idHasher(time_cost={self.time_cost}, memory_cost={self.memory_cost}, parallelism={self.parallelism})"
+
+
+HASHERS: Dict[str, Type[PasswordHasher]] = {}
+
+
+def register_hasher(hasher_cls: Type[PasswordHasher]) -> Type[PasswordHasher]:
+    """Make a hashing scheme available by name and for hash identification."""
+    HASHERS[hasher_cls.scheme] = hasher_cls
+    return hasher_cls
+
+
+register_hasher(BcryptHasher)
+if argon2 is not None:
+    register_hasher(Argon2idHasher)
+
+
+def get_hasher_class(scheme: str) -> Type[PasswordHasher]:
+    try:
+        return HASHERS[scheme]
+    except KeyError:
+        raise ValueError(f"Unknown password hashing scheme: {scheme}") from None
+
+
+def identify_hasher(hashed_password: str) -> Type[PasswordHasher]:
+    """Return the hasher class that produced hashed_password."""
+    for hasher_cls in HASHERS.values():
+        if hasher_cls.identifies(hashed_password):
+            return hasher_cls
+    raise ValueError("Unrecognized password hash format")
+
+
+def calibrate_hasher(scheme: str, target_ms: int) -> PasswordHasher:
+    """
+    Pick the most expensive parameters for scheme whose hash time stays within target_ms
+    on this machine. The scheme's minimum cost is used even if it is slower than the target.
+
+    Timing is noisy, so run this once (see app.cli.calibrate_password_hashing) and store the
+    result in settings: workers that each calibrated could settle on different parameters,
+    and every login alternating between them would rehash the password.
+    """
+    chosen = None
+    for candidate in get_hasher_class(scheme).from_settings().calibration_steps():
+        started = time.perf_counter()
+        candidate.hash("calibration-password")
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info("Calibrating %r: %.1f ms", candidate, elapsed_ms)
+        if chosen is not None and elapsed_ms > target_ms:
+            break
+        chosen = candidate
+        if elapsed_ms > target_ms:
+            break
+    return chosen
+
+
+_default_hasher: Optional[PasswordHasher] = None
+
+
+def get_default_hasher() -> PasswordHasher:
+    """Return the hasher used for new hashes, built from settings unless one was configured."""
+    global _default_hasher
+    if _default_hasher is None:
+        _default_hasher = get_hasher_class(settings.password_hash_scheme).from_settings()
+    return _default_hasher
+
+
+def set_default_hasher(hasher: Optional[PasswordHasher]):
+    """Replace the hasher used for new hashes; None reverts to the settings default."""
+    global _default_hasher
+    _default_hasher = hasher
@@ -0,0 +1,98 @@
+from builtins import dict, float, int, max, round, super
+import threading
+import time
+from typing import Any, Dict, Optional
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class PoolMonitor:
+    """
+    Checkout statistics for one connection pool.
+
+    Wait time is measured from asking the pool for a connection to getting one, so it
+    includes queueing behind other checkouts, opening new connections and pre-ping. Steady
+    nonzero waits or any timeouts mean the pool is too small for the load.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connections_opened = 0
+        self.invalidations = 0
+        self.peak_in_use = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def record_checkout(self, wait: float, in_use: int):
+        with self._lock:
+            self.checkouts += 1
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+            self.peak_in_use = max(self.peak_in_use, in_use)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def attach(self, engine: Engine):
+        """Count connections the engine's pool opens and invalidates."""
+        @event.listens_for(engine, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            with self._lock:
+                self.connections_opened += 1
+
+        @event.listens_for(engine, "invalidate")
+        def _on_invalidate(dbapi_connection, connection_record, exception):
+            with self._lock:
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self._wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self._wait_max * 1000, 3),
+                "peak_in_use": self.peak_in_use,
+                "connections_opened": self.connections_opened,
+                "invalidations": self.invalidations,
+            }
+
+
+class MonitoredAsyncQueuePool(AsyncAdaptedQueuePool):
+    """The default pool of async engines, timing every checkout into its monitor."""
+
+    monitor: Optional[PoolMonitor] = None
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            if self.monitor is not None:
+                self.monitor.record_timeout()
+            raise
+        if self.monitor is not None:
+            self.monitor.record_checkout(time.perf_counter() - start, self.checkedout())
+        return connection
+
+    def recreate(self) -> "MonitoredAsyncQueuePool":
+        # engine.dispose() swaps in a fresh pool; keep counting into the same monitor
+        pool = super().recreate()
+        pool.monitor = self.monitor
+        return pool
+
+
+def pool_status(pool) -> Dict[str, Any]:
+    """Current occupancy of a queue pool."""
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "in_use": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "timeout": pool.timeout(),
+    }
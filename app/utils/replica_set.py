@@ -0,0 +1,60 @@
+from builtins import Exception, dict, enumerate, float, int, len, next, range
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaSet:
+    """
+    Read replicas, handed out round-robin.
+
+    A replica whose connection fails is ejected for retry_after seconds, during which it is
+    skipped; after that it is tried again. When every replica is ejected choose() returns
+    None and reads go to the primary.
+    """
+
+    def __init__(self, engines: List[AsyncEngine], retry_after: float, clock: Callable[[], float] = time.monotonic):
+        self.engines = engines
+        self.retry_after = retry_after
+        self.clock = clock
+        self._next = itertools.count()
+        self._ejected_until: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._reads = [0] * len(engines)
+        self._ejections = [0] * len(engines)
+
+    def choose(self) -> Optional[AsyncEngine]:
+        now = self.clock()
+        with self._lock:
+            start = next(self._next)
+            for offset in range(len(self.engines)):
+                index = (start + offset) % len(self.engines)
+                if self._ejected_until.get(index, 0.0) <= now:
+                    self._reads[index] += 1
+                    return self.engines[index]
+        return None
+
+    def eject(self, engine: AsyncEngine, error: Exception):
+        index = self.engines.index(engine)
+        with self._lock:
+            self._ejected_until[index] = self.clock() + self.retry_after
+            self._ejections[index] += 1
+        logger.warning(f"Read replica {engine.url.host} ejected for {self.retry_after}s: {error}")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = self.clock()
+        with self._lock:
+            return [
+                {
+                    "host": engine.url.host,
+                    "healthy": self._ejected_until.get(index, 0.0) <= now,
+                    "reads": self._reads[index],
+                    "ejections": self._ejections[index],
+                }
+                for index, engine in enumerate(self.engines)
+            ]
@@ -1,19 +1,26 @@
 # app/security.py
-from builtins import Exception, ValueError, bool, int, str
+from builtins import Exception, RuntimeError, ValueError, bool, dict, int, len, range, str
+import asyncio
+import os
 import secrets
-import bcrypt
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional
 from logging import getLogger
+from app.utils.password_hashers import BcryptHasher, PasswordHasher, get_default_hasher, identify_hasher
+from settings.config import settings
 
 # Set up logging
 logger = getLogger(__name__)
 
-def hash_password(password: str, rounds: int = 12) -> str:
+def hash_password(password: str, rounds: Optional[int] = None) -> str:
     """
-    Hashes a password using bcrypt with a specified cost factor.
+    Hashes a password with the configured hashing scheme.
     
     Args:
         password (str): The plain text password to hash.
-        rounds (int): The cost factor that determines the computational cost of hashing.
+        rounds (int): Optional bcrypt cost factor. When given, bcrypt is used with that cost;
+            otherwise the default hasher (see password_hashers.get_default_hasher) is used.
 
     Returns:
         str: The hashed password.
@@ -21,10 +28,14 @@ def hash_password(password: str, rounds: int = 12) -> str:
     Raises:
         ValueError: If hashing the password fails.
     """
+    return _hash_with(_resolve_hasher(rounds), password)
+
+def _resolve_hasher(rounds: Optional[int]) -> PasswordHasher:
+    return BcryptHasher(rounds) if rounds is not None else get_default_hasher()
+
+def _hash_with(hasher: PasswordHasher, password: str) -> str:
     try:
-        salt = bcrypt.gensalt(rounds=rounds)
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), salt)
-        return hashed_password.decode('utf-8')
+        return hasher.hash(password)
     except Exception as e:
         logger.error("Failed to hash password: %s", e)
         raise ValueError("Failed to hash password") from e
@@ -35,7 +46,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     
     Args:
         plain_password (str): The plain text password to verify.
-        hashed_password (str): The bcrypt hashed password.
+        hashed_password (str): The hashed password, in any registered scheme.
 
     Returns:
         bool: True if the password is correct, False otherwise.
@@ -44,10 +55,155 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         ValueError: If the hashed password format is incorrect or the function fails to verify.
     """
     try:
-        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+        return identify_hasher(hashed_password)().verify(plain_password, hashed_password)
     except Exception as e:
         logger.error("Error verifying password: %s", e)
         raise ValueError("Authentication process encountered an unexpected error") from e
 
+def needs_rehash(hashed_password: str) -> bool:
+    """Return True if hashed_password uses a different scheme or parameters than the default hasher."""
+    return get_default_hasher().needs_rehash(hashed_password)
+
 def generate_verification_token():
-    return secrets.token_urlsafe(16)  # Generates a secure 16-byte URL-safe token
\ No newline at end of file
+    return secrets.token_urlsafe(16)  # Generates a secure 16-byte URL-safe token
+
+
+class PasswordHashQueueFull(RuntimeError):
+    """Raised when the password hashing pool already has max_queue jobs waiting."""
+
+
+def _timed_call(func, *args):
+    """Run func in a worker and report the wall-clock time it started at."""
+    return time.time(), func(*args)
+
+
+class PasswordHashPool:
+    """
+    Runs bcrypt work on a bounded thread or process pool so it never blocks the event loop.
+
+    At most `workers` jobs run concurrently and at most `max_queue` more may wait for a
+    free worker; anything beyond that is rejected with PasswordHashQueueFull instead of
+    piling up behind a login storm.
+    """
+
+    def __init__(self, workers: int, executor: str = "thread", max_queue: int = 64):
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown password hash executor: {executor}")
+        self.workers = workers
+        self.executor_kind = executor
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def run(self, func, *args):
+        """Run func(*args) on the pool, recording how long it waited for a worker."""
+        if self._in_flight >= self.workers + self.max_queue:
+            self._rejected += 1
+            raise PasswordHashQueueFull("Password hashing queue is full")
+        self._in_flight += 1
+        submitted_at = time.time()
+        try:
+            loop = asyncio.get_running_loop()
+            started_at, result = await loop.run_in_executor(self._get_executor(), _timed_call, func, *args)
+        finally:
+            self._in_flight -= 1
+        wait = max(0.0, started_at - submitted_at)
+        self._completed += 1
+        self._wait_total += wait
+        self._wait_max = max(self._wait_max, wait)
+        return result
+
+    def stats(self) -> dict:
+        """Return counters describing pool usage and queue wait time."""
+        return {
+            "executor": self.executor_kind,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "queued": max(0, self._in_flight - self.workers),
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "queue_wait_avg_ms": (self._wait_total / self._completed * 1000) if self._completed else 0.0,
+            "queue_wait_max_ms": self._wait_max * 1000,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+_hash_pool: Optional[PasswordHashPool] = None
+
+
+def get_hash_pool() -> PasswordHashPool:
+    """Return the process-wide password hashing pool, creating it from settings on first use."""
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = PasswordHashPool(
+            workers=settings.password_hash_workers or os.cpu_count() or 1,
+            executor=settings.password_hash_executor,
+            max_queue=settings.password_hash_max_queue,
+        )
+    return _hash_pool
+
+
+def shutdown_hash_pool():
+    """Shut down the password hashing pool; a new one is created on next use."""
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown()
+        _hash_pool = None
+
+
+async def hash_password_async(password: str, rounds: Optional[int] = None) -> str:
+    """Hash a password on the worker pool. See hash_password."""
+    # Resolve the hasher here so process workers use this process's (possibly calibrated) parameters.
+    return await get_hash_pool().run(_hash_with, _resolve_hasher(rounds), password)
+
+
+def _hash_many(hasher: PasswordHasher, passwords: List[str]) -> List[str]:
+    return [_hash_with(hasher, password) for password in passwords]
+
+
+async def hash_passwords_async(passwords: List[str], executor: Optional[Executor] = None, chunk_size: int = 32) -> List[str]:
+    """
+    Hash many passwords in parallel, in chunks to keep inter-process overhead low. Results
+    are in input order.
+
+    Runs on executor when given (typically a ProcessPoolExecutor dedicated to a bulk job),
+    otherwise on the shared password hashing pool with at most one chunk per worker in
+    flight, so a bulk job never fills the queue that logins wait in.
+    """
+    hasher = get_default_hasher()
+    chunks = [passwords[i:i + chunk_size] for i in range(0, len(passwords), chunk_size)]
+    if executor is None:
+        pool = get_hash_pool()
+        slots = asyncio.Semaphore(pool.workers)
+
+        async def hash_chunk(chunk: List[str]) -> List[str]:
+            async with slots:
+                return await pool.run(_hash_many, hasher, chunk)
+
+        results = await asyncio.gather(*(hash_chunk(chunk) for chunk in chunks))
+    else:
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*(loop.run_in_executor(executor, _hash_many, hasher, chunk) for chunk in chunks))
+    return [hashed for chunk in results for hashed in chunk]
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the worker pool. See verify_password."""
+    return await get_hash_pool().run(verify_password, plain_password, hashed_password)
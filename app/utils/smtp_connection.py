@@ -1,31 +1,303 @@
 # smtp_client.py
-from builtins import Exception, int, str
+from builtins import Exception, ImportError, ValueError, bool, dict, int, len, str
+import asyncio
 import smtplib
+import ssl
+import threading
+import time
+from collections import deque
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from typing import Deque, Optional, Tuple
 from settings.config import settings
 import logging
 
+try:
+    import aiosmtplib
+except ImportError:  # aiosmtplib is optional; only the thread-based transport is available without it
+    aiosmtplib = None
+
+
+def build_message(sender: str, subject: str, html_content: str, recipient: str) -> MIMEMultipart:
+    message = MIMEMultipart('alternative')
+    message['Subject'] = subject
+    message['From'] = sender
+    message['To'] = recipient
+    message.attach(MIMEText(html_content, 'html'))
+    return message
+
 class SMTPClient:
-    def __init__(self, server: str, port: int, username: str, password: str):
+    """
+    Sends email over a pool of persistent, authenticated SMTP sessions.
+
+    Connecting, STARTTLS and AUTH cost several round trips, so sessions are kept open and
+    reused for many messages. Up to pool_size sessions are open at once; send_email blocks
+    while all are busy. A session idle for longer than keepalive_interval is checked with
+    NOOP before reuse, and one idle for longer than idle_timeout is closed. Thread-safe, so
+    it can be driven from a thread pool.
+    """
+
+    def __init__(
+        self,
+        server: str,
+        port: int,
+        username: str,
+        password: str,
+        pool_size: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+        keepalive_interval: Optional[float] = None,
+        use_tls: Optional[bool] = None,
+        timeout: Optional[float] = None,
+    ):
         self.server = server
         self.port = port
         self.username = username
         self.password = password
+        self.pool_size = pool_size or settings.smtp_pool_size
+        self.idle_timeout = idle_timeout if idle_timeout is not None else settings.smtp_idle_timeout
+        self.keepalive_interval = keepalive_interval if keepalive_interval is not None else settings.smtp_keepalive_interval
+        self.use_tls = use_tls if use_tls is not None else settings.smtp_use_tls
+        self.timeout = timeout or settings.smtp_timeout
+        self._idle: Deque[Tuple[smtplib.SMTP, float]] = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+        self._connections_opened = 0
+        self._messages_sent = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                connection.starttls(context=ssl.create_default_context())
+            if self.username:
+                connection.login(self.username, self.password)
+        except Exception:
+            self._close(connection)
+            raise
+        with self._lock:
+            self._connections_opened += 1
+        return connection
+
+    @staticmethod
+    def _close(connection: smtplib.SMTP):
+        try:
+            connection.quit()
+        except Exception:
+            connection.close()
+
+    def _checkout(self) -> Tuple[smtplib.SMTP, bool]:
+        """Return a usable idle session, or a new one; the flag says whether it was reused."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                connection, last_used = self._idle.pop()
+            idle_for = time.monotonic() - last_used
+            if idle_for > self.idle_timeout:
+                self._close(connection)
+                continue
+            if idle_for > self.keepalive_interval:
+                try:
+                    if connection.noop()[0] != 250:
+                        raise smtplib.SMTPException("NOOP failed")
+                except Exception:
+                    connection.close()
+                    continue
+            return connection, True
+        return self._connect(), False
+
+    def _checkin(self, connection: smtplib.SMTP):
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            self._idle.append((connection, now))
+            # Sessions are reused most-recent-first, so the least recently used sit at the left
+            while self._idle and now - self._idle[0][1] > self.idle_timeout:
+                expired.append(self._idle.popleft()[0])
+        for stale in expired:
+            self._close(stale)
+
+    def _deliver(self, recipient: str, message: str):
+        connection, reused = self._checkout()
+        try:
+            connection.sendmail(self.username, recipient, message)
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException):
+            # The server rejected this message, but the session is still usable
+            self._checkin(connection)
+            raise
+        except OSError:
+            connection.close()
+            if not reused:
+                raise
+            # The server dropped the idle session; retry once on a fresh one
+            connection = self._connect()
+            try:
+                connection.sendmail(self.username, recipient, message)
+            except Exception:
+                connection.close()
+                raise
+        self._checkin(connection)
 
     def send_email(self, subject: str, html_content: str, recipient: str):
         try:
-            message = MIMEMultipart('alternative')
-            message['Subject'] = subject
-            message['From'] = self.username
-            message['To'] = recipient
-            message.attach(MIMEText(html_content, 'html'))
-
-            with smtplib.SMTP(self.server, self.port) as server:
-                server.starttls()  # Use TLS
-                server.login(self.username, self.password)
-                server.sendmail(self.username, recipient, message.as_string())
+            message = build_message(self.username, subject, html_content, recipient)
+            self._slots.acquire()
+            try:
+                self._deliver(recipient, message.as_string())
+            finally:
+                self._slots.release()
+            with self._lock:
+                self._messages_sent += 1
+            logging.info(f"Email sent to {recipient}")
+        except Exception as e:
+            logging.error(f"Failed to send email: {str(e)}")
+            raise
+
+    def close(self):
+        """Close all idle sessions."""
+        with self._lock:
+            idle, self._idle = self._idle, deque()
+        for connection, _ in idle:
+            self._close(connection)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pool_size": self.pool_size,
+                "idle": len(self._idle),
+                "connections_opened": self._connections_opened,
+                "messages_sent": self._messages_sent,
+            }
+
+
+class AsyncSMTPClient:
+    """
+    asyncio counterpart of SMTPClient with the same interface, except that send_email and
+    close are coroutines. Sends run on the event loop without threads; at most pool_size run
+    at once (each on its own pooled session) and the rest wait their turn.
+    """
+
+    def __init__(
+        self,
+        server: str,
+        port: int,
+        username: str,
+        password: str,
+        pool_size: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+        keepalive_interval: Optional[float] = None,
+        use_tls: Optional[bool] = None,
+        timeout: Optional[float] = None,
+    ):
+        if aiosmtplib is None:
+            raise ValueError("The async SMTP transport requires the aiosmtplib package")
+        self.server = server
+        self.port = port
+        self.username = username
+        self.password = password
+        self.pool_size = pool_size or settings.smtp_pool_size
+        self.idle_timeout = idle_timeout if idle_timeout is not None else settings.smtp_idle_timeout
+        self.keepalive_interval = keepalive_interval if keepalive_interval is not None else settings.smtp_keepalive_interval
+        self.use_tls = use_tls if use_tls is not None else settings.smtp_use_tls
+        self.timeout = timeout or settings.smtp_timeout
+        self._idle: Deque[Tuple["aiosmtplib.SMTP", float]] = deque()
+        self._slots = asyncio.Semaphore(self.pool_size)
+        self._connections_opened = 0
+        self._messages_sent = 0
+
+    async def _connect(self) -> "aiosmtplib.SMTP":
+        connection = aiosmtplib.SMTP(
+            hostname=self.server, port=self.port, timeout=self.timeout, start_tls=self.use_tls,
+            username=self.username or None, password=self.password or None,
+        )
+        await connection.connect()
+        self._connections_opened += 1
+        return connection
+
+    @staticmethod
+    async def _close(connection: "aiosmtplib.SMTP"):
+        try:
+            await connection.quit()
+        except Exception:
+            connection.close()
+
+    async def _checkout(self) -> Tuple["aiosmtplib.SMTP", bool]:
+        """Return a usable idle session, or a new one; the flag says whether it was reused."""
+        while self._idle:
+            connection, last_used = self._idle.pop()
+            idle_for = time.monotonic() - last_used
+            if idle_for > self.idle_timeout or not connection.is_connected:
+                await self._close(connection)
+                continue
+            if idle_for > self.keepalive_interval:
+                try:
+                    await connection.noop()
+                except Exception:
+                    connection.close()
+                    continue
+            return connection, True
+        return await self._connect(), False
+
+    async def _checkin(self, connection: "aiosmtplib.SMTP"):
+        now = time.monotonic()
+        self._idle.append((connection, now))
+        # Sessions are reused most-recent-first, so the least recently used sit at the left
+        while self._idle and now - self._idle[0][1] > self.idle_timeout:
+            await self._close(self._idle.popleft()[0])
+
+    async def _deliver(self, recipient: str, message: MIMEMultipart):
+        connection, reused = await self._checkout()
+        try:
+            await connection.send_message(message, sender=self.username, recipients=[recipient])
+        except (aiosmtplib.SMTPRecipientsRefused, aiosmtplib.SMTPResponseException):
+            # The server rejected this message, but the session is still usable
+            await self._checkin(connection)
+            raise
+        except (aiosmtplib.SMTPException, OSError):
+            connection.close()
+            if not reused:
+                raise
+            # The server dropped the idle session; retry once on a fresh one
+            connection = await self._connect()
+            try:
+                await connection.send_message(message, sender=self.username, recipients=[recipient])
+            except Exception:
+                connection.close()
+                raise
+        await self._checkin(connection)
+
+    async def send_email(self, subject: str, html_content: str, recipient: str):
+        try:
+            message = build_message(self.username, subject, html_content, recipient)
+            async with self._slots:
+                await self._deliver(recipient, message)
+            self._messages_sent += 1
             logging.info(f"Email sent to {recipient}")
         except Exception as e:
             logging.error(f"Failed to send email: {str(e)}")
             raise
+
+    async def close(self):
+        """Close all idle sessions."""
+        idle, self._idle = self._idle, deque()
+        for connection, _ in idle:
+            await self._close(connection)
+
+    def stats(self) -> dict:
+        return {
+            "pool_size": self.pool_size,
+            "idle": len(self._idle),
+            "connections_opened": self._connections_opened,
+            "messages_sent": self._messages_sent,
+        }
+
+
+SMTP_TRANSPORTS = {"thread": SMTPClient, "async": AsyncSMTPClient}
+
+
+def create_smtp_client(server: str, port: int, username: str, password: str, transport: Optional[str] = None):
+    """Create the SMTP client for transport ('thread' or 'async'), defaulting to settings.smtp_transport."""
+    transport = transport or settings.smtp_transport
+    if transport not in SMTP_TRANSPORTS:
+        raise ValueError(f"Unknown SMTP transport: {transport}")
+    return SMTP_TRANSPORTS[transport](server=server, port=port, username=username, password=password)
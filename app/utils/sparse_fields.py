@@ -0,0 +1,24 @@
+from builtins import ValueError, dict, list, set, sorted
+from typing import Iterable, List, Optional, Sequence
+
+# Sparse fieldsets: clients pass ?fields=nickname,role to get (and make the database read)
+# only those fields of each resource.
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str], always: Sequence[str] = ("id",)) -> Optional[List[str]]:
+    """
+    Parse a comma-separated fields parameter into field names in request order, with the
+    always fields first. Returns None when fields is None or blank, meaning every field.
+
+    Raises:
+        ValueError: If a name is not in allowed.
+    """
+    if fields is None or not fields.strip():
+        return None
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    allowed = set(allowed)
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Choose from: {', '.join(sorted(allowed))}")
+    # dict preserves order and drops duplicates
+    return list(dict.fromkeys([*always, *requested]))
@@ -1,7 +1,61 @@
+from builtins import ascii, dict, enumerate, format, int, len, list, open, repr, str, tuple
+import html
+import re
+import secrets
+import string
 import markdown2
 from pathlib import Path
+from typing import Dict, List, Tuple
+from settings.config import settings
+
+EMAIL_STYLES = {
+    'body': 'font-family: Arial, sans-serif; font-size: 16px; color: #333333; background-color: #ffffff; line-height: 1.5;',
+    'h1': 'font-size: 24px; color: #333333; font-weight: bold; margin-top: 20px; margin-bottom: 10px;',
+    'p': 'font-size: 16px; color: #666666; margin: 10px 0; line-height: 1.6;',
+    'a': 'color: #0056b3; text-decoration: none; font-weight: bold;',
+    'footer': 'font-size: 12px; color: #777777; padding: 20px 0;',
+    'ul': 'list-style-type: none; padding: 0;',
+    'li': 'margin-bottom: 10px;'
+}
+_formatter = string.Formatter()
+# Bare opening tags of every styled element except body, which wraps the whole email
+_STYLED_TAG = re.compile('<(' + '|'.join(re.escape(tag) for tag in EMAIL_STYLES if tag != 'body') + ')>')
+
+
+class CompiledTemplate:
+    """
+    An email rendered to styled HTML once, with holes where the context values go.
+
+    parts alternates literal HTML and (field name, conversion, format spec) triples, so
+    rendering is a join of the literals with the formatted, HTML-escaped values.
+    """
+
+    def __init__(self, parts: List, mtimes: Tuple[float, ...]):
+        self.parts = parts
+        self.mtimes = mtimes
+
+    def render(self, context: Dict) -> str:
+        rendered = []
+        for index, part in enumerate(self.parts):
+            if index % 2 == 0:
+                rendered.append(part)
+                continue
+            field_name, conversion, format_spec = part
+            value = _formatter.get_field(field_name, (), context)[0]
+            if conversion == 'r':
+                value = repr(value)
+            elif conversion == 'a':
+                value = ascii(value)
+            elif conversion == 's':
+                value = str(value)
+            rendered.append(html.escape(format(value, format_spec)))
+        return ''.join(rendered)
+
 
 class TemplateManager:
+    # Shared by all instances; templates don't change unless edited on disk
+    _cache: Dict[Tuple[Path, str], CompiledTemplate] = {}
+
     def __init__(self):
         # Dynamically determine the root path of the project
         self.root_dir = Path(__file__).resolve().parent.parent.parent  # Adjust this depending on the structure
@@ -13,34 +67,52 @@ class TemplateManager:
         with open(template_path, 'r', encoding='utf-8') as file:
             return file.read()
 
+    def _template_files(self, template_name: str) -> Tuple[str, ...]:
+        return ('header.md', f'{template_name}.md', 'footer.md')
+
+    def _mtimes(self, template_name: str) -> Tuple[float, ...]:
+        return tuple((self.templates_dir / filename).stat().st_mtime for filename in self._template_files(template_name))
+
     def _apply_email_styles(self, html: str) -> str:
         """Apply advanced CSS styles inline for email compatibility with excellent typography."""
-        styles = {
-            'body': 'font-family: Arial, sans-serif; font-size: 16px; color: #333333; background-color: #ffffff; line-height: 1.5;',
-            'h1': 'font-size: 24px; color: #333333; font-weight: bold; margin-top: 20px; margin-bottom: 10px;',
-            'p': 'font-size: 16px; color: #666666; margin: 10px 0; line-height: 1.6;',
-            'a': 'color: #0056b3; text-decoration: none; font-weight: bold;',
-            'footer': 'font-size: 12px; color: #777777; padding: 20px 0;',
-            'ul': 'list-style-type: none; padding: 0;',
-            'li': 'margin-bottom: 10px;'
-        }
+        styled_html = _STYLED_TAG.sub(lambda match: f'<{match.group(1)} style="{EMAIL_STYLES[match.group(1)]}">', html)
         # Wrap entire HTML content in <div> with body style
-        styled_html = f'<div style="{styles["body"]}">{html}</div>'
-        # Apply styles to each HTML element
-        for tag, style in styles.items():
-            if tag != 'body':  # Skip the body style since it's already applied to the <div>
-                styled_html = styled_html.replace(f'<{tag}>', f'<{tag} style="{style}">')
-        return styled_html
+        return f'<div style="{EMAIL_STYLES["body"]}">{styled_html}</div>'
 
-    def render_template(self, template_name: str, **context) -> str:
-        """Render a markdown template with given context, applying advanced email styles."""
+    def _compile(self, template_name: str) -> CompiledTemplate:
+        mtimes = self._mtimes(template_name)
         header = self._read_template('header.md')
         footer = self._read_template('footer.md')
-
-        # Read main template and format it with provided context
         main_template = self._read_template(f'{template_name}.md')
-        main_content = main_template.format(**context)
 
-        full_markdown = f"{header}\n{main_content}\n{footer}"
-        html_content = markdown2.markdown(full_markdown)
-        return self._apply_email_styles(html_content)
+        # Swap each replacement field for a marker markdown leaves alone, render the markdown,
+        # then cut the HTML at the markers. Only the main template has fields; header and
+        # footer braces are literal.
+        token = secrets.token_hex(4)
+        fields = []
+        marked = []
+        for literal, field_name, format_spec, conversion in _formatter.parse(main_template):
+            marked.append(literal)
+            if field_name is not None:
+                marked.append(f'TPLVAR{token}N{len(fields)}E')
+                fields.append((field_name, conversion, format_spec or ''))
+        html_content = markdown2.markdown(f"{header}\n{''.join(marked)}\n{footer}")
+        styled = self._apply_email_styles(html_content)
+
+        parts = []
+        for index, piece in enumerate(re.split(f'TPLVAR{token}N(\\d+)E', styled)):
+            parts.append(piece if index % 2 == 0 else fields[int(piece)])
+        return CompiledTemplate(parts, mtimes)
+
+    def get_template(self, template_name: str) -> CompiledTemplate:
+        """The compiled template, recompiled in debug mode when any of its files changed."""
+        key = (self.templates_dir, template_name)
+        compiled = self._cache.get(key)
+        if compiled is None or (settings.debug and compiled.mtimes != self._mtimes(template_name)):
+            compiled = self._compile(template_name)
+            self._cache[key] = compiled
+        return compiled
+
+    def render_template(self, template_name: str, **context) -> str:
+        """Render a markdown template with given context, applying advanced email styles."""
+        return self.get_template(template_name).render(context)
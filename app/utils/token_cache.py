@@ -0,0 +1,72 @@
+from builtins import bytes, dict, float, int, isinstance, len, round, str
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class TokenCache:
+    """
+    Bounded LRU of verified token claims, keyed by a SHA-256 digest of the token.
+
+    A hit skips signature verification and claim parsing. Entries are dropped once the
+    token's exp passes, so a cached token is never accepted after it would have been
+    rejected, and tokens without exp are never cached. Only successfully verified tokens
+    are stored. Thread-safe: sync dependencies run in FastAPI's thread pool.
+    """
+
+    def __init__(self, max_size: int, clock: Callable[[], float] = time.time):
+        self.max_size = max_size
+        self.clock = clock
+        self._entries: "OrderedDict[bytes, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached claims for token, or None."""
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.clock() < entry[1]:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return dict(entry[0])
+            if entry is not None:
+                del self._entries[key]
+            self._misses += 1
+            return None
+
+    def put(self, token: str, claims: Dict[str, Any]):
+        exp = claims.get("exp")
+        if not isinstance(exp, (int, float)) or self.max_size <= 0:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (dict(claims), exp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,54 @@
+"""
+SMTP send throughput by pool size, against the in-process sink from tests/smtp_sink.py.
+
+    python -m benchmarks.smtp_throughput --messages 500 --pool-sizes 1,2,4,8 --handshake-delay 0.05
+
+handshake_delay approximates the connect + STARTTLS + AUTH cost of the real relay; measure
+that against production (e.g. time `openssl s_client -starttls smtp`) before sizing the pool.
+The "per-message" row reconnects for every message, like the client did before pooling.
+"""
+from builtins import float, int, list, max, print, range
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.utils.smtp_connection import SMTPClient
+from tests.smtp_sink import SMTPSink
+
+
+def run(sink: SMTPSink, messages: int, concurrency: int, pool_size: int, idle_timeout: float) -> float:
+    client = SMTPClient(
+        sink.host, sink.port, "bench@example.com", "secret",
+        pool_size=pool_size, idle_timeout=idle_timeout, use_tls=False,
+    )
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(lambda i: client.send_email("Benchmark", "<p>Hello</p>", f"user{i}@example.com"), range(messages)))
+    elapsed = time.perf_counter() - started
+    client.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16, help="Sending threads.")
+    parser.add_argument("--pool-sizes", default="1,2,4,8")
+    parser.add_argument("--handshake-delay", type=float, default=0.05, help="Seconds added to greeting and AUTH.")
+    args = parser.parse_args()
+
+    with SMTPSink(handshake_delay=args.handshake_delay) as sink:
+        print(f"{'mode':>12} {'pool':>5} {'seconds':>8} {'msgs/s':>8} {'connections':>12}")
+        sizes = [int(size) for size in args.pool_sizes.split(",")]
+        # idle_timeout=0 evicts every session as soon as it is returned
+        rows = [("per-message", max(sizes), 0.0)] + [("pooled", size, 60.0) for size in sizes]
+        for mode, pool_size, idle_timeout in rows:
+            connections_before = sink.connections
+            elapsed = run(sink, args.messages, args.concurrency, pool_size, idle_timeout)
+            print(
+                f"{mode:>12} {pool_size:>5} {elapsed:>8.2f} {args.messages / elapsed:>8.1f} "
+                f"{sink.connections - connections_before:>12}"
+            )
+
+
+if __name__ == "__main__":
+    main()
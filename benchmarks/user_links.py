@@ -0,0 +1,55 @@
+"""
+Time to build the hypermedia links of a page of users, which GET /users/ returns on every item.
+
+    python -m benchmarks.user_links --users 1000 --repeat 20
+
+"url_for" is create_user_links, which resolves each route by name with request.url_for
+for every link; "builder" is LinkBuilder, which looked the route paths up once. Both build
+validated Link models, three per user, against the real app's routes.
+"""
+from builtins import int, min, print, range
+import argparse
+import time
+from uuid import uuid4
+from fastapi import Request
+from app.main import app
+from app.utils.link_generation import USER_LINK_ACTIONS, LinkBuilder, create_user_links
+
+
+def make_request() -> Request:
+    return Request({
+        "type": "http", "app": app, "router": app.router, "scheme": "http", "server": ("testserver", 80),
+        "root_path": "", "path": "/users/", "query_string": b"", "headers": [(b"host", b"testserver")],
+    })
+
+
+def best_of(repeat: int, page) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        page()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    request = make_request()
+    user_ids = [uuid4() for _ in range(args.users)]
+    builder = LinkBuilder(app.routes, USER_LINK_ACTIONS)
+    modes = [
+        ("url_for", lambda: [create_user_links(user_id, request) for user_id in user_ids]),
+        ("builder", lambda: [builder.links(request.base_url, user_id=user_id) for user_id in user_ids]),
+    ]
+    print(f"{'mode':>8} {'ms/page':>9} {'us/user':>9}")
+    for mode, page in modes:
+        elapsed = best_of(args.repeat, page)
+        print(f"{mode:>8} {elapsed * 1000:>9.2f} {elapsed * 1e6 / args.users:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
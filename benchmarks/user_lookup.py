@@ -0,0 +1,92 @@
+"""
+Latency of a single user lookup by email, by statement construction and statement cache mode.
+
+    python -m benchmarks.user_lookup --lookups 2000 --users 200
+
+Runs against DATABASE_URL, which must already have the users table; point it at a scratch
+database. The benchmark inserts --users rows with @bench.example.com emails and deletes
+them afterwards. Lookups run one at a time on one session, so the numbers are per-lookup
+latency on an idle server, not throughput.
+
+    rebuilt    select(User).filter_by(email=...) built on every call, as before
+    prebuilt   UserService's USER_BY_KEY statement with a bound parameter
+
+and for each, the asyncpg prepared statement cache at its default size, disabled, and in
+pgbouncer mode (disabled, with unique statement names).
+"""
+from builtins import float, int, len, print, range, sorted, sum
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app.database import asyncpg_connect_args, execute_read
+from app.models.user_model import User, UserRole
+from app.services.user_service import USER_BY_KEY
+from settings.config import settings
+
+BENCH_DOMAIN = "bench.example.com"
+
+
+async def lookup_rebuilt(session: AsyncSession, email: str):
+    return (await execute_read(session, select(User).filter_by(email=email))).scalars().first()
+
+
+async def lookup_prebuilt(session: AsyncSession, email: str):
+    return (await execute_read(session, USER_BY_KEY["email"], {"value": email})).scalars().first()
+
+
+async def run(connect_args, lookup, emails, lookups: int):
+    engine = create_async_engine(settings.database_url, pool_size=1, connect_args=connect_args)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    timings = []
+    try:
+        async with session_factory() as session:
+            # Warm up the connection and caches
+            for email in emails[:10]:
+                await lookup(session, email)
+            for i in range(lookups):
+                session.expunge_all()
+                started = time.perf_counter()
+                await lookup(session, emails[i % len(emails)])
+                timings.append(time.perf_counter() - started)
+    finally:
+        await engine.dispose()
+    timings = sorted(timings)
+    return sum(timings) / len(timings), timings[len(timings) // 2], timings[int(len(timings) * 0.99)]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=200)
+    args = parser.parse_args()
+
+    emails = [f"user{i}-{uuid4().hex[:8]}@{BENCH_DOMAIN}" for i in range(args.users)]
+    setup = create_async_engine(settings.database_url)
+    async with setup.begin() as conn:
+        await conn.execute(insert(User), [
+            {"id": uuid4(), "email": email, "nickname": email.split("@")[0], "role": UserRole.AUTHENTICATED,
+             "hashed_password": "x", "email_verified": True}
+            for email in emails
+        ])
+    try:
+        modes = [
+            ("cache 100", asyncpg_connect_args(100)),
+            ("cache off", asyncpg_connect_args(0)),
+            ("pgbouncer", asyncpg_connect_args(0, pgbouncer=True)),
+        ]
+        print(f"{'statement':>10} {'mode':>10} {'mean us':>9} {'p50 us':>9} {'p99 us':>9}")
+        for name, lookup in (("rebuilt", lookup_rebuilt), ("prebuilt", lookup_prebuilt)):
+            for mode, connect_args in modes:
+                mean, p50, p99 = await run(connect_args, lookup, emails, args.lookups)
+                print(f"{name:>10} {mode:>10} {mean * 1e6:>9.1f} {p50 * 1e6:>9.1f} {p99 * 1e6:>9.1f}")
+    finally:
+        async with setup.begin() as conn:
+            await conn.execute(delete(User).where(User.email.like(f"%@{BENCH_DOMAIN}")))
+        await setup.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,5 +1,6 @@
-from builtins import bool, int, str
+from builtins import bool, float, getattr, int, setattr, str
 from pathlib import Path
+from typing import List
 from pydantic import Field, AnyUrl, DirectoryPath
 from pydantic_settings import BaseSettings
 
@@ -18,7 +19,20 @@ class Settings(BaseSettings):
     jwt_secret_key: str = Field(default="a_very_secret_key", description="JWT secret key for signing")
     jwt_algorithm: str = Field(default="HS256", description="JWT algorithm")
     access_token_expire_minutes: int = Field(default=15, description="Access token expiration time in minutes")
+    token_cache_size: int = Field(default=4096, description="Verified access tokens kept in memory to skip re-verification (0 disables)")
     refresh_token_expire_minutes: int = Field(default=1440, description="Refresh token expiration time in minutes")
+    token_epoch_poll_interval: float = Field(default=1.0, description="Seconds between polls for token revocations made by other processes")
+
+    # Password hashing
+    password_hash_scheme: str = Field(default="bcrypt", description="Hashing scheme for new passwords: 'bcrypt' or 'argon2id'")
+    bcrypt_rounds: int = Field(default=12, description="bcrypt cost factor")
+    argon2_time_cost: int = Field(default=3, description="argon2id iterations")
+    argon2_memory_cost: int = Field(default=65536, description="argon2id memory in KiB")
+    argon2_parallelism: int = Field(default=4, description="argon2id lanes")
+    password_hash_target_ms: int = Field(default=250, description="Target hash latency in milliseconds for app.cli.calibrate_password_hashing")
+    password_hash_executor: str = Field(default="thread", description="Executor for password hashing: 'thread' or 'process'")
+    password_hash_workers: int = Field(default=0, description="Password hashing workers (0 uses the CPU count)")
+    password_hash_max_queue: int = Field(default=64, description="Maximum hashing jobs waiting for a worker before rejecting")
 
     # Default admin credentials
     admin_user: str = Field(default="admin", description="Default admin username")
@@ -26,12 +40,26 @@ class Settings(BaseSettings):
 
     # Database Configuration
     database_url: str = Field(..., description="Database connection URL")  # Required
+    database_replica_urls: List[str] = Field(default=[], description="Read replica connection URLs, as a JSON list")
+    database_replica_retry_seconds: float = Field(default=30.0, description="How long a failing read replica is skipped")
     postgres_user: str = Field(default="user", description="PostgreSQL username")
     postgres_password: str = Field(default="password", description="PostgreSQL password")
     postgres_server: str = Field(default="localhost", description="PostgreSQL server address")
     postgres_port: int = Field(default=5432, description="PostgreSQL port")
     postgres_db: str = Field(default="myappdb", description="PostgreSQL database name")
 
+    # Connection pool, per worker process: size it so workers x (db_pool_size + db_max_overflow)
+    # stays below the server's max_connections
+    db_pool_size: int = Field(default=5, description="Connections kept open in each worker's pool")
+    db_max_overflow: int = Field(default=10, description="Extra connections opened under load beyond db_pool_size")
+    db_pool_timeout: float = Field(default=30.0, description="Seconds to wait for a free connection before failing")
+    db_pool_recycle: int = Field(default=-1, description="Replace connections older than this many seconds (-1 never)")
+    db_pool_pre_ping: bool = Field(default=False, description="Test each connection with a ping on checkout")
+    db_statement_cache_size: int = Field(default=100, description="Prepared statements cached per connection (0 disables)")
+    db_pgbouncer: bool = Field(default=False, description="Connect through a transaction-pooling pgbouncer: no cached prepared statements")
+
+    count_cache_ttl_seconds: int = Field(default=60, description="How long cached row counts are reused")
+
     # Test Database Configuration (Optional)
     test_database_url: str = Field(None, description="Test database connection URL")  # Optional for tests
 
@@ -41,6 +69,18 @@ class Settings(BaseSettings):
     smtp_username: str = Field(..., description="SMTP username")  
     smtp_password: str = Field(..., description="SMTP password")  
     send_real_mail: bool = Field(default=False, description="Send real emails or use mock emails")
+    smtp_transport: str = Field(default="thread", description="SMTP transport: 'thread' (smtplib in worker threads) or 'async' (aiosmtplib)")
+    smtp_use_tls: bool = Field(default=True, description="Upgrade SMTP connections with STARTTLS")
+    smtp_timeout: float = Field(default=10.0, description="SMTP socket timeout in seconds")
+    smtp_pool_size: int = Field(default=4, description="Maximum open SMTP sessions")
+    smtp_idle_timeout: float = Field(default=60.0, description="Close pooled SMTP sessions idle for longer than this many seconds")
+    smtp_keepalive_interval: float = Field(default=15.0, description="Check pooled SMTP sessions idle for longer than this many seconds with NOOP before reuse")
+    email_outbox_batch_size: int = Field(default=50, description="Outbox emails claimed per dispatcher poll")
+    email_outbox_poll_interval: float = Field(default=5.0, description="Seconds between outbox polls when idle")
+    email_outbox_lease_seconds: int = Field(default=120, description="How long a claimed outbox email is hidden from other dispatchers")
+    email_outbox_max_attempts: int = Field(default=8, description="Delivery attempts before an outbox email is dead-lettered")
+    email_outbox_backoff_base: float = Field(default=30.0, description="Seconds before the first retry; doubles per attempt")
+    email_outbox_backoff_max: float = Field(default=3600.0, description="Upper bound on the retry delay in seconds")
 
     
     discord_bot_token: str = Field(default="NONE", description="Discord bot token")
@@ -61,3 +101,15 @@ class Settings(BaseSettings):
 
 
 settings = Settings()
+
+
+def reload_settings(**overrides) -> Settings:
+    """
+    Re-read the environment and .env into the shared settings instance, with overrides taking
+    precedence. The instance is updated in place, so modules that imported it see the new
+    values; objects already built from settings (pools, clients) keep their old configuration.
+    """
+    fresh = Settings(**overrides)
+    for name in Settings.model_fields:
+        setattr(settings, name, getattr(fresh, name))
+    return settings
@@ -0,0 +1,105 @@
+"""
+A minimal in-process SMTP server that accepts and records every message.
+
+Speaks just enough SMTP for smtplib (EHLO/HELO, AUTH PLAIN, MAIL, RCPT, DATA, NOOP, RSET,
+QUIT); no STARTTLS, so clients must be created with use_tls=False. handshake_delay adds a
+pause to the greeting and AUTH to mimic a remote relay's connection setup cost.
+"""
+from builtins import bytes, int, len, list, str
+import socket
+import socketserver
+import threading
+import time
+from typing import List, Tuple
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        sink = self.server.sink
+        with sink.lock:
+            sink.connections += 1
+            sink.sockets.append(self.connection)
+        time.sleep(sink.handshake_delay)
+        self.reply("220 sink ESMTP")
+        sender, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.reply("250-sink")
+                self.reply("250 AUTH PLAIN")
+            elif verb == "HELO":
+                self.reply("250 sink")
+            elif verb == "AUTH":
+                time.sleep(sink.handshake_delay)
+                self.reply("235 2.7.0 Authentication successful")
+            elif verb == "MAIL":
+                sender, recipients = command[10:].strip("<>"), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command[8:].strip("<>"))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk == b".\r\n":
+                        break
+                    data.append(chunk)
+                with sink.lock:
+                    sink.messages.append((sender, recipients, b"".join(data)))
+                self.reply("250 OK queued")
+            elif verb in ("NOOP", "RSET"):
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+    """Run with `with SMTPSink() as sink:`; connect to sink.host and sink.port."""
+
+    def __init__(self, handshake_delay: float = 0.0):
+        self.handshake_delay = handshake_delay
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages: List[Tuple[str, List[str], bytes]] = []
+        self.sockets: List[socket.socket] = []
+        self._server = _Server(("127.0.0.1", 0), _SMTPHandler)
+        self._server.sink = self
+        self.host, self.port = self._server.server_address
+
+    def __enter__(self) -> "SMTPSink":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def disconnect_all(self):
+        """Drop every open client connection, as a relay closing idle sessions would."""
+        with self.lock:
+            sockets, self.sockets = self.sockets, []
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def __len__(self) -> int:
+        return len(self.messages)
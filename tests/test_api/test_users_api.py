@@ -1,7 +1,7 @@
 import pytest
 from httpx import AsyncClient
 from app.models.user_model import User, UserRole
-from app.services.jwt_service import decode_token
+from app.services.jwt_service import create_access_token, decode_token
 from urllib.parse import urlencode
 
 
@@ -164,3 +164,202 @@ async def test_user_login_after_profile_update(async_client, verified_user, user
     response = await async_client.get("/users/", headers=headers)
     assert response.status_code == 200
     assert "Updated Bio" in response.text
+
+
+@pytest.mark.asyncio
+async def test_list_users_with_cursor_links(async_client, admin_token, users_with_same_role_50_users):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/?limit=30&count=exact", headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["items"]) == 30
+    assert body["total"] == 51  # 50 users plus the admin
+    next_link = next(link["href"] for link in body["links"] if link["rel"] == "next")
+
+    response = await async_client.get(next_link, headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["items"]) == 21
+    assert body["next_cursor"] is None
+    assert body["total"] == 51
+    assert any(link["rel"] == "prev" for link in body["links"])
+
+
+@pytest.mark.asyncio
+async def test_get_user_includes_links(async_client, admin_token, verified_user):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get(f"/users/{verified_user.id}", headers=headers)
+    assert response.status_code == 200
+    links = {link["rel"]: link["href"] for link in response.json()["links"]}
+    assert links == {
+        "self": f"http://testserver/users/{verified_user.id}",
+        "update": f"http://testserver/users/{verified_user.id}/profile",
+        "delete": f"http://testserver/users/{verified_user.id}",
+    }
+
+
+@pytest.mark.asyncio
+async def test_list_users_includes_user_links(async_client, admin_token, users_with_same_role_50_users):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/?limit=30", headers=headers)
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert len(items) == 30
+    for item in items:
+        assert [link["rel"] for link in item["links"]] == ["self", "update", "delete"]
+        assert item["links"][0]["href"] == f"http://testserver/users/{item['id']}"
+
+
+@pytest.mark.asyncio
+async def test_list_users_invalid_cursor(async_client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/?cursor=bogus", headers=headers)
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_list_users_forbidden_for_authenticated_user(async_client, user_token):
+    headers = {"Authorization": f"Bearer {user_token}"}
+    response = await async_client.get("/users/", headers=headers)
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_batch_get_users(async_client, admin_token, users_with_same_role_50_users):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    wanted = users_with_same_role_50_users[:3]
+    missing_id = "00000000-0000-0000-0000-000000000000"
+    payload = {
+        "ids": [str(wanted[0].id), str(wanted[1].id), missing_id],
+        "emails": [wanted[1].email, wanted[2].email, "nobody@example.com"],
+    }
+    response = await async_client.post("/users/batch-get", json=payload, headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert {item["id"] for item in body["items"]} == {str(user.id) for user in wanted}
+    assert body["missing_ids"] == [missing_id]
+    assert body["missing_emails"] == ["nobody@example.com"]
+
+
+@pytest.mark.asyncio
+async def test_batch_get_users_requires_keys(async_client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.post("/users/batch-get", json={"ids": []}, headers=headers)
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_batch_get_users_caps_total_keys(async_client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    payload = {
+        "ids": ["00000000-0000-0000-0000-%012d" % i for i in range(60)],
+        "emails": [f"user{i}@example.com" for i in range(60)],
+    }
+    response = await async_client.post("/users/batch-get", json=payload, headers=headers)
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_update_own_profile(async_client, verified_user):
+    token = create_access_token(data={"sub": str(verified_user.id), "role": verified_user.role.name})
+    headers = {"Authorization": f"Bearer {token}"}
+    response = await async_client.patch(
+        f"/users/{verified_user.id}/profile", json={"bio": "Fresh Bio", "first_name": "Ada"}, headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json()["bio"] == "Fresh Bio"
+    assert response.json()["first_name"] == "Ada"
+    assert response.json()["last_name"] == verified_user.last_name
+
+
+@pytest.mark.asyncio
+async def test_import_users(async_client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    ndjson = (
+        '{"email": "imported@example.com", "password": "Secure*1234"}\n'
+        '{"email": "broken"}\n'
+    )
+    files = {"file": ("users.ndjson", ndjson, "application/x-ndjson")}
+    response = await async_client.post("/users/import", files=files, headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["created"] == 1
+    assert body["failed"] == 1
+    assert body["errors"][0]["row"] == 2
+
+
+@pytest.mark.asyncio
+async def test_import_users_requires_admin(async_client, manager_token):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    files = {"file": ("users.csv", "email,password\n", "text/csv")}
+    response = await async_client.post("/users/import", files=files, headers=headers)
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_login_returns_refresh_token(async_client, verified_user):
+    form_data = {"username": verified_user.email, "password": "MySuperPassword$1234"}
+    response = await async_client.post("/login/", data=urlencode(form_data), headers={"Content-Type": "application/x-www-form-urlencoded"})
+    assert response.status_code == 200
+    assert decode_token(response.json()["refresh_token"])["type"] == "refresh"
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_rotation(async_client, verified_user):
+    form_data = {"username": verified_user.email, "password": "MySuperPassword$1234"}
+    response = await async_client.post("/login/", data=urlencode(form_data), headers={"Content-Type": "application/x-www-form-urlencoded"})
+    refresh_token = response.json()["refresh_token"]
+
+    response = await async_client.post("/token/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 200
+    body = response.json()
+    assert decode_token(body["access_token"])["sub"] == str(verified_user.id)
+    assert body["refresh_token"] != refresh_token
+
+    # The old token was used; presenting it again revokes the new one as well
+    response = await async_client.post("/token/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 401
+    response = await async_client.post("/token/refresh", json={"refresh_token": body["refresh_token"]})
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_rejected_as_access_token(async_client, verified_user):
+    form_data = {"username": verified_user.email, "password": "MySuperPassword$1234"}
+    response = await async_client.post("/login/", data=urlencode(form_data), headers={"Content-Type": "application/x-www-form-urlencoded"})
+    headers = {"Authorization": f"Bearer {response.json()['refresh_token']}"}
+    response = await async_client.get(f"/users/{verified_user.id}", headers=headers)
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_get_user_sparse_fields(async_client, admin_token, verified_user):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get(f"/users/{verified_user.id}?fields=nickname,role", headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {"id": str(verified_user.id), "nickname": verified_user.nickname, "role": "AUTHENTICATED"}
+
+
+@pytest.mark.asyncio
+async def test_get_user_sparse_fields_rejects_unknown_and_hidden_fields(async_client, admin_token, verified_user):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get(f"/users/{verified_user.id}?fields=nickname,hashed_password", headers=headers)
+    assert response.status_code == 400
+    response = await async_client.get("/users/00000000-0000-0000-0000-000000000000?fields=nickname", headers=headers)
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_list_users_sparse_fields(async_client, admin_token, users_with_same_role_50_users):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/?limit=30&fields=nickname", headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["items"]) == 30
+    assert all(set(item) == {"id", "nickname"} for item in body["items"])
+    next_link = next(link["href"] for link in body["links"] if link["rel"] == "next")
+
+    response = await async_client.get(next_link, headers=headers)
+    body = response.json()
+    assert len(body["items"]) == 21
+    assert all(set(item) == {"id", "nickname"} for item in body["items"])
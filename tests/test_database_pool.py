@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.database import Database, asyncpg_connect_args, execute_read
+from app.services.user_service import USER_BY_KEY
+from app.utils.pool_monitor import MonitoredAsyncQueuePool, PoolMonitor, pool_status
+from settings.config import settings
+
+
+@pytest.fixture
+async def monitored_engine():
+    engine = create_async_engine(
+        settings.database_url, poolclass=MonitoredAsyncQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.2
+    )
+    monitor = PoolMonitor()
+    monitor.attach(engine.sync_engine)
+    engine.sync_engine.pool.monitor = monitor
+    try:
+        yield engine, monitor
+    finally:
+        await engine.dispose()
+
+
+async def test_checkouts_are_counted(monitored_engine):
+    engine, monitor = monitored_engine
+    for _ in range(3):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            assert pool_status(engine.sync_engine.pool)["in_use"] == 1
+    stats = monitor.stats()
+    assert stats["checkouts"] == 3
+    assert stats["connections_opened"] == 1
+    assert stats["peak_in_use"] == 1
+    assert pool_status(engine.sync_engine.pool) == {
+        "pool_size": 1, "max_overflow": 0, "in_use": 0, "idle": 1, "overflow": 0, "timeout": 0.2,
+    }
+
+
+async def test_waits_and_timeouts_are_recorded(monitored_engine):
+    engine, monitor = monitored_engine
+
+    async def hold(seconds):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            await asyncio.sleep(seconds)
+
+    holder = asyncio.create_task(hold(0.5))
+    await asyncio.sleep(0.05)
+    with pytest.raises(exc.TimeoutError):
+        async with engine.connect():
+            pass
+    await holder
+    assert monitor.stats()["timeouts"] == 1
+
+    holder = asyncio.create_task(hold(0.1))
+    await asyncio.sleep(0.02)
+    async with engine.connect():
+        pass
+    await holder
+    assert monitor.stats()["max_wait_ms"] >= 50
+
+
+async def test_monitor_survives_dispose(monitored_engine):
+    engine, monitor = monitored_engine
+    await engine.dispose()
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    assert engine.sync_engine.pool.monitor is monitor
+    assert monitor.stats()["connections_opened"] == 1
+
+
+def test_database_uses_pool_settings():
+    stats = Database.pool_stats()
+    assert stats["pool_size"] == settings.db_pool_size
+    assert stats["max_overflow"] == settings.db_max_overflow
+    assert stats["timeout"] == settings.db_pool_timeout
+
+
+async def test_admin_metrics_include_pool(async_client, admin_token):
+    response = await async_client.get("/admin/metrics", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    pool = response.json()["database_pool"]
+    assert pool["pool_size"] == settings.db_pool_size
+    assert pool["server_max_connections"] > 0
+
+
+def test_connect_args():
+    assert asyncpg_connect_args(250) == {"prepared_statement_cache_size": 250}
+    args = asyncpg_connect_args(250, pgbouncer=True)
+    assert args["statement_cache_size"] == 0
+    assert args["prepared_statement_cache_size"] == 0
+    assert args["prepared_statement_name_func"]() != args["prepared_statement_name_func"]()
+
+
+async def test_prebuilt_lookup_in_pgbouncer_mode(verified_user):
+    engine = create_async_engine(settings.database_url, connect_args=asyncpg_connect_args(0, pgbouncer=True))
+    try:
+        async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+            for _ in range(2):
+                result = await execute_read(session, USER_BY_KEY["email"], {"value": verified_user.email})
+                assert result.scalars().one().id == verified_user.id
+    finally:
+        await engine.dispose()
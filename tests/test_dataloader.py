@@ -0,0 +1,82 @@
+from builtins import AttributeError, RuntimeError, dict, len, list
+import asyncio
+import pytest
+from app.utils.dataloader import DataLoader
+
+pytestmark = pytest.mark.asyncio
+
+
+def make_loader(calls):
+    async def batch_load(keys):
+        calls.append(sorted(keys))
+        return {key: key * 10 for key in keys if key != 0}
+    return DataLoader(batch_load)
+
+
+async def test_concurrent_loads_are_batched():
+    calls = []
+    loader = make_loader(calls)
+    results = await asyncio.gather(loader.load(1), loader.load(2), loader.load(3), loader.load(2))
+    assert results == [10, 20, 30, 20]
+    assert calls == [[1, 2, 3]]
+
+
+async def test_missing_keys_resolve_to_none():
+    loader = make_loader([])
+    assert await loader.load_many([0, 4]) == [None, 40]
+
+
+async def test_sequential_loads_use_separate_batches():
+    calls = []
+    loader = make_loader(calls)
+    assert await loader.load(1) == 10
+    assert await loader.load(1) == 10
+    assert calls == [[1], [1]]
+
+
+async def test_batch_errors_propagate_to_every_caller():
+    async def failing(keys):
+        raise RuntimeError("boom")
+    loader = DataLoader(failing)
+    results = await asyncio.gather(loader.load(1), loader.load(2), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+async def test_running_batches_are_held_until_done():
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow(keys):
+        started.set()
+        await release.wait()
+        return {key: key for key in keys}
+    loader = DataLoader(slow)
+    load = asyncio.ensure_future(loader.load(1))
+    await started.wait()
+    assert len(loader._tasks) == 1
+    release.set()
+    assert await load == 1
+    assert not loader._tasks
+
+
+async def test_cancelled_batch_cancels_every_caller():
+    started = asyncio.Event()
+
+    async def hang(keys):
+        started.set()
+        await asyncio.Event().wait()
+    loader = DataLoader(hang)
+    loads = asyncio.gather(loader.load(1), loader.load(2), return_exceptions=True)
+    await started.wait()
+    for task in list(loader._tasks):
+        task.cancel()
+    results = await asyncio.wait_for(loads, 1)
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+
+
+async def test_malformed_batch_result_fails_every_caller():
+    async def not_a_dict(keys):
+        return [key for key in keys]
+    loader = DataLoader(not_a_dict)
+    results = await asyncio.wait_for(asyncio.gather(loader.load(1), loader.load(2), return_exceptions=True), 1)
+    assert all(isinstance(result, AttributeError) for result in results)
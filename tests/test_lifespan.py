@@ -0,0 +1,60 @@
+import pytest
+from fastapi import Request
+from app.dependencies import get_email_dispatcher, get_email_service, get_template_manager
+from app.main import app
+from app.services.email_outbox import EmailOutboxDispatcher
+from settings.config import settings
+
+
+@pytest.fixture
+def clean_state():
+    for name in ("template_manager", "email_service", "email_dispatcher"):
+        setattr(app.state, name, None)
+    yield app.state
+    for name in ("template_manager", "email_service", "email_dispatcher"):
+        setattr(app.state, name, None)
+
+
+def make_request() -> Request:
+    return Request({"type": "http", "app": app})
+
+
+def fake_email_service_init(self, template_manager):
+    self.template_manager = template_manager
+    self.smtp_client = object()
+    self.closed = False
+
+    async def close():
+        self.closed = True
+    self.close = close
+
+
+async def test_lifespan_creates_shared_services(clean_state, monkeypatch):
+    monkeypatch.setattr(settings, "smtp_username", "")
+    monkeypatch.setattr(settings, "smtp_password", "")
+    async with app.router.lifespan_context(app):
+        request = make_request()
+        email_service = get_email_service(request)
+        assert email_service is clean_state.email_service
+        assert get_email_service(make_request()) is email_service
+        assert get_template_manager(request) is email_service.template_manager
+        assert get_email_dispatcher(request).email_service is email_service
+        # No SMTP credentials, so nothing to dispatch to
+        assert not clean_state.email_dispatcher.running
+
+
+async def test_lifespan_starts_and_stops_dispatcher(clean_state, monkeypatch):
+    monkeypatch.setattr("app.services.email_service.EmailService.__init__", fake_email_service_init)
+    async with app.router.lifespan_context(app):
+        dispatcher = clean_state.email_dispatcher
+        assert dispatcher.running
+        assert dispatcher in EmailOutboxDispatcher.running_dispatchers
+    assert not dispatcher.running
+    assert dispatcher not in EmailOutboxDispatcher.running_dispatchers
+    assert clean_state.email_service.closed
+
+
+def test_services_are_created_on_first_use_without_lifespan(clean_state):
+    request = make_request()
+    assert get_email_service(request) is get_email_service(request)
+    assert isinstance(get_email_dispatcher(request), EmailOutboxDispatcher)
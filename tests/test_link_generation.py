@@ -6,7 +6,10 @@ from uuid import uuid4
 import pytest
 from fastapi import Request
 
-from app.utils.link_generation import create_link, create_pagination_link, create_user_links, generate_pagination_links
+from app.main import app
+from app.utils.link_generation import (
+    USER_LINK_ACTIONS, LinkBuilder, create_link, create_pagination_link, create_user_links, generate_pagination_links
+)
 
 from urllib.parse import urlparse, parse_qs, urlunparse, urlencode
 
@@ -38,7 +41,7 @@ def test_create_user_links(mock_request):
     links = create_user_links(user_id, mock_request)
     assert len(links) == 3
     assert normalize_url(str(links[0].href)) == f"http://testserver/get_user/{user_id}"
-    assert normalize_url(str(links[1].href)) == f"http://testserver/update_user/{user_id}"
+    assert normalize_url(str(links[1].href)) == f"http://testserver/update_user_profile/{user_id}"
     assert normalize_url(str(links[2].href)) == f"http://testserver/delete_user/{user_id}"
 
 def test_generate_pagination_links(mock_request):
@@ -49,3 +52,29 @@ def test_generate_pagination_links(mock_request):
     assert len(links) >= 4
     expected_self_url = "http://testserver/users?limit=5&skip=10"
     assert normalize_url(str(links[0].href)) == normalize_url(expected_self_url), "Self link should match expected URL"
+
+def test_generate_cursor_pagination_links(mock_request):
+    links = generate_pagination_links(mock_request, 0, 5, None, next_cursor="abc", prev_cursor="xyz")
+    hrefs = {link.rel: normalize_url(str(link.href)) for link in links}
+    assert hrefs["first"] == normalize_url("http://testserver/users?limit=5")
+    assert hrefs["next"] == normalize_url("http://testserver/users?cursor=abc&limit=5")
+    assert hrefs["prev"] == normalize_url("http://testserver/users?cursor=xyz&limit=5")
+    assert "last" not in hrefs
+
+def test_generate_cursor_pagination_links_last_page(mock_request):
+    links = generate_pagination_links(mock_request, 0, 5, None, prev_cursor="xyz")
+    assert {link.rel for link in links} == {"self", "first", "prev"}
+
+def test_link_builder_matches_url_for():
+    request = Request({
+        "type": "http", "app": app, "router": app.router, "scheme": "http", "server": ("testserver", 80),
+        "root_path": "", "path": "/users/", "query_string": b"", "headers": [(b"host", b"testserver")],
+    })
+    builder = LinkBuilder(app.routes, USER_LINK_ACTIONS)
+    user_id = uuid4()
+    assert builder.links(request.base_url, user_id=user_id) == create_user_links(user_id, request)
+    assert str(builder.links(request.base_url, user_id=user_id)[1].href) == f"http://testserver/users/{user_id}/profile"
+
+def test_link_builder_rejects_unknown_routes():
+    with pytest.raises(ValueError, match="update_user"):
+        LinkBuilder(app.routes, [("update", "update_user", "PUT", "update")])
@@ -0,0 +1,18 @@
+from builtins import len, set
+import re
+from app.utils.nickname_gen import ADJECTIVES, ANIMALS, NUMBER_RANGE, generate_nickname, generate_nicknames
+
+
+def test_generate_nickname_is_url_safe():
+    nickname = generate_nickname()
+    assert re.match(r'^[\w-]+$', nickname)
+    assert len(nickname) <= 50
+
+
+def test_generate_nicknames_are_distinct():
+    nicknames = generate_nicknames(50)
+    assert len(set(nicknames)) == 50
+
+
+def test_nickname_space_is_large():
+    assert len(set(ADJECTIVES)) * len(set(ANIMALS)) * NUMBER_RANGE > 10_000_000
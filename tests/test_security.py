@@ -1,7 +1,33 @@
 # test_security.py
-from builtins import RuntimeError, ValueError, isinstance, str
+from builtins import RuntimeError, TypeError, ValueError, isinstance, range, str
+import asyncio
+import threading
 import pytest
-from app.utils.security import hash_password, verify_password
+from app.cli.calibrate_password_hashing import parse_args, run
+from app.utils.password_hashers import (
+    Argon2idHasher,
+    BcryptHasher,
+    PasswordHasher,
+    calibrate_hasher,
+    identify_hasher,
+    set_default_hasher,
+)
+from app.utils.security import (
+    PasswordHashPool,
+    PasswordHashQueueFull,
+    hash_password,
+    hash_password_async,
+    needs_rehash,
+    verify_password,
+    verify_password_async,
+)
+
+@pytest.fixture
+def argon2_default():
+    """Temporarily make a cheap argon2id the default hasher."""
+    set_default_hasher(Argon2idHasher(time_cost=2, memory_cost=1024, parallelism=1))
+    yield
+    set_default_hasher(None)
 
 def test_hash_password():
     """Test that hashing password returns a bcrypt hashed string."""
@@ -65,3 +91,91 @@ def test_hash_password_internal_error(monkeypatch):
     with pytest.raises(ValueError):
         hash_password("test")
 
+async def test_hash_and_verify_password_async():
+    """Test that the async helpers hash and verify on the worker pool."""
+    hashed = await hash_password_async("secure_password", 4)
+    assert hashed.startswith('$2b$04$')
+    assert await verify_password_async("secure_password", hashed) is True
+    assert await verify_password_async("wrong_password", hashed) is False
+
+async def test_verify_password_async_invalid_hash():
+    """Test that errors raised in the worker propagate to the caller."""
+    with pytest.raises(ValueError):
+        await verify_password_async("secure_password", "invalid_hash_format")
+
+async def test_hash_pool_rejects_when_queue_full():
+    """Test that the pool rejects work beyond workers + max_queue and records metrics."""
+    pool = PasswordHashPool(workers=1, executor="thread", max_queue=1)
+    release = threading.Event()
+    try:
+        running = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(PasswordHashQueueFull):
+            await pool.run(release.wait)
+        release.set()
+        await asyncio.gather(*running)
+    finally:
+        pool.shutdown()
+    stats = pool.stats()
+    assert stats["completed"] == 2
+    assert stats["rejected"] == 1
+    assert stats["in_flight"] == 0
+    assert stats["queue_wait_max_ms"] > 0
+
+def test_hash_pool_rejects_unknown_executor():
+    with pytest.raises(ValueError):
+        PasswordHashPool(workers=1, executor="fiber")
+
+def test_default_hasher_uses_argon2id(argon2_default):
+    """Test that new hashes follow the configured default scheme."""
+    hashed = hash_password("secure_password")
+    assert hashed.startswith('$argon2id$')
+    assert verify_password("secure_password", hashed) is True
+    assert verify_password("wrong_password", hashed) is False
+
+def test_verify_bcrypt_hash_with_argon2_default(argon2_default):
+    """Test that existing bcrypt hashes still verify after switching schemes."""
+    hashed = hash_password("secure_password", 4)
+    assert verify_password("secure_password", hashed) is True
+    assert needs_rehash(hashed) is True
+
+def test_needs_rehash_on_bcrypt_cost_change():
+    set_default_hasher(BcryptHasher(rounds=5))
+    try:
+        assert needs_rehash(hash_password("secure_password", 4)) is True
+        assert needs_rehash(hash_password("secure_password", 5)) is False
+    finally:
+        set_default_hasher(None)
+
+def test_identify_hasher():
+    assert identify_hasher(hash_password("secure_password", 4)) is BcryptHasher
+    with pytest.raises(ValueError):
+        identify_hasher("invalid_hash_format")
+
+def test_incomplete_hasher_fails_when_created():
+    class HashOnly(PasswordHasher):
+        def hash(self, password):
+            return password
+    with pytest.raises(TypeError):
+        HashOnly()
+
+def test_calibrate_hasher_respects_minimum_cost():
+    """Test that calibration never goes below the scheme's minimum cost."""
+    hasher = calibrate_hasher("bcrypt", target_ms=0)
+    assert hasher.rounds == BcryptHasher.min_rounds
+
+def test_calibrate_hasher_unknown_scheme():
+    with pytest.raises(ValueError):
+        calibrate_hasher("md5", target_ms=100)
+
+def test_calibration_is_written_to_env_file(tmp_path):
+    """Test that the calibration command stores its choice as settings, keeping other lines."""
+    env_file = tmp_path / ".env"
+    env_file.write_text("# local settings\nbcrypt_rounds=12\nsmtp_port=2525\n")
+    run(parse_args(["--scheme", "bcrypt", "--target-ms", "0", "--env-file", str(env_file)]))
+    assert env_file.read_text().splitlines() == [
+        "# local settings",
+        f"bcrypt_rounds={BcryptHasher.min_rounds}",
+        "smtp_port=2525",
+        "password_hash_scheme=bcrypt",
+    ]
@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy import text
+from app.models.user_model import User
+from app.services.count_service import CountMode, CountService
+from app.services.user_service import UserService
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture(autouse=True)
+def clear_count_cache():
+    CountService.invalidate(User)
+    yield
+    CountService.invalidate(User)
+
+
+async def test_exact_count(db_session, users_with_same_role_50_users):
+    assert await UserService.count(db_session) == 50
+
+
+async def test_cached_count_is_reused_until_invalidated(db_session, users_with_same_role_50_users, user):
+    assert await UserService.count(db_session, CountMode.CACHED) == 51
+    await db_session.delete(user)
+    await db_session.commit()
+    # The cache doesn't see writes that bypass UserService...
+    assert await UserService.count(db_session, CountMode.CACHED) == 51
+    # ...but UserService deletes invalidate it
+    await UserService.delete(db_session, users_with_same_role_50_users[0].id)
+    assert await UserService.count(db_session, CountMode.CACHED) == 49
+
+
+async def test_approximate_count_uses_planner_statistics(db_session, users_with_same_role_50_users):
+    await db_session.execute(text("ANALYZE users"))
+    assert await UserService.count(db_session, CountMode.APPROXIMATE) == 50
+
+
+async def test_approximate_count_falls_back_without_statistics(db_session, users_with_same_role_50_users):
+    assert await UserService.count(db_session, CountMode.APPROXIMATE) == 50
@@ -0,0 +1,107 @@
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.models.email_outbox_model import EmailOutbox, OutboxStatus
+from app.services.email_outbox import EmailOutboxDispatcher, enqueue_email, outbox_depth
+from app.services.email_service import EmailService
+from app.services.user_service import UserService
+from app.utils.smtp_connection import AsyncSMTPClient
+from app.utils.template_manager import TemplateManager
+from tests.smtp_sink import SMTPSink
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def mailer():
+    return AsyncMock(spec=EmailService)
+
+
+@pytest.fixture
+def dispatcher(db_session, mailer):
+    session_factory = async_sessionmaker(db_session.bind, expire_on_commit=False)
+    return EmailOutboxDispatcher(mailer, session_factory=session_factory, max_attempts=2, backoff_base=60)
+
+
+async def queue_email(db_session, recipient="someone@example.com") -> EmailOutbox:
+    entry = enqueue_email(db_session, "email_verification", {"email": recipient, "name": "Someone"})
+    await db_session.commit()
+    return entry
+
+
+async def test_create_user_queues_verification_email(db_session, email_service):
+    user = await UserService.create(db_session, {
+        "email": "outbox@example.com", "password": "Secure*1234", "role": "AUTHENTICATED",
+    }, email_service)
+    email_service.send_verification_email.assert_not_called()
+    result = await db_session.execute(select(EmailOutbox).where(EmailOutbox.user_id == user.id))
+    entry = result.scalars().one()
+    assert entry.recipient == "outbox@example.com"
+    assert entry.status == OutboxStatus.PENDING
+    assert str(user.id) in entry.payload["verification_url"]
+
+
+async def test_dispatcher_sends_and_marks_sent(db_session, dispatcher, mailer):
+    entry = await queue_email(db_session)
+    assert await dispatcher.run_once() == 1
+    mailer.send_user_email.assert_awaited_once_with({"email": "someone@example.com", "name": "Someone"}, "email_verification")
+    await db_session.refresh(entry)
+    assert entry.status == OutboxStatus.SENT
+    assert entry.sent_at is not None
+    assert dispatcher.stats()["sent"] == 1
+    # Nothing left to claim
+    assert await dispatcher.run_once() == 0
+
+
+async def test_dispatcher_retries_with_backoff_then_dead_letters(db_session, dispatcher, mailer):
+    mailer.send_user_email.side_effect = ConnectionError("relay down")
+    entry = await queue_email(db_session)
+
+    assert await dispatcher.run_once() == 1
+    await db_session.refresh(entry)
+    assert entry.status == OutboxStatus.PENDING
+    assert entry.attempts == 1
+    assert entry.last_error == "relay down"
+    assert (entry.next_attempt_at - datetime.now(timezone.utc)).total_seconds() > 30
+    # Not due yet
+    assert await dispatcher.run_once() == 0
+
+    entry.next_attempt_at = datetime.now(timezone.utc)
+    await db_session.commit()
+    assert await dispatcher.run_once() == 1
+    await db_session.refresh(entry)
+    assert entry.status == OutboxStatus.DEAD
+    assert dispatcher.stats()["retried"] == 1
+    assert dispatcher.stats()["dead_lettered"] == 1
+    assert await outbox_depth(db_session) == {"PENDING": 0, "DEAD": 1}
+
+
+async def test_claimed_emails_are_hidden_from_other_dispatchers(db_session, dispatcher):
+    await queue_email(db_session, "a@example.com")
+    await queue_email(db_session, "b@example.com")
+    async with dispatcher.session_factory() as session:
+        claimed = await dispatcher._claim(session)
+    assert [row.payload["email"] for row in claimed] == ["a@example.com", "b@example.com"]
+    assert await dispatcher.run_once() == 0
+
+
+def test_backoff_doubles_up_to_the_cap(mailer):
+    dispatcher = EmailOutboxDispatcher(mailer, backoff_base=30, backoff_max=100)
+    assert [dispatcher.backoff(attempts) for attempts in (1, 2, 3, 4)] == [30, 60, 100, 100]
+
+
+async def test_dispatcher_delivers_batch_over_async_smtp(db_session):
+    email_service = EmailService(template_manager=TemplateManager())
+    with SMTPSink() as sink:
+        email_service.smtp_client = AsyncSMTPClient(sink.host, sink.port, "sender@example.com", "secret", pool_size=2, use_tls=False)
+        for i in range(20):
+            enqueue_email(db_session, "email_verification", {"email": f"user{i}@example.com", "name": "User", "verification_url": "http://x"})
+        await db_session.commit()
+        dispatcher = EmailOutboxDispatcher(email_service, session_factory=async_sessionmaker(db_session.bind, expire_on_commit=False))
+        assert await dispatcher.run_once() == 20
+        await email_service.close()
+    assert len(sink) == 20
+    assert sink.connections <= 2
+    assert await outbox_depth(db_session) == {"PENDING": 0, "DEAD": 0}
@@ -0,0 +1,82 @@
+from builtins import str
+from datetime import timedelta
+from uuid import uuid4
+import pytest
+from sqlalchemy import select, update
+from app.models.refresh_token_model import RefreshToken
+from app.models.user_model import User
+from app.services.jwt_service import create_access_token, create_refresh_token, decode_token
+from app.services.refresh_token_service import RefreshTokenService
+
+pytestmark = pytest.mark.asyncio
+
+
+async def family_rows(db_session, token):
+    family_id = decode_token(token)["fam"]
+    result = await db_session.execute(select(RefreshToken).where(RefreshToken.family_id == family_id).execution_options(populate_existing=True))
+    return result.scalars().all()
+
+
+async def test_issue_stores_token(db_session, verified_user):
+    token = await RefreshTokenService.issue(db_session, verified_user.id)
+    claims = decode_token(token)
+    assert claims["type"] == "refresh"
+    assert claims["sub"] == str(verified_user.id)
+    rows = await family_rows(db_session, token)
+    assert len(rows) == 1
+    assert str(rows[0].jti) == claims["jti"]
+    assert rows[0].used_at is None
+
+
+async def test_rotate_returns_new_token_in_same_family(db_session, verified_user):
+    token = await RefreshTokenService.issue(db_session, verified_user.id)
+    user, new_token = await RefreshTokenService.rotate(db_session, token)
+    assert user.id == verified_user.id
+    assert user.role == verified_user.role
+    assert new_token != token
+    assert decode_token(new_token)["fam"] == decode_token(token)["fam"]
+    rows = await family_rows(db_session, token)
+    assert len(rows) == 2
+    assert sum(row.used_at is not None for row in rows) == 1
+
+
+async def test_reuse_revokes_family(db_session, verified_user):
+    token = await RefreshTokenService.issue(db_session, verified_user.id)
+    _, new_token = await RefreshTokenService.rotate(db_session, token)
+    assert await RefreshTokenService.rotate(db_session, token) is None
+    # The legitimate successor is revoked too
+    assert await RefreshTokenService.rotate(db_session, new_token) is None
+    rows = await family_rows(db_session, token)
+    assert all(row.revoked_at is not None for row in rows)
+
+
+async def test_rotate_rejects_access_token(db_session, verified_user):
+    token = create_access_token(data={"sub": str(verified_user.id), "role": verified_user.role.name})
+    assert await RefreshTokenService.rotate(db_session, token) is None
+
+
+async def test_rotate_rejects_unknown_and_expired_tokens(db_session, verified_user):
+    unknown = create_refresh_token(data={"sub": str(verified_user.id), "jti": str(uuid4()), "fam": str(uuid4()), "type": "refresh"})
+    assert await RefreshTokenService.rotate(db_session, unknown) is None
+    expired = create_refresh_token(
+        data={"sub": str(verified_user.id), "jti": str(uuid4()), "fam": str(uuid4()), "type": "refresh"},
+        expires_delta=timedelta(minutes=-1),
+    )
+    assert await RefreshTokenService.rotate(db_session, expired) is None
+    assert await RefreshTokenService.rotate(db_session, "not-a-token") is None
+
+
+async def test_rotate_rejects_locked_user(db_session, verified_user):
+    token = await RefreshTokenService.issue(db_session, verified_user.id)
+    await db_session.execute(update(User).where(User.id == verified_user.id).values(is_locked=True))
+    await db_session.commit()
+    assert await RefreshTokenService.rotate(db_session, token) is None
+    # Not a reuse, so the token is not revoked
+    rows = await family_rows(db_session, token)
+    assert rows[0].revoked_at is None
+
+
+async def test_revoke_user_tokens(db_session, verified_user):
+    token = await RefreshTokenService.issue(db_session, verified_user.id)
+    await RefreshTokenService.revoke_user_tokens(db_session, verified_user.id)
+    assert await RefreshTokenService.rotate(db_session, token) is None
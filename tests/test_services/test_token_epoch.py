@@ -0,0 +1,111 @@
+from builtins import str
+from datetime import timedelta
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.dependencies import get_current_user
+from app.models.token_revocation_model import TokenRevocation
+from app.models.user_model import User
+from app.services.jwt_service import create_access_token
+from app.services.token_epoch import DELETED_EPOCH, TokenEpochIndex, bump_token_epoch, token_epochs
+from app.services.user_service import UserService
+from settings.config import settings
+
+
+def token_for(user, epoch=None):
+    data = {"sub": str(user.id), "role": user.role.name}
+    if epoch is not None:
+        data["epoch"] = epoch
+    return create_access_token(data=data, expires_delta=timedelta(minutes=30))
+
+
+def test_epochs_only_move_forward():
+    index = TokenEpochIndex()
+    assert index.is_current("user", None)
+    index.apply("user", 2)
+    index.apply("user", 1)
+    assert not index.is_current("user", 1)
+    assert index.is_current("user", 2)
+    assert not index.is_current("user", "2")
+    assert index.is_current("other", 0)
+
+
+def test_revocations_older_than_token_lifetime_are_pruned():
+    index = TokenEpochIndex()
+    now = 1_000_000.0
+    lifetime = settings.access_token_expire_minutes * 60
+    index.apply("stale", 1, revoked_at=now - lifetime - 3600)
+    index.apply("fresh", 1, revoked_at=now - 60)
+    assert index.prune(now) == 1
+    assert index.stats()["revoked_users"] == 1
+    assert index.is_current("stale", 0)
+    assert not index.is_current("fresh", 0)
+
+
+async def test_bump_records_revocation(db_session, verified_user):
+    result = await db_session.execute(bump_token_epoch(verified_user.id))
+    assert result.scalar_one() == 1
+    await db_session.commit()
+    revocations = (await db_session.execute(select(TokenRevocation).where(TokenRevocation.user_id == verified_user.id))).scalars().all()
+    assert [revocation.epoch for revocation in revocations] == [1]
+    epoch = (await db_session.execute(select(User.token_epoch).where(User.id == verified_user.id))).scalar_one()
+    assert epoch == 1
+
+
+async def test_refresh_picks_up_other_processes_revocations(db_session, verified_user):
+    index = TokenEpochIndex(session_factory=async_sessionmaker(db_session.bind, expire_on_commit=False))
+    assert await index.refresh() == 0
+    await db_session.execute(bump_token_epoch(verified_user.id))
+    await db_session.commit()
+    assert await index.refresh() >= 1
+    assert not index.is_current(str(verified_user.id), 0)
+    assert index.is_current(str(verified_user.id), 1)
+    assert index.stats()["revoked_users"] == 1
+
+
+async def test_role_change_revokes_tokens(db_session, verified_user):
+    token = token_for(verified_user)
+    assert get_current_user(token)["user_id"] == str(verified_user.id)
+    updated = await UserService.update(db_session, verified_user.id, {"role": "MANAGER"})
+    assert updated.token_epoch == 1
+    with pytest.raises(HTTPException):
+        get_current_user(token)
+    assert get_current_user(token_for(updated, updated.token_epoch))["role"] == "MANAGER"
+
+
+async def test_profile_change_keeps_tokens(db_session, verified_user):
+    token = token_for(verified_user)
+    await UserService.update(db_session, verified_user.id, {"bio": "Still here"})
+    assert get_current_user(token)["user_id"] == str(verified_user.id)
+
+
+async def test_delete_revokes_tokens(db_session, verified_user):
+    token = token_for(verified_user)
+    assert await UserService.delete(db_session, verified_user.id)
+    with pytest.raises(HTTPException):
+        get_current_user(token)
+    revocation = (await db_session.execute(select(TokenRevocation).where(TokenRevocation.user_id == verified_user.id))).scalar_one()
+    assert revocation.epoch == DELETED_EPOCH
+
+
+async def test_lockout_revokes_tokens(db_session, verified_user):
+    token = token_for(verified_user)
+    for _ in range(settings.max_login_attempts):
+        assert await UserService.login_user(db_session, verified_user.email, "WrongPassword!") is None
+    assert token_epochs.stats()["revoked_users"] >= 1
+    with pytest.raises(HTTPException):
+        get_current_user(token)
+
+
+async def test_failures_on_locked_account_do_not_revoke_again(db_session, verified_user):
+    for _ in range(settings.max_login_attempts):
+        await UserService._record_failed_login(db_session, verified_user.id)
+    # Logins that passed the is_locked check before the account locked still fail afterwards
+    for _ in range(3):
+        assert await UserService._record_failed_login(db_session, verified_user.id) is True
+    revocations = (await db_session.execute(select(TokenRevocation.epoch).where(TokenRevocation.user_id == verified_user.id))).scalars().all()
+    assert revocations == [1]
+    user = (await db_session.execute(select(User).where(User.id == verified_user.id))).scalar_one()
+    assert user.token_epoch == 1
+    assert user.failed_login_attempts == settings.max_login_attempts + 3
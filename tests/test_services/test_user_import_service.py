@@ -0,0 +1,128 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.email_outbox_model import EmailOutbox
+from app.models.user_model import User, UserRole
+from app.services import user_import_service
+from app.services.user_import_service import UserImportService, read_csv_rows, read_ndjson_rows
+from app.utils.security import verify_password
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        yield pool
+
+
+def test_read_ndjson_rows_reports_bad_lines():
+    lines = io.StringIO('{"email": "a@example.com"}\n\nnot json\n[1, 2]\n')
+    rows = list(read_ndjson_rows(lines))
+    assert rows[0] == (1, {"email": "a@example.com"}, None)
+    assert rows[1][0] == 2 and rows[1][1] is None and rows[1][2].startswith("Invalid JSON")
+    assert rows[2] == (3, None, "Expected a JSON object")
+
+
+async def test_import_creates_users_and_reports_bad_rows(db_session, executor, user):
+    csv_input = io.StringIO(
+        "email,nickname,first_name,password,role\n"
+        "ada@example.com,ada_l,Ada,Secure*1234,\n"
+        "grace@example.com,,Grace,Secure*1234,AUTHENTICATED\n"
+        "not-an-email,,,Secure*1234,\n"
+        "ada@example.com,ada_2,Ada,Secure*1234,\n"
+        f"{user.email},,,Secure*1234,\n"
+        "boss@example.com,,,Secure*1234,ADMIN\n"
+    )
+    report = await UserImportService.import_users(
+        db_session, read_csv_rows(csv_input), batch_size=4, executor=executor
+    )
+    assert report.total_rows == 6
+    assert report.created == 2
+    assert {error.row for error in report.errors} == {3, 4, 5, 6}
+    outbox = await db_session.execute(select(EmailOutbox.recipient, EmailOutbox.email_type))
+    assert set(outbox.all()) == {("ada@example.com", "email_verification"), ("grace@example.com", "email_verification")}
+
+    result = await db_session.execute(select(User).where(User.email.in_(["ada@example.com", "grace@example.com"])))
+    imported = {u.email: u for u in result.scalars().all()}
+    assert imported["ada@example.com"].nickname == "ada_l"
+    assert imported["ada@example.com"].role == UserRole.ANONYMOUS
+    assert imported["grace@example.com"].nickname
+    assert imported["grace@example.com"].verification_token
+    assert verify_password("Secure*1234", imported["grace@example.com"].hashed_password)
+
+
+async def test_import_reports_nickname_conflicts(db_session, executor, user):
+    rows = [(1, {"email": "new@example.com", "nickname": user.nickname, "password": "Secure*1234"}, None)]
+    report = await UserImportService.import_users(db_session, rows, executor=executor)
+    assert report.created == 0
+    assert report.errors[0].error == "Nickname already exists"
+
+
+def nicknames_starting_with(monkeypatch, first):
+    """Make the import's first nickname draw return first, and later draws real nicknames."""
+    real = user_import_service.generate_nicknames
+    draws = [first]
+    monkeypatch.setattr(user_import_service, "generate_nicknames", lambda count: draws.pop(0) if draws else real(count))
+
+
+async def test_import_redraws_generated_nicknames_that_are_taken(db_session, executor, user, monkeypatch):
+    nicknames_starting_with(monkeypatch, [user.nickname, "fresh_nick"])
+    rows = [
+        (1, {"email": "one@example.com", "password": "Secure*1234"}, None),
+        (2, {"email": "two@example.com", "password": "Secure*1234"}, None),
+    ]
+    report = await UserImportService.import_users(db_session, rows, executor=executor)
+    assert report.created == 2
+    assert report.errors == []
+
+
+async def test_import_retries_nicknames_taken_by_a_concurrent_writer(db_session, executor, monkeypatch):
+    nicknames_starting_with(monkeypatch, ["racer_nick"])
+    hash_passwords = user_import_service.hash_passwords_async
+
+    async def hash_then_race(passwords, executor=None):
+        # Another signup takes the generated nickname after the import checked it
+        async with AsyncSession(db_session.bind) as other:
+            other.add(User(
+                nickname="racer_nick", email="racer@example.com", role=UserRole.AUTHENTICATED, hashed_password="x"
+            ))
+            await other.commit()
+        return await hash_passwords(passwords, executor)
+    monkeypatch.setattr(user_import_service, "hash_passwords_async", hash_then_race)
+
+    rows = [(1, {"email": "slow@example.com", "password": "Secure*1234"}, None)]
+    report = await UserImportService.import_users(db_session, rows, executor=executor)
+    assert report.created == 1
+    assert report.errors == []
+    result = await db_session.execute(select(User.nickname).where(User.email == "slow@example.com"))
+    assert result.scalar_one() != "racer_nick"
+
+
+async def test_import_splits_inserts_under_the_bind_parameter_limit(db_session, monkeypatch):
+    monkeypatch.setattr(user_import_service, "ROWS_PER_INSERT", 2)
+    rows = [(i, {"email": f"split{i}@example.com", "password": "Secure*1234"}, None) for i in range(1, 6)]
+    # No executor: hashed on the shared password hashing pool
+    report = await UserImportService.import_users(db_session, rows)
+    assert report.created == 5
+    assert report.errors == []
+
+
+async def test_import_reports_a_batch_the_database_rejects(db_session, executor):
+    rows = [
+        (1, {"email": "kept@example.com", "password": "Secure*1234"}, None),
+        (2, {"email": "long@example.com", "first_name": "x" * 101, "password": "Secure*1234"}, None),
+        (3, {"email": "after@example.com", "password": "Secure*1234"}, None),
+    ]
+    report = await UserImportService.import_users(db_session, rows, batch_size=1, executor=executor)
+    assert report.created == 2
+    assert [(error.row, error.email) for error in report.errors] == [(2, "long@example.com")]
+    result = await db_session.execute(select(User.email).where(User.email.like("%@example.com")))
+    assert {"kept@example.com", "after@example.com"} <= set(result.scalars().all())
+
+
+async def test_import_rejects_out_of_range_batch_size(db_session):
+    with pytest.raises(ValueError):
+        await UserImportService.import_users(db_session, [], batch_size=user_import_service.MAX_IMPORT_BATCH_SIZE + 1)
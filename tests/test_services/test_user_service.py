@@ -1,10 +1,15 @@
-from builtins import range
+from builtins import classmethod, len, range
+import asyncio
+from uuid import uuid4
 import pytest
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app.database import query_count
 from app.dependencies import get_settings
 from app.models.user_model import User, UserRole
 from app.services.user_service import UserService
 from app.utils.nickname_gen import generate_nickname
+from app.utils.security import hash_password, needs_rehash, verify_password
 
 pytestmark = pytest.mark.asyncio
 
@@ -20,6 +25,64 @@ async def test_create_user_with_valid_data(db_session, email_service):
     assert user is not None
     assert user.email == user_data["email"]
 
+# Test fetching several users by ID and email in one query each
+async def test_get_many_by_ids_and_emails(db_session, users_with_same_role_50_users):
+    wanted = users_with_same_role_50_users[:5]
+    ids = [user.id for user in reversed(wanted)] + [uuid4()]
+    found = await UserService.get_many_by_ids(db_session, ids)
+    assert [user.id for user in found] == ids[:5]
+    found = await UserService.get_many_by_emails(db_session, [user.email for user in wanted] + ["nobody@example.com"])
+    assert [user.email for user in found] == [user.email for user in wanted]
+    assert await UserService.get_many_by_ids(db_session, []) == []
+
+# Test that concurrent loader lookups are merged into one query
+async def test_loader_batches_concurrent_lookups(db_session, users_with_same_role_50_users, monkeypatch):
+    calls = []
+    fetch_many = UserService._fetch_many.__func__
+    async def spy(cls, session, column, values):
+        calls.append(values)
+        return await fetch_many(cls, session, column, values)
+    monkeypatch.setattr(UserService, "_fetch_many", classmethod(spy))
+
+    wanted = users_with_same_role_50_users[:3]
+    found = await asyncio.gather(*(UserService.load_by_id(db_session, user.id) for user in wanted), UserService.load_by_id(db_session, uuid4()))
+    assert [user.id for user in found[:3]] == [user.id for user in wanted]
+    assert found[3] is None
+    assert len(calls) == 1
+    assert await UserService.load_by_email(db_session, wanted[0].email) is found[0]
+
+# Test that nickname allocation skips taken candidates using one query per batch
+async def test_allocate_nickname_skips_taken(db_session, user, monkeypatch):
+    monkeypatch.setattr("app.services.user_service.generate_nicknames", lambda count: [user.nickname, "free_nickname_1"])
+    before = query_count(db_session)
+    assert await UserService._allocate_nickname(db_session) == "free_nickname_1"
+    assert query_count(db_session) - before == 1
+
+# Test that a user created without a nickname gets a generated one
+async def test_create_user_generates_nickname(db_session, email_service):
+    user_data = {
+        "email": "no_nickname@example.com",
+        "password": "ValidPassword123!",
+        "role": UserRole.AUTHENTICATED.name
+    }
+    user = await UserService.create(db_session, user_data, email_service)
+    assert user is not None
+    assert user.nickname
+
+# Test that losing a nickname race to a concurrent signup retries with a new nickname
+async def test_create_user_retries_nickname_conflict(db_session, email_service, user, monkeypatch):
+    candidates = iter([[user.nickname], ["second_choice"]])
+    async def allocate(cls, session):
+        return next(candidates)[0]
+    monkeypatch.setattr(UserService, "_allocate_nickname", classmethod(allocate))
+    user_data = {
+        "email": "race@example.com",
+        "password": "ValidPassword123!",
+        "role": UserRole.AUTHENTICATED.name
+    }
+    created = await UserService.create(db_session, user_data, email_service)
+    assert created.nickname == "second_choice"
+
 # Test creating a user with invalid data
 async def test_create_user_with_invalid_data(db_session, email_service):
     user_data = {
@@ -68,6 +131,60 @@ async def test_update_user_valid_data(db_session, user):
     assert updated_user is not None
     assert updated_user.email == new_email
 
+# Test that reads don't leave a transaction (and its pooled connection) open
+async def test_reads_release_connection(db_session, users_with_same_role_50_users):
+    assert await UserService.get_by_email(db_session, users_with_same_role_50_users[0].email) is not None
+    assert not db_session.in_transaction()
+    assert len(await UserService.list_users(db_session, limit=5)) == 5
+    assert await UserService.count(db_session) == 50
+    assert not db_session.in_transaction()
+
+# Test that a read inside an open write transaction sees its uncommitted changes
+async def test_read_inside_write_transaction(db_session, user):
+    await db_session.execute(update(User).where(User.id == user.id).values(nickname="uncommitted_nick"))
+    found = await UserService.get_by_nickname(db_session, "uncommitted_nick")
+    assert found is not None and found.id == user.id
+    assert db_session.in_transaction()
+    await db_session.rollback()
+
+# Test that repeated lookups in one session are served from the request cache
+async def test_repeated_lookups_use_identity_cache(db_session, user):
+    first = await UserService.get_by_id(db_session, user.id)
+    before = query_count(db_session)
+    assert await UserService.get_by_id(db_session, user.id) is first
+    assert await UserService.get_by_email(db_session, user.email) is first
+    assert await UserService.get_by_nickname(db_session, user.nickname) is first
+    assert await UserService.get_many_by_ids(db_session, [user.id]) == [first]
+    assert query_count(db_session) == before
+
+# Test that a rollback, which expires every loaded user, empties the request cache
+async def test_rollback_clears_identity_cache(db_session, user):
+    email, nickname = user.email, user.nickname
+    first = await UserService.get_by_id(db_session, user.id)
+    await db_session.execute(update(User).where(User.id == user.id).values(bio="rolled back"))
+    await db_session.rollback()
+    found = await UserService.get_by_email(db_session, email)
+    assert found is first
+    # Loaded again rather than served expired, so attributes read without a lazy load
+    assert found.nickname == nickname
+    assert found.bio != "rolled back"
+
+# Test that updating a user loaded earlier in the request costs a single statement
+async def test_update_cached_user_single_statement(db_session, user):
+    await UserService.get_by_id(db_session, user.id)
+    before = query_count(db_session)
+    updated_user = await UserService.update(db_session, user.id, {"nickname": "renamed_user"})
+    assert query_count(db_session) - before == 1
+    assert updated_user.updated_at is not None
+    assert await UserService.get_by_nickname(db_session, "renamed_user") is updated_user
+    assert query_count(db_session) - before == 1
+
+# Test that a deleted user is evicted from the request cache
+async def test_delete_evicts_cached_user(db_session, user):
+    await UserService.get_by_id(db_session, user.id)
+    assert await UserService.delete(db_session, user.id) is True
+    assert await UserService.get_by_id(db_session, user.id) is None
+
 # Test updating a user with invalid data
 async def test_update_user_invalid_data(db_session, user):
     updated_user = await UserService.update(db_session, user.id, {"email": "invalidemail"})
@@ -92,6 +209,30 @@ async def test_list_users_with_pagination(db_session, users_with_same_role_50_us
     assert len(users_page_2) == 10
     assert users_page_1[0].id != users_page_2[0].id
 
+# Test walking every page forwards and back with keyset pagination
+async def test_list_users_keyset_pagination(db_session, users_with_same_role_50_users):
+    seen = []
+    users, next_cursor, prev_cursor = await UserService.list_users_keyset(db_session, limit=20)
+    assert prev_cursor is None
+    seen.extend(users)
+    while next_cursor:
+        users, next_cursor, prev_cursor = await UserService.list_users_keyset(db_session, limit=20, cursor=next_cursor)
+        assert prev_cursor is not None
+        seen.extend(users)
+    assert len(seen) == 50
+    assert len({user.id for user in seen}) == 50
+    assert [user.id for user in seen] == [user.id for user in sorted(seen, key=lambda u: (u.created_at, u.id))]
+
+    # The last page has 10 users; paging back from it yields the 20 before them
+    back, back_next, back_prev = await UserService.list_users_keyset(db_session, limit=20, cursor=prev_cursor)
+    assert [user.id for user in back] == [user.id for user in seen[20:40]]
+    assert back_next is not None
+    assert back_prev is not None
+
+async def test_list_users_keyset_invalid_cursor(db_session):
+    with pytest.raises(ValueError):
+        await UserService.list_users_keyset(db_session, cursor="not-a-cursor")
+
 # Test registering a user with valid data
 async def test_register_user_with_valid_data(db_session, email_service):
     user_data = {
@@ -122,6 +263,15 @@ async def test_login_user_successful(db_session, verified_user):
     logged_in_user = await UserService.login_user(db_session, user_data["email"], user_data["password"])
     assert logged_in_user is not None
 
+# Test that login upgrades a hash made with outdated parameters
+async def test_login_user_rehashes_outdated_hash(db_session, verified_user):
+    verified_user.hashed_password = hash_password("MySuperPassword$1234", 4)
+    await db_session.commit()
+    logged_in_user = await UserService.login_user(db_session, verified_user.email, "MySuperPassword$1234")
+    assert logged_in_user is not None
+    assert not needs_rehash(logged_in_user.hashed_password)
+    assert verify_password("MySuperPassword$1234", logged_in_user.hashed_password)
+
 # Test user login with incorrect email
 async def test_login_user_incorrect_email(db_session):
     user = await UserService.login_user(db_session, "nonexistentuser@noway.com", "Password123!")
@@ -141,6 +291,41 @@ async def test_account_lock_after_failed_logins(db_session, verified_user):
     is_locked = await UserService.is_account_locked(db_session, verified_user.email)
     assert is_locked, "The account should be locked after the maximum number of failed login attempts."
 
+# Test that concurrent failed logins on separate connections don't lose increments
+async def test_concurrent_failed_logins_are_counted_atomically(verified_user):
+    engine = create_async_engine(get_settings().database_url)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    attempts = 10
+
+    async def fail_once():
+        async with session_factory() as session:
+            return await UserService._record_failed_login(session, verified_user.id)
+
+    try:
+        locked = await asyncio.gather(*(fail_once() for _ in range(attempts)))
+        async with session_factory() as session:
+            stored = await UserService.get_by_id(session, verified_user.id)
+    finally:
+        await engine.dispose()
+    assert stored.failed_login_attempts == attempts
+    assert stored.is_locked
+    assert locked.count(False) == get_settings().max_login_attempts - 1
+
+# Test that a successful login is one auth-column lookup plus one UPDATE ... RETURNING
+async def test_login_user_statement_count(db_session, verified_user):
+    before = query_count(db_session)
+    logged_in_user = await UserService.login_user(db_session, verified_user.email, "MySuperPassword$1234")
+    assert logged_in_user is not None
+    assert logged_in_user.last_login_at is not None
+    assert logged_in_user.failed_login_attempts == 0
+    assert query_count(db_session) - before == 2
+
+# Test that a locked account can't log in even with the right password
+async def test_login_locked_user(db_session, locked_user):
+    locked_user.email_verified = True
+    await db_session.commit()
+    assert await UserService.login_user(db_session, locked_user.email, "MySuperPassword$1234") is None
+
 # Test resetting a user's password
 async def test_reset_password(db_session, user):
     new_password = "NewPassword123!"
@@ -155,9 +340,36 @@ async def test_verify_email_with_token(db_session, user):
     result = await UserService.verify_email_with_token(db_session, user.id, token)
     assert result is True
 
+# Test that a wrong verification token changes nothing and leaves the user usable
+async def test_verify_email_with_wrong_token(db_session, user):
+    user.verification_token = "valid_token_example"
+    await db_session.commit()
+    assert await UserService.verify_email_with_token(db_session, user.id, "wrong_token") is False
+    assert user.email_verified is False
+    assert user.verification_token == "valid_token_example"
+
+# Test that single-row writes are one UPDATE ... RETURNING each
+async def test_writes_use_single_update_returning(db_session, locked_user):
+    before = query_count(db_session)
+    assert await UserService.unlock_user_account(db_session, locked_user.id) is True
+    assert locked_user.is_locked is False
+    assert locked_user.failed_login_attempts == 0
+    upgraded = await UserService.upgrade_to_professional(db_session, locked_user.id)
+    assert upgraded is locked_user
+    assert upgraded.is_professional is True
+    assert upgraded.professional_status_updated_at is not None
+    assert query_count(db_session) - before == 2
+    assert await UserService.upgrade_to_professional(db_session, uuid4()) is None
+
 # Test unlocking a user's account
 async def test_unlock_user_account(db_session, locked_user):
     unlocked = await UserService.unlock_user_account(db_session, locked_user.id)
     assert unlocked, "The account should be unlocked"
     refreshed_user = await UserService.get_by_id(db_session, locked_user.id)
     assert not refreshed_user.is_locked, "The user should no longer be locked"
+
+
+async def test_get_fields_by_id_reads_only_requested_columns(db_session, verified_user):
+    row = await UserService.get_fields_by_id(db_session, verified_user.id, ["id", "nickname"])
+    assert row._asdict() == {"id": verified_user.id, "nickname": verified_user.nickname}
+    assert await UserService.get_fields_by_id(db_session, uuid4(), ["id"]) is None
@@ -0,0 +1,32 @@
+import pytest
+from app.dependencies import get_settings
+from app.services import user_service
+from settings.config import reload_settings, settings
+
+
+@pytest.fixture(autouse=True)
+def restore_settings():
+    yield
+    reload_settings()
+
+
+def test_get_settings_returns_the_shared_instance():
+    assert get_settings() is settings
+    assert get_settings() is get_settings()
+    assert user_service.settings is settings
+
+
+def test_reload_applies_overrides_in_place():
+    reload_settings(max_login_attempts=7)
+    assert settings.max_login_attempts == 7
+    assert user_service.settings.max_login_attempts == 7
+
+
+def test_reload_rereads_the_environment(monkeypatch):
+    original = settings.max_login_attempts
+    monkeypatch.setenv("MAX_LOGIN_ATTEMPTS", str(original + 5))
+    reload_settings()
+    assert get_settings().max_login_attempts == original + 5
+    monkeypatch.delenv("MAX_LOGIN_ATTEMPTS")
+    reload_settings()
+    assert get_settings().max_login_attempts == original
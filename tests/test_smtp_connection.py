@@ -0,0 +1,97 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app.utils.smtp_connection import AsyncSMTPClient, SMTPClient, create_smtp_client
+from tests.smtp_sink import SMTPSink
+
+
+@pytest.fixture
+def sink():
+    with SMTPSink() as sink:
+        yield sink
+
+
+def make_client(sink, **kwargs) -> SMTPClient:
+    return SMTPClient(sink.host, sink.port, "sender@example.com", "secret", use_tls=False, **kwargs)
+
+
+def test_sessions_are_reused_across_messages(sink):
+    client = make_client(sink, pool_size=2)
+    for i in range(5):
+        client.send_email("Hello", "<p>Hi</p>", f"user{i}@example.com")
+    assert len(sink) == 5
+    assert sink.connections == 1
+    assert client.stats()["connections_opened"] == 1
+    assert client.stats()["messages_sent"] == 5
+    client.close()
+
+
+def test_concurrent_sends_are_bounded_by_pool_size(sink):
+    client = make_client(sink, pool_size=3)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda i: client.send_email("Hello", "<p>Hi</p>", f"user{i}@example.com"), range(40)))
+    assert len(sink) == 40
+    assert sink.connections <= 3
+    assert client.stats()["idle"] <= 3
+    client.close()
+
+
+def test_dropped_idle_session_is_replaced(sink):
+    client = make_client(sink, keepalive_interval=60)
+    client.send_email("Hello", "<p>Hi</p>", "first@example.com")
+    sink.disconnect_all()
+    client.send_email("Hello", "<p>Hi</p>", "second@example.com")
+    assert [recipients for _, recipients, _ in sink.messages] == [["first@example.com"], ["second@example.com"]]
+    assert sink.connections == 2
+    client.close()
+
+
+def test_stale_session_is_detected_by_noop(sink):
+    client = make_client(sink, keepalive_interval=0)
+    client.send_email("Hello", "<p>Hi</p>", "first@example.com")
+    sink.disconnect_all()
+    client.send_email("Hello", "<p>Hi</p>", "second@example.com")
+    assert len(sink) == 2
+    assert sink.connections == 2
+    client.close()
+
+
+def test_idle_sessions_are_evicted(sink):
+    client = make_client(sink, idle_timeout=0)
+    client.send_email("Hello", "<p>Hi</p>", "first@example.com")
+    client.send_email("Hello", "<p>Hi</p>", "second@example.com")
+    assert sink.connections == 2
+    assert client.stats()["idle"] == 1
+    client.close()
+
+
+def test_connection_errors_are_raised():
+    client = SMTPClient("127.0.0.1", 1, "sender@example.com", "secret", use_tls=False, timeout=1)
+    with pytest.raises(OSError):
+        client.send_email("Hello", "<p>Hi</p>", "first@example.com")
+
+
+async def test_async_client_reuses_sessions_and_bounds_concurrency(sink):
+    client = AsyncSMTPClient(sink.host, sink.port, "sender@example.com", "secret", pool_size=3, use_tls=False)
+    await asyncio.gather(*(client.send_email("Hello", "<p>Hi</p>", f"user{i}@example.com") for i in range(40)))
+    assert len(sink) == 40
+    assert sink.connections <= 3
+    assert client.stats()["messages_sent"] == 40
+    await client.close()
+
+
+async def test_async_client_replaces_dropped_session(sink):
+    client = AsyncSMTPClient(sink.host, sink.port, "sender@example.com", "secret", keepalive_interval=60, use_tls=False)
+    await client.send_email("Hello", "<p>Hi</p>", "first@example.com")
+    sink.disconnect_all()
+    await asyncio.sleep(0.05)
+    await client.send_email("Hello", "<p>Hi</p>", "second@example.com")
+    assert [recipients for _, recipients, _ in sink.messages] == [["first@example.com"], ["second@example.com"]]
+    await client.close()
+
+
+def test_create_smtp_client_selects_transport():
+    assert isinstance(create_smtp_client("localhost", 25, "u", "p", transport="thread"), SMTPClient)
+    assert isinstance(create_smtp_client("localhost", 25, "u", "p", transport="async"), AsyncSMTPClient)
+    with pytest.raises(ValueError):
+        create_smtp_client("localhost", 25, "u", "p", transport="carrier-pigeon")
@@ -0,0 +1,19 @@
+import pytest
+from app.utils.sparse_fields import parse_fields
+
+ALLOWED = ("id", "nickname", "role", "email")
+
+
+def test_no_fields_means_all():
+    assert parse_fields(None, ALLOWED) is None
+    assert parse_fields(" ", ALLOWED) is None
+
+
+def test_fields_keep_order_and_always_include_id():
+    assert parse_fields("role, nickname,role", ALLOWED) == ["id", "role", "nickname"]
+    assert parse_fields("nickname,id", ALLOWED) == ["id", "nickname"]
+
+
+def test_unknown_fields_are_rejected():
+    with pytest.raises(ValueError, match="hashed_password"):
+        parse_fields("nickname,hashed_password", ALLOWED)
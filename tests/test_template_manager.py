@@ -0,0 +1,59 @@
+import os
+import pytest
+from app.utils.template_manager import TemplateManager
+from settings.config import settings
+
+
+@pytest.fixture
+def manager(tmp_path):
+    (tmp_path / "header.md").write_text("# Header {not a field}\n")
+    (tmp_path / "footer.md").write_text("Footer\n")
+    (tmp_path / "greeting.md").write_text("Hello {name}, {{literal}} [Go]({url}) {count:03d}\n")
+    manager = TemplateManager()
+    manager.templates_dir = tmp_path
+    return manager
+
+
+def test_render_substitutes_and_escapes_values(manager):
+    html = manager.render_template("greeting", name="<Ada & co>", url="http://x/?a=1&b=2", count=7)
+    assert "Hello &lt;Ada &amp; co&gt;," in html
+    assert '<a href="http://x/?a=1&amp;b=2">Go</a>' in html
+    assert "{literal}" in html
+    assert "007" in html
+    assert "Header {not a field}" in html
+    assert '<p style="' in html and html.startswith('<div style="font-family')
+
+
+def test_render_requires_context_values(manager):
+    with pytest.raises(KeyError):
+        manager.render_template("greeting", name="Ada")
+
+
+def test_templates_are_compiled_once(manager):
+    compiled = manager.get_template("greeting")
+    assert manager.get_template("greeting") is compiled
+    # Shared across instances
+    other = TemplateManager()
+    other.templates_dir = manager.templates_dir
+    assert other.get_template("greeting") is compiled
+
+
+def test_edited_templates_are_recompiled_in_debug_mode(manager, monkeypatch):
+    manager.render_template("greeting", name="Ada", url="u", count=1)
+    path = manager.templates_dir / "greeting.md"
+    path.write_text("Bye {name}\n")
+    stat = path.stat()
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+    monkeypatch.setattr(settings, "debug", False)
+    assert "Hello Ada" in manager.render_template("greeting", name="Ada", url="u", count=1)
+    monkeypatch.setattr(settings, "debug", True)
+    assert "Bye Ada" in manager.render_template("greeting", name="Ada")
+
+
+def test_verification_email_template():
+    html = TemplateManager().render_template(
+        "email_verification", name="Ada", verification_url="http://localhost/verify-email/1/abc", email="ada@example.com"
+    )
+    assert "Hello Ada," in html
+    assert 'href="http://localhost/verify-email/1/abc"' in html
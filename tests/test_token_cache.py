@@ -0,0 +1,67 @@
+from datetime import timedelta
+import pytest
+from fastapi import HTTPException
+from app.dependencies import get_current_user
+from app.services.jwt_service import create_access_token, decode_token_cached, verified_token_cache
+from app.utils.token_cache import TokenCache
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_hit_returns_copy_of_claims():
+    cache = TokenCache(max_size=2)
+    cache.put("token", {"sub": "1", "exp": 2 ** 40})
+    claims = cache.get("token")
+    claims["sub"] = "changed"
+    assert cache.get("token") == {"sub": "1", "exp": 2 ** 40}
+    assert cache.stats()["hits"] == 2
+
+
+def test_entries_expire_with_the_token():
+    clock = FakeClock()
+    cache = TokenCache(max_size=2, clock=clock)
+    cache.put("token", {"sub": "1", "exp": 1010})
+    assert cache.get("token") is not None
+    clock.now = 1010
+    assert cache.get("token") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_tokens_without_exp_are_not_cached():
+    cache = TokenCache(max_size=2)
+    cache.put("token", {"sub": "1"})
+    assert cache.get("token") is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TokenCache(max_size=2)
+    for token in ("a", "b"):
+        cache.put(token, {"exp": 2 ** 40})
+    cache.get("a")
+    cache.put("c", {"exp": 2 ** 40})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_get_current_user_reuses_verified_claims():
+    verified_token_cache.clear()
+    token = create_access_token(data={"sub": "user-1", "role": "admin"}, expires_delta=timedelta(minutes=5))
+    hits = verified_token_cache.stats()["hits"]
+    assert get_current_user(token) == {"user_id": "user-1", "role": "ADMIN"}
+    assert get_current_user(token) == {"user_id": "user-1", "role": "ADMIN"}
+    assert verified_token_cache.stats()["hits"] == hits + 1
+
+
+def test_invalid_tokens_are_never_cached():
+    verified_token_cache.clear()
+    assert decode_token_cached("not-a-jwt") is None
+    assert verified_token_cache.stats()["size"] == 0
+    with pytest.raises(HTTPException):
+        get_current_user("not-a-jwt")